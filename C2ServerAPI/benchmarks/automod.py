@@ -0,0 +1,54 @@
+"""Benchmark of the name moderation rules with thousands of patterns.
+
+Builds an AutoModerator with 10k regular expressions and 10k words, then times checking a roster of 64 names
+    that are not in the verdict cache yet, which is the cost of the first snapshot of a full server.
+
+Run from the C2ServerAPI folder: python -m benchmarks.automod"""
+
+import random
+import time
+
+from core.autoModeration import AutoModerator
+
+def makeRules(patterns, words):
+    """Returns rules with patterns regular expressions and words words, spread over the three actions."""
+    rng = random.Random(1)
+    rules = []
+    for n, action in enumerate(("alert", "kick", "ban")):
+        # The last action takes the remainder, so that there are exactly as many as asked
+        action_patterns = patterns // 3 + (patterns % 3 if n == 2 else 0)
+        action_words = words // 3 + (words % 3 if n == 2 else 0)
+        rules.append({"name": f"{action} patterns", "action": action, "patterns": [
+            rng.choice((r"^\W*tag{}\b", r"clan{}[0-9]+", r"x{}x.*y", r"(?:the)?bot{}s?")).format(i)
+            for i in range(action_patterns)
+        ]})
+        rules.append({"name": f"{action} words", "action": action,
+                      "words": [f"word{i}{action}" for i in range(action_words)]})
+    return rules
+
+def makeNames(count):
+    rng = random.Random(2)
+    return [(f"{i:016X}", f"{rng.choice(('Sir', 'Lord', 'xX', ''))} Player{rng.randrange(100000)} of the keep")
+            for i in range(count)]
+
+def main():
+    start = time.perf_counter()
+    moderator = AutoModerator(makeRules(10000, 10000))
+    built = time.perf_counter() - start
+    print(f"{moderator.pattern_count} patterns and {moderator.word_count} words compiled in {built * 1000:.0f} ms")
+
+    names = makeNames(64)
+    times = []
+    for _ in range(20):
+        moderator._cache.clear()
+        start = time.perf_counter()
+        moderator.evaluate(names)
+        times.append(time.perf_counter() - start)
+    print(f"64 uncached names: best {min(times) * 1000:.3f} ms, worst {max(times) * 1000:.3f} ms")
+
+    start = time.perf_counter()
+    moderator.evaluate(names)
+    print(f"64 cached names: {(time.perf_counter() - start) * 1000:.3f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Benchmark of the listplayers parser on large clipboard blobs holding many snapshots.
+
+Times listplayers.iter_rosters() over every snapshot of the blob and parse_listplayers() on the latest one, and
+    compares the peak memory of the streaming line reader with splitting the whole blob into lines first.
+
+Run from the C2ServerAPI folder: python -m benchmarks.listplayers"""
+
+import time
+import tracemalloc
+
+from core import listplayers
+
+def makeBlob(snapshots, players=64):
+    """Returns clipboard text with snapshots listplayers outputs of players each, back to back."""
+    blocks = []
+    for s in range(snapshots):
+        lines = [f"ServerName - Benchmark Server {s % 4}  [Duels FFA] 10.0.0.{s % 4}:7777",
+                 "Name - PlayFabPlayerId - EOSPlayerId - Score - Kills - Deaths - Ping"]
+        for p in range(players):
+            lines.append(f"Player {p} - {(s * 7 + p) % 4096:016X} - {p:032x} - {p * 10} - {p % 30} - {p % 17} - 50")
+        blocks.append("\r\n".join(lines))
+    return "\r\n".join(blocks) + "\r\n"
+
+def best(function, repeat=5):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def peakMemory(function):
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+def main():
+    for snapshots in (1, 100, 1000):
+        blob = makeBlob(snapshots)
+        every = best(lambda: sum(1 for _ in listplayers.iter_rosters(blob)))
+        latest = best(lambda: listplayers.parse_listplayers(blob))
+        print(f"{snapshots:5} snapshots, {len(blob) / 1024:8.0f} KiB: iter_rosters {every * 1000:8.2f} ms "
+              f"({every / snapshots * 1e6:.0f} us per snapshot), parse_listplayers {latest * 1000:6.2f} ms")
+
+    blob = makeBlob(1000)
+    streamed = peakMemory(lambda: sum(1 for _ in listplayers.iter_lines(blob)))
+    split = peakMemory(lambda: sum(1 for _ in blob.splitlines()))
+    print(f"peak memory reading the lines of 1000 snapshots: streamed {streamed / 1024:.0f} KiB, "
+          f"split up front {split / 1024:.0f} KiB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Benchmark of the player search index at 100k players.
+
+Seeds a TrigramIndex from a player history of 100k players, like the panel does at startup, then times searches
+    over the whole index, limited to the first results as the players window asks for them, and restricted to
+    the 64 players of a roster. The incremental update from the roster events of a refresh is timed too. Partial
+    queries with a typo are checked to find the names they were typed for, the script fails otherwise.
+
+Run from the C2ServerAPI folder: python -m benchmarks.playersearch"""
+
+import random
+import string
+import time
+
+from core.listplayers import DEFAULT_COLUMNS, PlayerRow, ServerRoster
+from core.playerHistory import PlayerHistory
+from core.playerSearch import TrigramIndex
+from core.roster import RosterStore
+
+PLAYERS = 100_000
+QUERIES = ("ab", "knight", "xx_sl4yer_xx", "kngiht", "00001F3", "zzqx")
+# Query with a typo -> word the names it is meant to find contain
+TYPOS = {"kngiht": "knight", "slayr": "slayer", "sl4yer": "slayer", "peasnat": "peasant", "arhcer": "archer"}
+# Typos sharing no trigram with the word, only found among the players of a roster, where every name is scored
+ROSTER_TYPOS = {"nite": "knight", "dook": "duke"}
+
+def makePlayers(count, seed=1):
+    """Returns a list of (PlayFab ID, name) with random names."""
+    rng = random.Random(seed)
+    words = ["knight", "slayer", "duke", "peasant", "archer", "xx", "the", "lord", "dark", "sir"]
+    players = []
+    for i in range(count):
+        name = "_".join(rng.choice(words) for _ in range(rng.randint(1, 3)))
+        name += "".join(rng.choice(string.ascii_letters + string.digits) for _ in range(rng.randint(0, 5)))
+        players.append((f"{i * 7919:016X}", name))
+    return players
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+def main():
+    players = makePlayers(PLAYERS)
+    history = PlayerHistory(":memory:")
+    for start in range(0, PLAYERS, 1000):
+        rows = tuple(PlayerRow(name, pid, None, {}) for pid, name in players[start:start + 1000])
+        history.record(ServerRoster("Benchmark", None, DEFAULT_COLUMNS, rows))
+
+    index = TrigramIndex()
+    elapsed, names = timed(history.names)
+    print(f"history.names(): {len(names)} names in {elapsed * 1000:.0f} ms")
+    elapsed, count = timed(lambda: index.add_many((pid, pid, name) for pid, name in names))
+    print(f"add_many: {count} players in {elapsed:.2f} s ({elapsed / count * 1e6:.0f} us per player)")
+
+    roster = random.Random(2).sample([pid for pid, _ in players], 64)
+    for query in QUERIES:
+        whole, results = timed(lambda: index.search(query))
+        limited, _ = timed(lambda: index.search(query, limit=84))
+        restricted, _ = timed(lambda: index.search(query, keys=roster))
+        print(f"{query!r:16} {len(results):6} results: all {whole * 1000:7.1f} ms, first 84 {limited * 1000:6.2f} ms, "
+              f"64 roster players {restricted * 1000:5.2f} ms")
+
+    for keys, typos in ((None, TYPOS), (roster, {**TYPOS, **ROSTER_TYPOS})):
+        for query, word in typos.items():
+            elapsed, results = timed(lambda: index.search(query, limit=20, keys=keys))
+            found = sum(1 for r in results if word in r.text)
+            where = "whole index" if keys is None else "roster"
+            print(f"{query!r:16} {where:11} {found:3} of the first {len(results)} results contain {word!r} "
+                  f"({elapsed * 1000:.1f} ms)")
+            if not found and (keys is None or any(word in t for k in keys for t in index.texts(k))):
+                raise SystemExit(f"Searching {query!r} did not find any name containing {word!r}")
+
+    store = RosterStore("Benchmark")
+    store.subscribe(index.apply_roster_events)
+    rows = tuple(PlayerRow(f"Newcomer {i}", f"{i:016X}N", None, {}) for i in range(64))
+    elapsed, _ = timed(lambda: store.apply(ServerRoster("Benchmark", None, DEFAULT_COLUMNS, rows)))
+    print(f"roster refresh of 64 joins applied to the index in {elapsed * 1000:.2f} ms")
+
+if __name__ == "__main__":
+    main()
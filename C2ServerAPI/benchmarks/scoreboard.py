@@ -0,0 +1,56 @@
+"""Benchmark of the scoreboard fallback of getPlayerList() on a full 64 player scoreboard.
+
+Renders a synthetic scoreboard crop and times its segmentation into row strips, then the whole of
+    scoreboardReader.readScoreboard() if pytesseract and tesseract are installed. The goal is well under a
+    second for the full read.
+
+Run from the C2ServerAPI folder: python -m benchmarks.scoreboard"""
+
+import time
+
+from PIL import Image, ImageDraw
+
+from core import ocrLib, scoreboardReader
+
+ROWS = 64
+ROW_HEIGHT = 18
+GOAL = 1.0
+
+def renderScoreboard(rows=ROWS):
+    """Returns a PIL image of a scoreboard crop with one row of dark text per player."""
+    image = Image.new("RGB", (480, rows * ROW_HEIGHT + 10), "white")
+    draw = ImageDraw.Draw(image)
+    for i in range(rows):
+        draw.text((6, 5 + i * ROW_HEIGHT), f"Knight {i}    {1000 - i * 7}   {i % 20}   {i % 9}", fill="black")
+    return image
+
+def timeit(function, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def main():
+    image = renderScoreboard()
+
+    def segment():
+        binary = ocrLib.binarize(image)
+        width = binary.size[0]
+        return [ocrLib.padImage(binary.crop((0, top, width, bottom))) for top, bottom in ocrLib.rowBands(binary)]
+    elapsed, strips = timeit(segment, 20)
+    print(f"segmentation: {len(strips)} row strips in {elapsed * 1000:.1f} ms")
+
+    try:
+        ocrLib.imageToString(strips[0], config=ocrLib.SINGLE_LINE_CONFIG)
+    except Exception as e:
+        print(f"full read skipped, OCR is not available: {e}")
+        return
+    elapsed, rows = timeit(lambda: scoreboardReader.readScoreboard(image), 3)
+    print(f"readScoreboard: {len(rows)} rows in {elapsed * 1000:.0f} ms on {ocrLib.getPool()._max_workers} workers "
+          f"({'under' if elapsed < GOAL else 'OVER'} the {GOAL:g} s goal)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Benchmark of the stdlib webhook client: import time and latency of a send to a local Discord stub.
+
+Compares the time a fresh interpreter takes to import the client with importing discord.py, when it is
+    installed, and the latency of a send over a pooled keep-alive connection with opening a new connection
+    for every send, as discord.py's SyncWebhook does.
+
+Run from the C2ServerAPI folder: python -m benchmarks.webhookclient"""
+
+import statistics
+import subprocess
+import sys
+import time
+
+from core.webhookClient import ConnectionPool, WebhookClient
+from benchmarks.webhookstub import StubServer
+
+PAYLOAD = {"username": "Benchmark", "embeds": [{"title": "Ban", "description": "Benchmark notification"}]}
+
+def importTime(module, repeat=5):
+    """Returns the best time a new interpreter takes to import module, minus the time it takes to start, or
+        None if the module cannot be imported."""
+    def run(code):
+        start = time.perf_counter()
+        done = subprocess.run([sys.executable, "-c", code], capture_output=True)
+        return time.perf_counter() - start, done.returncode == 0
+    baseline = min(run("pass")[0] for _ in range(repeat))
+    times = []
+    for _ in range(repeat):
+        elapsed, ok = run(f"import {module}")
+        if not ok:
+            return None
+        times.append(elapsed)
+    return min(times) - baseline
+
+def sendLatencies(client, sends):
+    latencies = []
+    for _ in range(sends):
+        start = time.perf_counter()
+        client.post(PAYLOAD)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+def main():
+    for module in ("core.webhookClient", "discord"):
+        elapsed = importTime(module)
+        print(f"import {module}: " + ("not installed" if elapsed is None else f"{elapsed * 1000:.0f} ms"))
+
+    sends = 500
+    with StubServer() as stub:
+        for label, pool in (("pooled keep-alive connection", ConnectionPool()),
+                            ("new connection per send", ConnectionPool(max_idle=0))):
+            latencies = sendLatencies(WebhookClient(stub.url, pool), sends)
+            pool.close()
+            print(f"{label}: median {statistics.median(latencies) * 1000:.3f} ms, "
+                  f"p95 {sorted(latencies)[int(sends * 0.95)] * 1000:.3f} ms per send")
+        print(f"{stub.requests} requests served")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""Benchmark of the webhook dispatcher against a local Discord stub answering after an injected delay.
+
+Times how long submit() blocks the calling thread, i.e. the Qt UI thread in the panel, and how long
+    notifications take to be delivered to two webhooks, compared with sending them one after the other on the
+    calling thread as the panel used to.
+
+Before timing anything, the script checks that a rate limited message is sent again after the delay Discord
+    asks for, that a message Discord rejects is split to give up only the bad notification, that every webhook
+    gets its notifications in order and that a slow webhook does not hold a fast one back. It fails otherwise.
+
+Run from the C2ServerAPI folder: python -m benchmarks.webhookdispatcher"""
+
+import threading
+import time
+
+from core.webhookClient import ConnectionPool, WebhookClient
+from core.webhookDispatcher import WebhookDispatcher
+from benchmarks.webhookstub import StubServer
+
+def makePayload(i):
+    return {"username": "Benchmark", "embeds": [{"title": f"Ban {i}", "description": "Benchmark notification"}]}
+
+def deliverAll(destinations, notifications, linger=0.0):
+    """Submits notifications to a dispatcher sending to every destination and waits until each was delivered or
+        given up.
+
+    @param destinations: dict of name to webhook client
+    @returns (dispatcher, results that ended a delivery, results that will be retried)
+    """
+    dispatcher = WebhookDispatcher(linger=linger, base_delay=0.05)
+    dispatcher.set_destinations(destinations)
+    final, retried = [], []
+    done = threading.Event()
+    expected = notifications * len(destinations)
+
+    def collect(result):
+        if result.ok or result.retry_in is None:
+            final.append(result)
+            if len(final) == expected:
+                done.set()
+        else:
+            retried.append(result)
+    dispatcher.subscribe(collect)
+
+    for i in range(notifications):
+        dispatcher.submit("ban", makePayload(i))
+    done.wait(30)
+    dispatcher.stop()
+    return dispatcher, final, retried
+
+def check(condition, message):
+    if not condition:
+        raise SystemExit(f"Check failed: {message}")
+
+def checkDispatcher():
+    titles = [makePayload(i)["embeds"][0]["title"] for i in range(20)]
+    pool = ConnectionPool()
+
+    with StubServer() as stub:
+        # Rate limited once: sent again after retry_after, nothing lost
+        stub.failures = [429]
+        dispatcher, final, retried = deliverAll({"Stub": WebhookClient(stub.url, pool)}, 3)
+        check(retried and all(r.status == 429 for r in retried), f"429 not retried: {retried}")
+        check(all(r.retry_in == stub.retry_after for r in retried), f"not retried after retry_after: {retried}")
+        check(all(r.ok for r in final) and len(final) == 3, f"rate limited notifications not delivered: {final}")
+        check(stub.titles == titles[:3], f"rate limited notifications delivered as {stub.titles}")
+        check(stub.requests == dispatcher.requests + 1, f"{stub.requests} requests for {dispatcher.requests} sent")
+
+    with StubServer() as stub:
+        # One bad embed in a message: the others are sent alone and delivered, the bad one given up
+        stub.rejected = {titles[1]}
+        dispatcher, final, retried = deliverAll({"Stub": WebhookClient(stub.url, pool)}, 3, linger=0.5)
+        check(len(retried) == 3 and all(r.status == 400 for r in retried), f"rejected message not split: {retried}")
+        given_up = [r for r in final if not r.ok]
+        check(len(final) == 3 and [r.status for r in given_up] == [400], f"not only the bad one given up: {final}")
+        check(stub.titles == [titles[0], titles[2]], f"split message delivered as {stub.titles}")
+        check(stub.requests == 4 and dispatcher.requests == 2, f"{stub.requests} requests to split the message")
+
+    with StubServer(0.5) as slow, StubServer() as fast:
+        # Each webhook gets its notifications in order, the fast one without waiting for the slow one
+        start = time.perf_counter()
+        fast_done = []
+        hooks = {"Slow": WebhookClient(slow.url, pool), "Fast": WebhookClient(fast.url, pool)}
+
+        class FastClient:
+            def post(self, payload):
+                hooks["Fast"].post(payload)
+                fast_done.append(time.perf_counter() - start)
+        dispatcher, final, retried = deliverAll({"Slow": hooks["Slow"], "Fast": FastClient()}, 20)
+        check(len(final) == 40 and all(r.ok for r in final) and not retried, f"notifications lost: {final}")
+        check(slow.titles == titles and fast.titles == titles, f"out of order: {slow.titles}, {fast.titles}")
+        check(slow.embeds + fast.embeds == dispatcher.delivered == 40, "embeds not all delivered")
+        check(fast_done[-1] < slow.latency, f"fast webhook done after {fast_done[-1]:.2f} s, held back")
+    pool.close()
+    print("Checks passed: rate limit retry, rejected message split, order per webhook, independent webhooks")
+
+def runDispatcher(stubs, notifications, linger):
+    """Submits notifications to a dispatcher sending to every stub and waits for all of them.
+
+    @returns (longest submit() call, seconds until the last delivery, latencies, requests)
+    """
+    dispatcher = WebhookDispatcher(linger=linger)
+    pool = ConnectionPool()
+    dispatcher.set_destinations({f"Stub {i}": WebhookClient(stub.url, pool) for i, stub in enumerate(stubs)})
+    latencies = []
+    done = threading.Event()
+    expected = notifications * len(stubs)
+
+    def collect(result):
+        latencies.append(result.latency)
+        if len(latencies) == expected:
+            done.set()
+    dispatcher.subscribe(collect)
+
+    start = time.perf_counter()
+    longest = 0.0
+    for i in range(notifications):
+        call = time.perf_counter()
+        dispatcher.submit("ban", makePayload(i))
+        longest = max(longest, time.perf_counter() - call)
+    done.wait(60)
+    elapsed = time.perf_counter() - start
+    dispatcher.stop()
+    pool.close()
+    return longest, elapsed, sorted(latencies), dispatcher.requests
+
+def runBlocking(stubs, notifications):
+    """Sends every notification to every stub in turn, on the calling thread."""
+    pool = ConnectionPool()
+    hooks = [WebhookClient(stub.url, pool) for stub in stubs]
+    start = time.perf_counter()
+    for i in range(notifications):
+        for hook in hooks:
+            hook.post(makePayload(i))
+    elapsed = time.perf_counter() - start
+    pool.close()
+    return elapsed
+
+def main():
+    checkDispatcher()
+    notifications = 20
+    for latency in (0.05, 0.2, 0.5):
+        with StubServer(latency) as primary, StubServer(latency) as secondary:
+            stubs = [primary, secondary]
+            blocking = runBlocking(stubs, notifications)
+            print(f"{latency * 1000:.0f} ms Discord latency, {notifications} notifications to 2 webhooks:")
+            print(f"  sent on the calling thread: blocked {blocking:.2f} s")
+            for linger in (0.0, 1.0):
+                longest, elapsed, latencies, requests = runDispatcher(stubs, notifications, linger)
+                print(f"  dispatcher, linger {linger:.0f} s: longest submit {longest * 1000:.2f} ms, all delivered "
+                      f"in {elapsed:.2f} s, median latency {latencies[len(latencies) // 2]:.2f} s, "
+                      f"{requests} requests")
+
+if __name__ == "__main__":
+    main()
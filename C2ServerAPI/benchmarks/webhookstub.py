@@ -0,0 +1,76 @@
+"""Local HTTP server standing in for Discord in the webhook benchmarks.
+
+Answers every POST with 204 after an injected delay, or with the statuses queued in its failures list, e.g. 429
+    with a retry_after or 400, so the benchmarks can measure the dispatcher and the client without the network.
+    Messages holding an embed whose title is in its rejected set are answered with 400, as Discord does with an
+    invalid embed, and the titles of the embeds it accepted are recorded in order for the checks."""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, latency=0.0):
+        """@param latency: Seconds every request waits before being answered"""
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.latency = latency
+        self.failures = [] # statuses answered to the next requests, before going back to 204
+        self.retry_after = 0.05
+        self.requests = 0
+        self.embeds = 0
+        self.rejected = set() # titles of the embeds refused with 400
+        self.titles = [] # titles of the embeds accepted, in the order they came
+        self.lock = threading.Lock()
+        self._thread = threading.Thread(target=self.serve_forever, name="webhook-stub", daemon=True)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/api/webhooks/1/token"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+
+class StubHandler(BaseHTTPRequestHandler):
+    # Keep-alive, like Discord
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        server = self.server
+        if server.latency:
+            time.sleep(server.latency)
+        try:
+            titles = [embed.get("title") for embed in json.loads(body).get("embeds", ())]
+        except ValueError:
+            titles = []
+        with server.lock:
+            server.requests += 1
+            if server.rejected.intersection(titles):
+                status = 400
+            else:
+                status = server.failures.pop(0) if server.failures else 204
+            if status == 204:
+                server.embeds += len(titles)
+                server.titles.extend(titles)
+        if status == 204:
+            self.send_response(204)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        data = json.dumps({"message": "stub error", "retry_after": server.retry_after}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
@@ -32,4 +32,8 @@ class GameChivalry():
 
     def ServerSay(self, text):
         self.game.openConsole()
-        self.game.consoleSend(f'serversay {text}')
\ No newline at end of file
+        self.game.consoleSend(f'serversay {text}')
+
+    def verify(self, command):
+        """Returns whether command was just run, see Chivalry.verifyCommand()."""
+        return self.game.verifyCommand(command)
\ No newline at end of file
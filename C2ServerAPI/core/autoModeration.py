@@ -0,0 +1,307 @@
+"""Rule-based moderation of player names.
+
+Rules are read from a JSON file:
+    {"rules": [
+        {"name": "Slurs", "action": "ban", "duration": 720, "reason": "Offensive name", "words": ["..."]},
+        {"name": "Admin impersonation", "action": "alert", "patterns": ["^\\\\W*admin\\\\b"]},
+        {"name": "Cheater clan", "action": "kick", "reason": "Cheating", "words": ["[xyz]"]}
+    ]}
+
+"words" are found anywhere in the name, ignoring case, common letter substitutions (0 for o, 3 for e, ...) and
+    the separators players put between letters to dodge filters. All the words of all the rules are compiled
+    into a single Aho-Corasick automaton, so the cost of checking a name depends on its length, not on the number
+    of words. "patterns" are regular expressions, matched against the name as is but ignoring case. Running
+    thousands of them on every name would be slow, so the longest literal text each pattern requires is fed
+    to a second automaton, and a pattern only runs on names containing its literal. Patterns without such a
+    literal are compiled into one alternation per action, which runs on every name, except those with
+    backreferences, named groups or global flags: they would break once numbered inside the alternation, so they
+    run on their own.
+
+When a name breaks several rules, the most severe action wins: ban, then kick, then alert. Verdicts are cached
+    per name, and names rarely change between snapshots."""
+
+import json
+import os
+import re
+from collections import namedtuple
+
+RULES_FILE = "automodrules.json"
+
+BAN = "ban"
+KICK = "kick"
+ALERT = "alert"
+SEVERITY = {ALERT: 1, KICK: 2, BAN: 3}
+
+Rule = namedtuple("Rule", ["name", "action", "reason", "duration"])
+Rule.__doc__ = """A moderation rule. duration is the ban duration in hours, only used by ban rules."""
+
+AutoModAction = namedtuple("AutoModAction", ["action", "playfab_id", "name", "rule", "matched", "server"])
+AutoModAction.__doc__ = """An action to take against a player. matched is the word or the text matched by a pattern."""
+
+_LEET = str.maketrans({"0": "o", "1": "i", "3": "e", "4": "a", "5": "s", "7": "t", "8": "b", "@": "a", "$": "s",
+                       "!": "i", "|": "l"})
+
+def normalize_name(name):
+    """Lowercases a name and undoes common letter substitutions."""
+    return name.lower().translate(_LEET)
+
+def squash_name(normalized):
+    """Drops everything but letters and digits, so "s.l-u r" reads "slur"."""
+    return "".join(c for c in normalized if c.isalnum())
+
+# Escapes matching a class of characters or a position, which only end the current literal run
+_CLASS_ESCAPES = set("bBdDsSwWAZ")
+
+def required_literal(pattern):
+    """Returns the longest run of plain characters every match of a regular expression contains, lowercased,
+        or None if there is none of at least two characters.
+
+    This is a conservative reading of the pattern: only characters outside groups and character sets count,
+        and patterns with a top-level alternation, flags or escapes other than punctuation and character
+        classes (\\x41, \\n, \\1, ...) have none.
+    """
+    if pattern.startswith("(?") and not pattern.startswith(("(?:", "(?=", "(?!", "(?<", "(?P")):
+        return None
+    runs = []
+    run = ""
+    depth = 0
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == "\\":
+            escaped = pattern[i+1:i+2]
+            if escaped.isalnum() and escaped not in _CLASS_ESCAPES:
+                # Escapes standing for other characters are not decoded here
+                return None
+            if depth == 0 and escaped and not escaped.isalnum():
+                run += escaped
+            else:
+                runs.append(run)
+                run = ""
+            i += 2
+            continue
+        if c == "[":
+            runs.append(run)
+            run = ""
+            i += 1
+            if pattern[i:i+1] == "^":
+                i += 1
+            if pattern[i:i+1] == "]":
+                i += 1
+            while i < len(pattern) and pattern[i] != "]":
+                i += 2 if pattern[i] == "\\" else 1
+        elif c in "*?{":
+            # The previous character may be missing
+            run = run[:-1]
+            runs.append(run)
+            run = ""
+            if c == "{":
+                i = pattern.find("}", i)
+                if i < 0:
+                    return None
+        elif c == "|" and depth == 0:
+            return None
+        elif c in "()|.^$+":
+            depth += (c == "(") - (c == ")")
+            runs.append(run)
+            run = ""
+        elif depth == 0:
+            run += c
+        i += 1
+    runs.append(run)
+    literal = max(runs, key=len).lower()
+    return literal if len(literal) >= 2 else None
+
+def standalone_pattern(pattern):
+    """Tells whether a regular expression must be compiled on its own rather than inside an alternation of
+        patterns: backreferences and named groups would point to the wrong group once the patterns are
+        numbered together, and global flags are only allowed at the start."""
+    if pattern.startswith("(?") and not pattern.startswith(("(?:", "(?=", "(?!", "(?<", "(?P")):
+        return True
+    for m in re.finditer(r"\\(.)|\(\?P[<=]", pattern, re.DOTALL):
+        if m.group(1) is None or m.group(1) in "123456789g":
+            return True
+    return False
+
+class AhoCorasick:
+    """Finds every occurrence of a set of words in a text in a single pass."""
+    def __init__(self, words):
+        """@param words: Iterable of (word, value); the value is returned when the word is found"""
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [()]
+        for word, value in words:
+            if not word:
+                continue
+            node = 0
+            for c in word:
+                nxt = self._goto[node].get(c)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][c] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                node = nxt
+            self._out[node] += ((word, value),)
+
+        # Breadth-first, so the failure link of a node is resolved before its children's
+        queue = list(self._goto[0].values())
+        for node in queue:
+            for c, child in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and c not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(c, 0)
+                self._fail[child] = target if target != child else 0
+                # Words ending at the failure node end here too
+                self._out[child] += self._out[self._fail[child]]
+                queue.append(child)
+
+    def __len__(self):
+        return len(self._goto)
+
+    def find(self, text):
+        """Yields (word, value) for every occurrence of a word in text."""
+        goto = self._goto
+        fail = self._fail
+        out = self._out
+        node = 0
+        for c in text:
+            while node and c not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(c, 0)
+            if out[node]:
+                yield from out[node]
+
+class AutoModerator:
+    """Checks player names against the moderation rules."""
+    def __init__(self, rules=(), cache_size=10000):
+        """@param rules: Iterable of rule dicts, in the format of the rules file"""
+        self.rules = []
+        self.cache_size = cache_size
+        self._cache = {}
+        self._alerted = set()
+        words = []
+        patterns = {action: [] for action in SEVERITY}
+        for spec in rules:
+            action = str(spec.get("action", ALERT)).lower()
+            if action not in SEVERITY:
+                print(f"[AUTOMOD] Unknown action {action!r} in rule {spec.get('name')!r}, using alert")
+                action = ALERT
+            rule = Rule(spec.get("name") or f"Rule {len(self.rules) + 1}", action,
+                        spec.get("reason") or spec.get("name") or "Forbidden name", spec.get("duration", 24))
+            self.rules.append(rule)
+            for word in spec.get("words", ()):
+                word = normalize_name(word)
+                if word:
+                    words.append((word, rule))
+            for pattern in spec.get("patterns", ()):
+                try:
+                    re.compile(pattern)
+                except re.error as e:
+                    print(f"[AUTOMOD] Skipping invalid pattern {pattern!r} of rule {rule.name!r}: {e}")
+                    continue
+                patterns[action].append((pattern, rule))
+        self.word_count = len(words)
+        self.pattern_count = sum(len(p) for p in patterns.values())
+        self._words = AhoCorasick(words)
+
+        # Patterns with a required literal run only when the literal is found
+        literals = []
+        # Others are tried on every name: one alternation per action, each pattern in its own named group to
+        # tell which one matched, or on their own when they cannot be part of an alternation
+        self._pattern_groups = {}
+        self._standalone = []
+        for action, action_patterns in patterns.items():
+            rules_by_group = {}
+            alternatives = []
+            for pattern, rule in action_patterns:
+                literal = required_literal(pattern)
+                if literal is not None:
+                    literals.append((literal, (re.compile(pattern, re.IGNORECASE), rule)))
+                    continue
+                if standalone_pattern(pattern):
+                    self._standalone.append((re.compile(pattern, re.IGNORECASE), rule))
+                    continue
+                group = f"automod{len(alternatives)}"
+                rules_by_group[group] = rule
+                alternatives.append(f"(?P<{group}>{pattern})")
+            if alternatives:
+                self._pattern_groups[action] = (re.compile("|".join(alternatives), re.IGNORECASE), rules_by_group)
+        self._literals = AhoCorasick(literals)
+
+    @classmethod
+    def from_file(cls, path=RULES_FILE):
+        """Loads the rules file. A missing file means no rules."""
+        if not os.path.exists(path):
+            return cls()
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(data.get("rules", ()))
+
+    def __bool__(self):
+        return bool(self.word_count or self.pattern_count)
+
+    def match(self, name):
+        """Returns (Rule, matched text) of the most severe rule a name breaks, or None."""
+        try:
+            return self._cache[name]
+        except KeyError:
+            pass
+        best = None
+        normalized = normalize_name(name)
+        for text in (normalized, squash_name(normalized)):
+            for word, rule in self._words.find(text):
+                if best is None or SEVERITY[rule.action] > SEVERITY[best[0].action]:
+                    best = (rule, word)
+
+        def beats(rule):
+            return best is None or SEVERITY[rule.action] > SEVERITY[best[0].action]
+
+        lowered = name.lower()
+        for _, (regex, rule) in self._literals.find(lowered):
+            if beats(rule):
+                m = regex.search(name)
+                if m:
+                    best = (rule, m.group(0))
+        for regex, rule in self._standalone:
+            if beats(rule):
+                m = regex.search(name)
+                if m:
+                    best = (rule, m.group(0))
+        for action, (regex, rules_by_group) in self._pattern_groups.items():
+            if best is not None and SEVERITY[best[0].action] >= SEVERITY[action]:
+                continue
+            m = regex.search(name)
+            if m:
+                group = next(g for g, value in m.groupdict().items() if value is not None and g in rules_by_group)
+                best = (rules_by_group[group], m.group(group))
+
+        if len(self._cache) >= self.cache_size:
+            self._cache.clear()
+        self._cache[name] = best
+        return best
+
+    def evaluate(self, players, server=None):
+        """Checks players against the rules.
+
+        Alerts are only raised once per player, name and rule, kicks and bans every time the player is checked.
+
+        @param players: Iterable of (playfab_id, name)
+        @param server: Server key copied into the actions
+        @returns A list of AutoModAction, in the order of players
+        """
+        actions = []
+        for playfab_id, name in players:
+            found = self.match(name)
+            if found is None:
+                continue
+            rule, matched = found
+            if rule.action == ALERT:
+                key = (playfab_id, name, rule.name)
+                if key in self._alerted:
+                    continue
+                self._alerted.add(key)
+            actions.append(AutoModAction(rule.action, playfab_id, name, rule, matched, server))
+        return actions
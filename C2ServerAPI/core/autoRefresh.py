@@ -0,0 +1,88 @@
+"""Scheduling of automatic player list refreshes.
+
+Every refresh types listplayers into the game and takes focus, so refreshes should be as rare as possible while
+    still catching joins and leaves. AdaptiveRefreshPolicy shortens the interval while the roster is changing,
+    lengthens it while it is stable, and backs off after failed refreshes. TypingMonitor tells when the moderator
+    is typing, so a refresh does not cut into a chat message or a console command."""
+
+from time import monotonic
+
+# Virtual key codes of the keys used to type text: backspace, enter, space, digits, letters, punctuation
+TYPING_KEYS = (
+    [0x08, 0x0D, 0x20]
+    + list(range(0x30, 0x3A))
+    + list(range(0x41, 0x5B))
+    + list(range(0xBA, 0xC1))
+    + list(range(0xDB, 0xE0))
+)
+
+class AdaptiveRefreshPolicy:
+    """Computes the delay before the next automatic refresh."""
+    def __init__(self, min_interval=15, max_interval=120, start_interval=30, max_backoff=300,
+                 speedup=0.5, slowdown=1.5):
+        """All durations are in seconds.
+
+        @param speedup: Interval multiplier after a refresh that saw players join or leave
+        @param slowdown: Interval multiplier after a refresh where nothing changed
+        @param max_backoff: Longest delay after consecutive failures
+        """
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.max_backoff = max_backoff
+        self.speedup = speedup
+        self.slowdown = slowdown
+        self.interval = start_interval
+        self.failures = 0
+
+    def on_success(self, churn):
+        """Record a successful refresh.
+
+        @param churn: Number of joins and leaves it revealed
+        """
+        self.failures = 0
+        factor = self.speedup if churn > 0 else self.slowdown
+        self.interval = min(self.max_interval, max(self.min_interval, self.interval * factor))
+
+    def on_failure(self):
+        """Record a refresh that did not produce a player list."""
+        self.failures += 1
+
+    def next_delay(self):
+        """Seconds to wait before the next refresh."""
+        if self.failures:
+            return min(self.max_backoff, self.interval * 2 ** self.failures)
+        return self.interval
+
+class TypingMonitor:
+    """Detects recent keyboard activity by polling the async key state of typing keys.
+
+    poll() should be called a few times per second. Keys pressed by the program itself (see ignore_for()) are
+        not counted.
+    """
+    def __init__(self, quiet_period=3.0, clock=monotonic):
+        """@param quiet_period: Seconds without a key press before the moderator is considered done typing"""
+        self.quiet_period = quiet_period
+        self.clock = clock
+        self.last_keypress = None
+        self._ignore_until = 0
+        try:
+            import ctypes
+            self._get_key_state = ctypes.windll.user32.GetAsyncKeyState
+        except Exception:
+            self._get_key_state = None
+
+    def ignore_for(self, seconds):
+        """Ignore key presses for a while, e.g. while the program types a command itself."""
+        self._ignore_until = max(self._ignore_until, self.clock() + seconds)
+
+    def poll(self):
+        if self._get_key_state is None:
+            return
+        # Bit 0x8000: key is down, bit 0x0001: key was pressed since the previous call
+        pressed = any(self._get_key_state(vk) & 0x8001 for vk in TYPING_KEYS)
+        now = self.clock()
+        if pressed and now >= self._ignore_until:
+            self.last_keypress = now
+
+    def is_typing(self):
+        return self.last_keypress is not None and self.clock() - self.last_keypress < self.quiet_period
@@ -0,0 +1,134 @@
+"""Screen regions used by the Chivalry OCR readers, resolved for the current window size and DPI.
+
+Every region is defined relative to the game's client area. Regions that belong to the HUD are laid out in the
+    16:9 area centered in the window, which is where the game draws its HUD on ultrawide displays. The console
+    stretches over the whole width.
+
+Pixel rectangles are resolved once per resolution profile (client size and DPI) and kept in memory. Rectangles
+    corrected by hand in the calibration dialog are stored per profile in the calibration file and take precedence
+    over the computed ones."""
+
+import json
+import os
+
+CALIBRATION_FILE = "roicalibration.json"
+
+HUD_ASPECT = 16/9
+
+# name: (anchor, (left, top, right, bottom))
+# each coordinate is (fraction of the anchor area, pixel offset). "window" anchors use the full client area,
+# "hud" anchors use the centered 16:9 area.
+REGIONS = {
+    #everything up to the horizontal line separating the command line input
+    'console_output': ("window", ((0, 0), (0, 0), (1, 0), (47/64, -2))),
+    #start of the command line input
+    'console_prompt': ("window", ((0, 0), (47/64, 2), (0.02, 0), (49/64, -2))),
+    'timer': ("hud", ((0.45, 0), (0.08, 0), (0.55, 0), (0.13, 0))),
+    'scoreboard': ("hud", ((0.75, 0), (0.15, 0), (0.95, 0), (0.70, 0))),
+    #"GAME END" and "VICTOR" overlays
+    'game_end': ("hud", ((0.3, 0), (0.75, 0), (0.7, 0), (0.9, 0))),
+    #exit game button of the main menu
+    'main_menu_exit': ("hud", ((0.072, 0), (0.94, 0), (0.13, 0), (0.97, 0))),
+}
+
+def profileKey(size, dpi):
+    """Returns the name of the resolution profile for a client area size and DPI, e.g. "2560x1080@96"."""
+    return f"{size[0]}x{size[1]}@{dpi}"
+
+def anchorArea(anchor, size):
+    """Returns the (left, top, width, height) area of the client area a region anchor refers to."""
+    width, height = size
+    if anchor == "hud" and width > height*HUD_ASPECT:
+        hudWidth = round(height*HUD_ASPECT)
+        return ((width - hudWidth)//2, 0, hudWidth, height)
+    return (0, 0, width, height)
+
+def computeRegion(name, size):
+    """Computes the default pixel rectangle of a named region for a client area size.
+
+    @returns A (left, top, right, bottom) tuple of ints, clamped to the client area
+    """
+    anchor, terms = REGIONS[name]
+    x, y, w, h = anchorArea(anchor, size)
+    (l, lo), (t, to), (r, ro), (b, bo) = terms
+    box = (x + l*w + lo, y + t*h + to, x + r*w + ro, y + b*h + bo)
+    left, top, right, bottom = (int(round(v)) for v in box)
+    return (max(0, left), max(0, top), min(size[0], right), min(size[1], bottom))
+
+class RegionCalibration:
+    """Resolves named regions to pixel rectangles, caching them per resolution profile."""
+    def __init__(self, path=CALIBRATION_FILE):
+        """@param path: File storing the rectangles corrected by hand, or None to keep them in memory only"""
+        self.path = path
+        self._profiles = {}
+        self._overrides = self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return {profile: {name: tuple(rect) for name, rect in rects.items() if name in REGIONS}
+                    for profile, rects in data.items()}
+        except Exception as e:
+            print(f"[CALIBRATION] Could not read {self.path}: {e}")
+            return {}
+
+    def _save(self):
+        if not self.path:
+            return True
+        try:
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump({p: {n: list(r) for n, r in rects.items()} for p, rects in self._overrides.items()}, f, indent=2)
+            return True
+        except Exception as e:
+            print(f"[CALIBRATION] Could not write {self.path}: {e}")
+            return False
+
+    def regions(self, size, dpi=96):
+        """Returns a dict of every region name to its pixel rectangle for this resolution profile."""
+        key = profileKey(size, dpi)
+        rects = self._profiles.get(key)
+        if rects is None:
+            rects = {name: computeRegion(name, size) for name in REGIONS}
+            rects.update(self._overrides.get(key, {}))
+            self._profiles[key] = rects
+        return rects
+
+    def region(self, name, size, dpi=96):
+        """Returns the (left, top, right, bottom) pixel rectangle of a named region."""
+        return self.regions(size, dpi)[name]
+
+    def isCalibrated(self, name, size, dpi=96):
+        """Returns true if the rectangle of a region was corrected by hand for this resolution profile."""
+        return name in self._overrides.get(profileKey(size, dpi), {})
+
+    def store(self, size, dpi, rects):
+        """Stores corrected rectangles for a resolution profile.
+
+        Only rectangles that differ from the computed ones are stored, so that regions the moderator did not touch
+            keep following the defaults of REGIONS.
+
+        @param rects: dict of region name to (left, top, right, bottom) pixel rectangle
+        @returns True if the rectangles were persisted
+        """
+        key = profileKey(size, dpi)
+        overrides = self._overrides.setdefault(key, {})
+        for name, rect in rects.items():
+            rect = tuple(int(v) for v in rect)
+            if rect == computeRegion(name, size):
+                overrides.pop(name, None)
+            else:
+                overrides[name] = rect
+        if not overrides:
+            del self._overrides[key]
+        self._profiles.pop(key, None)
+        return self._save()
+
+    def reset(self, size, dpi):
+        """Drops the corrected rectangles of a resolution profile, going back to the computed ones."""
+        key = profileKey(size, dpi)
+        self._overrides.pop(key, None)
+        self._profiles.pop(key, None)
+        return self._save()
@@ -0,0 +1,95 @@
+"""Single point of entry for player lists copied to the clipboard by the listplayers command.
+
+Windows increments a clipboard sequence number every time the clipboard content changes. The ingestor notes
+    that number when listplayers is issued and only reads and parses the clipboard once it has moved, so the
+    clipboard is read and parsed exactly once per refresh, whichever of the clipboard notification or the
+    fallback timer gets there first. The parsed snapshot is then handed to every subscriber."""
+
+import time
+from collections import namedtuple
+
+import pyperclip
+
+PlayerListSnapshot = namedtuple("PlayerListSnapshot", ["text", "roster", "sequence", "timestamp"])
+
+def getClipboardSequenceNumber():
+    """Returns the Windows clipboard sequence number, or None where it is not available."""
+    try:
+        import ctypes
+        return ctypes.windll.user32.GetClipboardSequenceNumber()
+    except Exception:
+        return None
+
+def readClipboard():
+    try:
+        return pyperclip.paste() or ""
+    except Exception:
+        return ""
+
+class PlayerListIngestor:
+    """Reads listplayers output from the clipboard once per refresh and publishes it to subscribers."""
+    def __init__(self, parser, read=readClipboard, sequence=getClipboardSequenceNumber):
+        """@param parser: Called with the clipboard text, returns the parsed roster (see listplayers.parse_listplayers)
+        @param read: Returns the current clipboard text
+        @param sequence: Returns the current clipboard sequence number, or None if unknown
+        """
+        self.parser = parser
+        self.read = read
+        self.sequence = sequence
+        self.latest = None
+        self._subscribers = []
+        self._awaiting = False
+        self._issuedSequence = None
+        self._checkedSequence = None
+
+    @property
+    def awaiting(self):
+        """True between expect() and the snapshot that answers it."""
+        return self._awaiting
+
+    def subscribe(self, callback):
+        """Registers callback to be called with every new PlayerListSnapshot."""
+        if callback not in self._subscribers:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def expect(self):
+        """Must be called right before listplayers is issued. Clipboard changes before this are ignored."""
+        self._issuedSequence = self.sequence()
+        self._checkedSequence = self._issuedSequence
+        self._awaiting = True
+
+    def cancel(self):
+        """Stop waiting for a player list, e.g. when issuing listplayers failed."""
+        self._awaiting = False
+
+    def poll(self):
+        """Checks the clipboard for the awaited player list.
+
+        Cheap to call often: the clipboard is only read when its sequence number changed since the last check.
+
+        @returns The new PlayerListSnapshot, or None if there is nothing new
+        """
+        if not self._awaiting:
+            return None
+        sequence = self.sequence()
+        if sequence is not None and sequence == self._checkedSequence:
+            return None
+        self._checkedSequence = sequence
+
+        text = self.read()
+        if " - " not in text:
+            #something else was copied, keep waiting for listplayers
+            return None
+        snapshot = PlayerListSnapshot(text, self.parser(text), sequence, time.time())
+        self._awaiting = False
+        self.latest = snapshot
+        for callback in list(self._subscribers):
+            try:
+                callback(snapshot)
+            except Exception as e:
+                print(f"[PLAYERS] Player list subscriber failed: {e}")
+        return snapshot
@@ -0,0 +1,432 @@
+"""Local command API, letting other programs (a Discord bot, tournament tools) drive the moderation panel.
+
+The server only listens on localhost, and every request must carry the token of the API config file, either as
+    an "Authorization: Bearer <token>" header or, for WebSocket clients that cannot set headers, as a "token"
+    query parameter. The config file is created with a random token the first time the API is enabled.
+
+    GET  /v1/health     {"ok": true, "pending": <commands not finished yet>}
+    POST /v1/commands   One command as a JSON object, e.g. {"command": "kick", "playfab_id": "...",
+                        "reason": "..."}. The response streams the progress of the command as JSON lines, the
+                        last one with its result.
+    GET  /v1/ws         WebSocket. Every text message is a command, with an optional "id" of the client's
+                        choosing; the progress of every command is sent back tagged with its id, as it happens.
+
+Progress events: {"id": ..., "status": "queued" | "running" | "done" | "failed", "result": ..., "error": ...}
+
+Commands are not run by the server: every valid one is handed to the request callback as a CommandRequest, and
+    the panel runs them one at a time through the same console pipeline as its own buttons, reporting back
+    through CommandRequest.running() and finish(). The server runs an asyncio event loop on its own thread, which
+    only parses, checks and streams, so any number of clients can wait on their commands without holding up the
+    interface."""
+
+import asyncio
+import base64
+import hashlib
+import hmac
+import itertools
+import json
+import os
+import re
+import secrets
+import threading
+from urllib.parse import parse_qs, urlsplit
+
+API_CONFIG_FILE = "commandapi.json"
+DEFAULT_PORT = 8765
+
+# Largest request body or WebSocket message, in bytes
+MAX_BODY = 64 * 1024
+
+# Commands accepted but not finished yet, from every client, above which new ones are refused
+MAX_PENDING = 100
+
+# Seconds a client has to send the headers of its request
+HEADER_TIMEOUT = 10
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# Arguments of every command: name -> (type, required)
+COMMANDS = {
+    "kick": {"playfab_id": (str, True), "reason": (str, True), "name": (str, False)},
+    "ban": {"playfab_id": (str, True), "duration": (int, True), "reason": (str, True), "name": (str, False)},
+    "adminsay": {"message": (str, True)},
+    "serversay": {"message": (str, True)},
+    "addtime": {"minutes": (int, True)},
+    "players": {},
+}
+
+# Arguments are typed into the game console: a line break or any other control character would end the command
+# early, and the console runs what follows a | as a command of its own
+_CONTROL_CHARACTERS = re.compile(r"[\x00-\x1f\x7f|]")
+_PLAYFAB_ID = re.compile(r"[0-9A-Za-z]{1,64}")
+
+_WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+_WS_CONTINUATION, _WS_TEXT, _WS_BINARY, _WS_CLOSE, _WS_PING, _WS_PONG = 0x0, 0x1, 0x2, 0x8, 0x9, 0xA
+
+_REASONS = {
+    200: "OK", 400: "Bad Request", 401: "Unauthorized", 404: "Not Found", 405: "Method Not Allowed",
+    413: "Payload Too Large", 503: "Service Unavailable",
+}
+
+class CommandError(ValueError):
+    """A command that cannot be run as sent."""
+
+def validate_command(data):
+    """Checks a command sent by a client.
+
+    @param data: Decoded JSON of the command
+    @returns (command name, dict of its arguments)
+    @raises CommandError if the command is unknown or its arguments are missing or invalid
+    """
+    if not isinstance(data, dict):
+        raise CommandError("a command must be a JSON object")
+    command = data.get("command")
+    if command not in COMMANDS:
+        raise CommandError(f"unknown command {command!r}, expected one of {', '.join(COMMANDS)}")
+    args = {}
+    for name, (kind, required) in COMMANDS[command].items():
+        value = data.get(name)
+        if value is None:
+            if required:
+                raise CommandError(f"{command} needs {name}")
+            continue
+        if kind is int:
+            # bool is an int to Python, not to the clients
+            if not isinstance(value, int) or isinstance(value, bool) or value <= 0:
+                raise CommandError(f"{name} must be a positive integer")
+        else:
+            if not isinstance(value, str) or not value.strip():
+                raise CommandError(f"{name} must be a non-empty string")
+            if _CONTROL_CHARACTERS.search(value):
+                raise CommandError(f"{name} must not contain |, line breaks or control characters")
+            value = value.strip()
+        args[name] = value
+    if "playfab_id" in args and not _PLAYFAB_ID.fullmatch(args["playfab_id"]):
+        raise CommandError("playfab_id must be a PlayFab ID")
+    return command, args
+
+def load_api_config(path=API_CONFIG_FILE):
+    """Reads the API config file, creating it with a new random token if it does not exist.
+
+    @returns dict with "port" and "token"
+    """
+    config = {}
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+    if not config.get("token") or "port" not in config:
+        config.setdefault("port", DEFAULT_PORT)
+        if not config.get("token"):
+            config["token"] = secrets.token_urlsafe(32)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(config, f, indent=2)
+    return config
+
+class CommandRequest:
+    """A command accepted from a client, waiting to be run by the panel.
+
+    running() and finish() may be called from any thread; their events reach the client through the server's
+        event loop."""
+    _ids = itertools.count(1)
+
+    def __init__(self, command, args, request_id, publish):
+        """@param request_id: Id of the client for the command, or None to number it
+        @param publish: Called with every progress event
+        """
+        self.command = command
+        self.args = args
+        self.id = request_id if request_id is not None else next(self._ids)
+        self._publish = publish
+        self._finished = False
+
+    def __repr__(self):
+        return f"CommandRequest({self.id!r}, {self.command}, {self.args})"
+
+    def running(self):
+        """Tells the client the command is being run."""
+        if not self._finished:
+            self._publish({"id": self.id, "status": RUNNING})
+
+    def finish(self, result=None, error=None):
+        """Tells the client the command is over, with its result, or as failed if error is given. Only the first
+            call counts."""
+        if self._finished:
+            return
+        self._finished = True
+        if error is not None:
+            self._publish({"id": self.id, "status": FAILED, "error": str(error)})
+        else:
+            self._publish({"id": self.id, "status": DONE, "result": result})
+
+class CommandApiServer:
+    """HTTP and WebSocket server of the command API, on a thread of its own."""
+    def __init__(self, on_request, token, host="127.0.0.1", port=DEFAULT_PORT, max_pending=MAX_PENDING):
+        """@param on_request: Called with every accepted CommandRequest, from the server thread. It must return
+            quickly, and finish the request later, from any thread
+        @param token: Secret clients must send
+        """
+        self.on_request = on_request
+        self.token = token
+        self.host = host
+        self.port = port
+        self.max_pending = max_pending
+        self.pending = 0
+        self._loop = None
+        self._server = None
+        self._thread = None
+        self._started = threading.Event()
+        self._error = None
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def start(self):
+        """Starts listening. @raises OSError if the port cannot be used."""
+        if self._thread is not None:
+            return
+        self._started.clear()
+        self._error = None
+        self._thread = threading.Thread(target=self._run, name="CommandApi", daemon=True)
+        self._thread.start()
+        self._started.wait()
+        if self._error is not None:
+            self._thread.join()
+            self._thread = None
+            raise self._error
+
+    def stop(self, timeout=5.0):
+        """Stops listening and closes every connection. Commands already handed to the panel still run."""
+        if self._thread is None:
+            return
+        self._loop.call_soon_threadsafe(self._shutdown)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self):
+        loop = self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            self._server = loop.run_until_complete(
+                asyncio.start_server(self._handle_connection, self.host, self.port, limit=MAX_BODY))
+        except OSError as e:
+            self._error = e
+            loop.close()
+            self._started.set()
+            return
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._started.set()
+        try:
+            loop.run_forever()
+        finally:
+            tasks = asyncio.all_tasks(loop)
+            for task in tasks:
+                task.cancel()
+            loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            loop.close()
+
+    def _shutdown(self):
+        self._server.close()
+        self._loop.stop()
+
+    def _authorized(self, headers, query):
+        token = ""
+        authorization = headers.get("authorization", "")
+        if authorization.lower().startswith("bearer "):
+            token = authorization[7:].strip()
+        elif query.get("token"):
+            token = query["token"][0]
+        return hmac.compare_digest(token.encode(), self.token.encode())
+
+    def _submit(self, data, events):
+        """Validates a command and hands it to the panel.
+
+        @param events: asyncio.Queue receiving the progress events of the command
+        @returns (HTTP status, None) if accepted, else (HTTP status, error message)
+        """
+        request_id = data.get("id") if isinstance(data, dict) else None
+        if request_id is not None and not isinstance(request_id, (str, int)):
+            return 400, "id must be a string or an integer"
+        try:
+            command, args = validate_command(data)
+        except CommandError as e:
+            return 400, str(e)
+        if self.pending >= self.max_pending:
+            return 503, f"too many commands waiting ({self.pending}), try again later"
+        self.pending += 1
+        request = CommandRequest(command, args, request_id, lambda event: self._publish(events, event))
+        events.put_nowait({"id": request.id, "status": QUEUED})
+        try:
+            self.on_request(request)
+        except Exception as e:
+            request.finish(error=e)
+        return 200, None
+
+    def _publish(self, events, event):
+        def deliver():
+            if event["status"] in (DONE, FAILED):
+                self.pending -= 1
+            events.put_nowait(event)
+        try:
+            self._loop.call_soon_threadsafe(deliver)
+        except RuntimeError:
+            # The server was stopped, nobody is listening anymore
+            pass
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            try:
+                head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), HEADER_TIMEOUT)
+                method, target, headers = _parse_head(head)
+            except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError, ValueError):
+                return
+            url = urlsplit(target)
+            if not self._authorized(headers, parse_qs(url.query)):
+                await _respond(writer, 401, {"error": "missing or wrong token"})
+            elif url.path == "/v1/health":
+                await _respond(writer, 200, {"ok": True, "pending": self.pending})
+            elif url.path == "/v1/commands":
+                if method != "POST":
+                    await _respond(writer, 405, {"error": "use POST"})
+                else:
+                    await self._handle_command(reader, writer, headers)
+            elif url.path == "/v1/ws":
+                await self._handle_websocket(reader, writer, headers)
+            else:
+                await _respond(writer, 404, {"error": f"no endpoint {url.path}"})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _handle_command(self, reader, writer, headers):
+        try:
+            length = int(headers.get("content-length", ""))
+        except ValueError:
+            await _respond(writer, 400, {"error": "missing Content-Length"})
+            return
+        if length > MAX_BODY:
+            await _respond(writer, 413, {"error": f"commands are limited to {MAX_BODY} bytes"})
+            return
+        try:
+            data = json.loads(await reader.readexactly(length))
+        except ValueError:
+            await _respond(writer, 400, {"error": "the body is not valid JSON"})
+            return
+        events = asyncio.Queue()
+        status, error = self._submit(data, events)
+        if error is not None:
+            await _respond(writer, status, {"error": error})
+            return
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\n"
+                     b"Transfer-Encoding: chunked\r\nConnection: close\r\n\r\n")
+        while True:
+            event = await events.get()
+            line = json.dumps(event).encode() + b"\n"
+            writer.write(b"%x\r\n%s\r\n" % (len(line), line))
+            await writer.drain()
+            if event["status"] in (DONE, FAILED):
+                break
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    async def _handle_websocket(self, reader, writer, headers):
+        key = headers.get("sec-websocket-key")
+        if headers.get("upgrade", "").lower() != "websocket" or not key:
+            await _respond(writer, 400, {"error": "expected a WebSocket upgrade"})
+            return
+        accept = base64.b64encode(hashlib.sha1((key + _WEBSOCKET_GUID).encode()).digest())
+        writer.write(b"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                     b"Sec-WebSocket-Accept: " + accept + b"\r\n\r\n")
+        await writer.drain()
+
+        # Every command of the connection publishes into the same queue, sent in order by one task
+        events = asyncio.Queue()
+        async def send_events():
+            while True:
+                event = await events.get()
+                writer.write(_websocket_frame(_WS_TEXT, json.dumps(event).encode()))
+                await writer.drain()
+        sender = asyncio.ensure_future(send_events())
+        try:
+            message = bytearray()
+            while True:
+                fin, opcode, payload = await _read_websocket_frame(reader)
+                if opcode == _WS_CLOSE:
+                    writer.write(_websocket_frame(_WS_CLOSE, payload[:2]))
+                    await writer.drain()
+                    return
+                if opcode == _WS_PING:
+                    writer.write(_websocket_frame(_WS_PONG, payload))
+                    continue
+                if opcode == _WS_PONG:
+                    continue
+                message += payload
+                if len(message) > MAX_BODY:
+                    writer.write(_websocket_frame(_WS_CLOSE, (1009).to_bytes(2, "big")))
+                    return
+                if not fin:
+                    continue
+                try:
+                    data = json.loads(bytes(message))
+                except ValueError:
+                    data = None
+                message = bytearray()
+                if data is None:
+                    events.put_nowait({"id": None, "status": FAILED, "error": "the message is not valid JSON"})
+                    continue
+                _, error = self._submit(data, events)
+                if error is not None:
+                    events.put_nowait({"id": data.get("id") if isinstance(data, dict) else None,
+                                       "status": FAILED, "error": error})
+        finally:
+            sender.cancel()
+
+def _parse_head(head):
+    """Parses the request line and headers of an HTTP request. @raises ValueError if malformed"""
+    lines = head.decode("latin-1").split("\r\n")
+    method, target, _ = lines[0].split(" ", 2)
+    headers = {}
+    for line in lines[1:]:
+        if line:
+            name, value = line.split(":", 1)
+            headers[name.strip().lower()] = value.strip()
+    return method, target, headers
+
+async def _respond(writer, status, body):
+    data = json.dumps(body).encode()
+    writer.write(f"HTTP/1.1 {status} {_REASONS[status]}\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(data)}\r\nConnection: close\r\n\r\n".encode() + data)
+    await writer.drain()
+
+async def _read_websocket_frame(reader):
+    """Reads one WebSocket frame. @returns (fin, opcode, unmasked payload)"""
+    first, second = await reader.readexactly(2)
+    length = second & 0x7F
+    if length == 126:
+        length = int.from_bytes(await reader.readexactly(2), "big")
+    elif length == 127:
+        length = int.from_bytes(await reader.readexactly(8), "big")
+    if length > MAX_BODY:
+        raise ConnectionError("WebSocket frame too large")
+    mask = await reader.readexactly(4) if second & 0x80 else None
+    payload = await reader.readexactly(length)
+    if mask is not None and length:
+        # XOR the whole payload at once, as one big integer
+        key = (mask * (length // 4 + 1))[:length]
+        payload = (int.from_bytes(payload, "big") ^ int.from_bytes(key, "big")).to_bytes(length, "big")
+    return bool(first & 0x80), first & 0x0F, payload
+
+def _websocket_frame(opcode, payload):
+    """Builds an unmasked, unfragmented WebSocket frame, as sent by servers."""
+    length = len(payload)
+    if length < 126:
+        header = bytes((0x80 | opcode, length))
+    elif length < 1 << 16:
+        header = bytes((0x80 | opcode, 126)) + length.to_bytes(2, "big")
+    else:
+        header = bytes((0x80 | opcode, 127)) + length.to_bytes(8, "big")
+    return header + payload
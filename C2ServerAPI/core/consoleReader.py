@@ -0,0 +1,141 @@
+"""Incremental reader for the chivalry console output.
+
+The extended console only ever grows at the bottom and scrolls up, so two consecutive captures mostly show the
+    same lines. ConsoleScrollback keeps a reconstructed scrollback buffer, matches every new capture against it
+    line by line using pixel digests, and only runs OCR on the lines that were not there before."""
+
+import re
+
+from . import ocrLib
+
+#command run lines take the form `>>> command <<<` in the console output
+_ECHO_STRIP = re.compile(r"[\s<>]+")
+
+def commandKey(text):
+    """Normalizes a command or a command echo line for lookups.
+
+    Spaces and the >>> / <<< markers are removed because OCR does not reliably detect them.
+    """
+    return _ECHO_STRIP.sub("", text)
+
+def isCommandEcho(line):
+    """Returns true if an OCR'd console line looks like the echo of a command that was run.
+
+    We cant rely on ALL of the >>> / <<< characters to be correctly OCR'd. Here, we rely on at least two
+        consecutive of both.
+    """
+    return ">>" in line and "<<" in line
+
+class ConsoleScrollback:
+    """Reconstructed scrollback of the in-game console, fed with successive console screenshots.
+
+    Lines are stored in the order they appeared in the console. Every line is identified by the digest of its
+        pixel strip, which is what lets a new capture be aligned against the buffer without any OCR.
+    """
+    def __init__(self, maxLines=2000):
+        """@param maxLines: How many lines to keep before the oldest ones are dropped"""
+        self.maxLines = maxLines
+        self.clear()
+
+    def clear(self):
+        """Forget everything read so far."""
+        self._lines = []
+        self._digests = []
+        self._offset = 0 #absolute index of self._lines[0]
+        self._commandIndex = {}
+
+    def __len__(self):
+        return len(self._lines)
+
+    @property
+    def lines(self):
+        """The non-empty lines of the scrollback, oldest first."""
+        return [s for s in self._lines if s]
+
+    def _overlap(self, digests):
+        """Returns how many of the leading strips of a capture are already the trailing lines of the buffer."""
+        buffered = self._digests
+        n = min(len(digests), len(buffered))
+        if n == 0:
+            return 0
+        first = digests[0]
+        #the earliest match in the tail is the longest overlap
+        for start in range(len(buffered) - n, len(buffered)):
+            if buffered[start] != first:
+                continue
+            length = len(buffered) - start
+            if buffered[start:] == digests[:length]:
+                return length
+        return 0
+
+    def update(self, image):
+        """Reads a new capture of the console and appends the lines that were not seen before.
+
+        @param image: PIL image of the console output area, already processed to isolate the text
+        @returns The list of newly read lines
+        """
+        bands = ocrLib.rowBands(image)
+        width = image.size[0]
+        strips = [image.crop((0, top, width, bottom)) for top, bottom in bands]
+        digests = [ocrLib.imageDigest(s) for s in strips]
+
+        known = self._overlap(digests)
+        newLines = []
+        for strip, digest in zip(strips[known:], digests[known:]):
+            text = ocrLib.imageToString(ocrLib.padImage(strip), config=ocrLib.SINGLE_LINE_CONFIG).strip()
+            self._append(text, digest)
+            newLines.append(text)
+        self._trim()
+        return [s for s in newLines if s]
+
+    def _append(self, text, digest):
+        index = self._offset + len(self._lines)
+        self._lines.append(text)
+        self._digests.append(digest)
+        if isCommandEcho(text):
+            #later runs of the same command replace earlier ones
+            self._commandIndex[commandKey(text)] = index
+
+    def _trim(self):
+        excess = len(self._lines) - self.maxLines
+        if excess <= 0:
+            return
+        del self._lines[:excess]
+        del self._digests[:excess]
+        self._offset += excess
+        self._commandIndex = {k: i for k, i in self._commandIndex.items() if i >= self._offset}
+
+    def findCommand(self, command):
+        """Returns the absolute index of the most recent echo line of command, or None.
+
+        Exact matches are a dictionary hit. If OCR picked up stray characters around the echo, the indexed echo
+            lines (and only those) are searched for one containing the command.
+        """
+        key = commandKey(command)
+        if not key:
+            return None
+        index = self._commandIndex.get(key)
+        if index is not None:
+            return index
+        candidates = [i for k, i in self._commandIndex.items() if key in k]
+        return max(candidates) if candidates else None
+
+    def hasCommand(self, command):
+        """Returns true if the echo of command has been seen in the console."""
+        return self.findCommand(command) is not None
+
+    def commandOutput(self, command, lines):
+        """Returns the output of a command that was read from the console.
+
+        @param command: A string containing the command that was run, exactly as it was entered
+        @param lines: How many lines of it's output to return. (this depends on the specific command)
+        @returns A list of up to `lines` lines following the command echo, or None
+        """
+        index = self.findCommand(command)
+        if index is None:
+            return None
+        start = index - self._offset + 1
+        output = [s for s in self._lines[start:] if s]
+        if not output:
+            return None
+        return output[:lines]
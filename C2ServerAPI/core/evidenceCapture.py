@@ -0,0 +1,87 @@
+"""Continuous capture of the game window, kept as evidence for ban notifications.
+
+EvidenceRecorder grabs the Chivalry 2 window every few seconds in a background thread, without giving the game
+    focus, and keeps the latest frames in an EvidenceBuffer. A ban then takes its evidence from the buffer
+    instead of capturing the screen: a capture would delay the ban command, and once the console is open to type
+    it, would show the console rather than the game.
+
+Frames are downscaled when captured, and kept as images: they are only encoded when a ban needs them."""
+
+import threading
+from collections import deque
+from time import time
+
+class EvidenceBuffer:
+    """Ring buffer of the latest (timestamp, PIL image) frames of the game. Safe to use from several threads."""
+    def __init__(self, seconds=10.0):
+        """@param seconds: Frames older than this, relative to the latest one, are dropped"""
+        self.seconds = seconds
+        self._frames = deque()
+        self._lock = threading.Lock()
+
+    def add(self, image, timestamp=None):
+        timestamp = time() if timestamp is None else timestamp
+        with self._lock:
+            self._frames.append((timestamp, image))
+            while self._frames and self._frames[0][0] < timestamp - self.seconds:
+                self._frames.popleft()
+
+    def frames(self, seconds=None, maxStaleness=None):
+        """Returns the frames of the last seconds, oldest first.
+
+        @param seconds: Length of the window, up to the length of the buffer; only the latest frame if 0
+        @param maxStaleness: Nothing is returned if the latest frame is older than this, e.g. when the recording
+            stopped
+        """
+        with self._lock:
+            frames = list(self._frames)
+        if not frames or (maxStaleness is not None and frames[-1][0] < time() - maxStaleness):
+            return []
+        if seconds == 0:
+            return frames[-1:]
+        if seconds is not None:
+            frames = [f for f in frames if f[0] >= frames[-1][0] - seconds]
+        return frames
+
+    def clear(self):
+        with self._lock:
+            self._frames.clear()
+
+class EvidenceRecorder(threading.Thread):
+    """Background thread capturing the game window into an EvidenceBuffer."""
+    def __init__(self, game, buffer, interval=2.0, maxWidth=1280):
+        """@param game: Chivalry instance to capture
+        @param interval: Seconds between two captures
+        @param maxWidth: Frames wider than this are downscaled, to bound the memory used by the buffer
+        """
+        super().__init__(name="EvidenceRecorder", daemon=True)
+        self.game = game
+        self.buffer = buffer
+        self.interval = interval
+        self.maxWidth = maxWidth
+        self._stopEvent = threading.Event()
+        self._failures = 0
+
+    def stop(self):
+        """Asks the thread to exit after the current capture."""
+        self._stopEvent.set()
+
+    def run(self):
+        self.capture()
+        while not self._stopEvent.wait(self.interval):
+            self.capture()
+
+    def capture(self):
+        """Captures one frame into the buffer."""
+        try:
+            image = self.game.getChivScreenshot(focus=False)
+            if image.width > self.maxWidth:
+                image = image.resize((self.maxWidth, round(image.height * self.maxWidth / image.width)))
+            image = image.convert("RGB")
+        except Exception as e:
+            if self._failures == 0:
+                print(f"[EVIDENCE] Could not capture the game window: {e}")
+            self._failures += 1
+            return
+        self._failures = 0
+        self.buffer.add(image)
@@ -2,7 +2,9 @@
 
 import win32gui, win32process, win32api
 from time import sleep
-from . import inputLib
+from . import inputLib, matchTimer, ocrLib, scoreboardReader
+from .calibration import RegionCalibration
+from .consoleReader import ConsoleScrollback
 
 class Chivalry:
     """Class representing a running instance of the Chivalry 2 game.
@@ -50,8 +52,7 @@ class Chivalry:
 
         """
         screenshot = self.getChivScreenshot() #get a screenshot of the chiv game
-        width, height = screenshot.size
-        screenshot = screenshot.crop((0, height*(47/64)+2, width*0.02, height*(49/64)-2))
+        screenshot = self.cropRegion(screenshot, 'console_prompt')
         #process to isolate console text, and convert back to RGB
         try:
             screenshot = screenshot.quantize(colors=256).convert(mode="1").convert(mode="RGB")
@@ -59,50 +60,95 @@ class Chivalry:
             pass
         # OCR only if pytesseract is available
         try:
-            import pytesseract
-            print(pytesseract.image_to_string(screenshot))
+            #the prompt looks the same every time, so this is usually answered from the OCR cache
+            print(ocrLib.recognizeCached(screenshot)[0])
         except Exception:
             print("[OCR] pytesseract not available; skipping OCR in checkInGameConsoleOpen")
         
-    def getChivScreenshot(self, tabDown=False):
+    def getChivScreenshot(self, tabDown=False, focus=True):
         """Returns a PIL image of the entire chivalry 2 window, as it appears on-screen to a human user.
+
+        @param focus: Give the window focus before the capture. Pass False for background captures that must not
+            interrupt the user, in which case the window has to already be visible on screen.
         """
         hwnd = self.getChivalryWindowHandle()
-        self.getFocus(hwnd)
-        sleep(0.1)
+        if focus or tabDown:
+            self.getFocus(hwnd)
+            sleep(0.1)
         if tabDown:
             inputLib.tabDown()
             sleep(0.1)
-        
-        windowRect = win32gui.GetWindowRect(hwnd)
         try:
-            from PIL import ImageGrab
-            image = ImageGrab.grab(windowRect)
-        except Exception as e:
-            raise RuntimeError("Pillow (PIL) is required for screenshot operations but is not installed.") from e
-        if tabDown:
-            inputLib.tabUp()
-            sleep(0.1)
+            windowRect = self.getClientRect(hwnd)
+            try:
+                from PIL import ImageGrab
+                image = ImageGrab.grab(windowRect)
+            except Exception as e:
+                raise RuntimeError("Pillow (PIL) is required for screenshot operations but is not installed.") from e
+        finally:
+            #never leave Tab held in the game
+            if tabDown:
+                inputLib.tabUp()
+                sleep(0.1)
 
         return image
 
+    def getClientRect(self, hwnd):
+        """Returns the client area of the window (without borders or title bar) in screen coordinates."""
+        left, top, right, bottom = win32gui.GetClientRect(hwnd)
+        left, top = win32gui.ClientToScreen(hwnd, (left, top))
+        right, bottom = win32gui.ClientToScreen(hwnd, (right, bottom))
+        return (left, top, right, bottom)
+
+    def getWindowDpi(self):
+        """Returns the DPI of the monitor the chivalry 2 window is on, or 96 if it can't be determined."""
+        try:
+            import ctypes
+            return ctypes.windll.user32.GetDpiForWindow(self.getChivalryWindowHandle()) or 96
+        except Exception:
+            return 96
+
+    __calibration = None
+    def getCalibration(self):
+        """Returns the RegionCalibration resolving the named screen regions used by this class."""
+        if self.__calibration is None:
+            self.__calibration = RegionCalibration()
+        return self.__calibration
+
+    def getRegion(self, name, size):
+        """Returns the (left, top, right, bottom) pixel rectangle of a named region in a screenshot of this size.
+
+        See calibration.REGIONS for the region names.
+        """
+        return self.getCalibration().region(name, size, self.getWindowDpi())
+
+    def cropRegion(self, screenshot, name):
+        """Crops a screenshot from getChivScreenshot() to a named region."""
+        return screenshot.crop(self.getRegion(name, screenshot.size))
+
     #precondition: the extended view of the console is open in chivalry
-    def getConsoleOutput(self):
-        """Returns the currently displayed output of the chivalry console window as a string using OCR.
+    def getConsoleImage(self):
+        """Returns a PIL image of the output area of the chivalry console, processed to isolate the console text.
 
         PRECONDITIONS:
-            The chivalry console must be opened and visible in extended mode in the chivalry 2 process. See
-                the checkInGameConsoleOpen(), openConsole() and closeConsole() functions.
+            The chivalry console must be opened and visible in extended mode in the chivalry 2 process.
         """
         screenshot = self.getChivScreenshot() #get a screenshot of the chiv game
-        #get screenshot dimensions
-        width, height = screenshot.size
         #crop to console only. 
-        #height*(47/64)-2 is a magic number measured empirically.
         #It gets everything up to the horizontal line separating the command line input
-        screenshot = screenshot.crop((0, 0, width, height*(47/64)-2))
+        screenshot = self.cropRegion(screenshot, 'console_output')
         #process to isolate console text, and convert back to RGB
-        screenshot = screenshot.quantize(colors=256).convert(mode="1").convert(mode="RGB")
+        return screenshot.quantize(colors=256).convert(mode="1").convert(mode="RGB")
+
+    #precondition: the extended view of the console is open in chivalry
+    def getConsoleOutput(self):
+        """Returns the currently displayed output of the chivalry console window as a string using OCR.
+
+        PRECONDITIONS:
+            The chivalry console must be opened and visible in extended mode in the chivalry 2 process. See
+                the checkInGameConsoleOpen(), openConsole() and closeConsole() functions.
+        """
+        screenshot = self.getConsoleImage()
         try:
             import pytesseract
             text = pytesseract.image_to_string(screenshot)
@@ -111,64 +157,80 @@ class Chivalry:
         #strip empty lines and return them
         return [s for s in text.splitlines() if s]
 
+    __scrollback = None
+    def getConsoleScrollback(self):
+        """Returns the ConsoleScrollback reconstructed from every console capture read by this instance."""
+        if self.__scrollback is None:
+            self.__scrollback = ConsoleScrollback()
+        return self.__scrollback
+
+    #precondition: the extended view of the console is open in chivalry
+    def readConsole(self):
+        """Captures the console and feeds it to the scrollback buffer. Only lines that were not visible in the
+            previous capture are OCR'd.
+
+        @returns The list of newly read lines
+        """
+        return self.getConsoleScrollback().update(self.getConsoleImage())
+
+    def getTimerImage(self, focus=True):
+        """Returns a PIL image of the in-game timer, processed to isolate the digits.
+
+        @param focus: See getChivScreenshot()
+        """
+        screenshot = self.getChivScreenshot(focus=focus)
+        #crop to location of timer on screen
+        screenshot = self.cropRegion(screenshot, 'timer')
+        
+        #process and isolate text
+        return screenshot.quantize(colors=128).convert(mode="RGB")
+
     def getTimeRemaining(self):
         """Return the time remaining in the game as a string, as displayed in the in-game timer.
 
         This function internally uses OCR, and does not do cleanup on the string returned. It is the
             responsibility of the caller to ensure that this string is valid, clean, and interpretable
-            before using it.
+            before using it. See getTimeRemainingSeconds() for a parsed value.
 
 
         NOTE: The in-game console should not be open in extended mode when this function is called.
             It may still work, however, it will be less reliable.
         """
-        screenshot = self.getChivScreenshot()
-        width, height = screenshot.size
-        #crop to location of timer on screen
-        screenshot = screenshot.crop((0.45*width, 0.08*height, 0.55*width, 0.13*height))
-        
-        #process and isolate text
-
-        screenshot = screenshot.quantize(colors=128).convert(mode="RGB")
+        screenshot = self.getTimerImage()
         try:
             import pytesseract
             return pytesseract.image_to_string(screenshot)
         except Exception as e:
             raise RuntimeError("pytesseract is required for OCR operations but is not installed.") from e
+
+    def getTimeRemainingSeconds(self, focus=True):
+        """Return the time remaining in the game in seconds, or None if the timer could not be read.
+
+        Unlike getTimeRemaining(), the timer is read with a recognizer restricted to digits and colons.
+
+        @param focus: See getChivScreenshot()
+        """
+        return matchTimer.readTimer(self.getTimerImage(focus=focus))
     
     def getPlayerCount(self):
         return 0
     def getPlayerList(self):
+        """Returns the players shown on the in-game scoreboard, read with OCR.
+
+        The scoreboard is split into one strip per row and the rows are recognized in parallel, see
+            scoreboardReader.readScoreboard().
+
+        @returns A list of ScoreboardRow (name, score, confidence) tuples, from top to bottom
+        """
         screenshot = self.getChivScreenshot(tabDown=True)
-        width, height = screenshot.size
         
         # Hypothèse : la liste des joueurs est affichée en haut à droite
-        # Ajuste ces valeurs en fonction de ta capture d'écran
-        left = int(width * 0.75)
-        top = int(height * 0.15)
-        right = int(width * 0.95)
-        bottom = int(height * 0.70)
-        
-        player_list_img = screenshot.crop((left, top, right, bottom))
-        
-        # Pré-traitement : augmenter contraste, binariser, etc.
-        player_list_img = player_list_img.convert("L")  # niveaux de gris
-        player_list_img = player_list_img.point(lambda x: 0 if x < 128 else 255, '1')  # binarisation
-        
+        # Ajuste la région 'scoreboard' avec la calibration si besoin
+        player_list_img = self.cropRegion(screenshot, 'scoreboard')
+
         # player_list_img.show()  # pour debug
 
-        # OCR
-        try:
-            import pytesseract
-            text = pytesseract.image_to_string(player_list_img)
-        except Exception as e:
-            raise RuntimeError("pytesseract is required for OCR operations but is not installed.") from e
-        
-        # Nettoyage du texte et découpage en lignes
-        lines = text.splitlines()
-        players = [line.strip() for line in lines if line.strip() != ""]
-        
-        return players
+        return scoreboardReader.readScoreboard(player_list_img)
 
     def isGameEnd(self):
         """Returns true or false, indicating whether or not the game is currently in a game-end state.
@@ -179,16 +241,11 @@ class Chivalry:
             These assume that the client is in spectator mode at game end to get these specific messages.
         """
         screenshot = self.getChivScreenshot()
-        width, height = screenshot.size
         #crop to location of game end notification on screen
-        screenshot = screenshot.crop((0.3*width, 0.75*height, 0.7*width, 0.9*height))
+        screenshot = self.cropRegion(screenshot, 'game_end')
 
         screenshot = screenshot.quantize(colors=128).convert(mode="1").convert(mode="RGB")
-        try:
-            import pytesseract
-            result = pytesseract.image_to_string(screenshot)
-        except Exception as e:
-            raise RuntimeError("pytesseract is required for OCR operations but is not installed.") from e
+        result, _ = ocrLib.recognizeCached(screenshot)
         if "GAME END" in result or "VICTOR" in result:
             return True
         else:
@@ -198,16 +255,11 @@ class Chivalry:
         """Returns true or false, indicating if the client is currently at the chivalry main menu.
         """
         screenshot = self.getChivScreenshot()
-        width, height = screenshot.size
         #crop to location of exit game button on main menu on screen
-        screenshot = screenshot.crop((0.072*width, 0.94*height, 0.13*width, 0.97*height))
+        screenshot = self.cropRegion(screenshot, 'main_menu_exit')
 
         screenshot = screenshot.quantize(colors=128).convert(mode="RGB")
-        try:
-            import pytesseract
-            result = pytesseract.image_to_string(screenshot)
-        except Exception as e:
-            raise RuntimeError("pytesseract is required for OCR operations but is not installed.") from e
+        result, _ = ocrLib.recognizeCached(screenshot)
         #print(result)
         if "EXIT GAME" in result:
             return True
@@ -221,30 +273,12 @@ class Chivalry:
 
         @param command: A string containing the command that was run, exactly as it was entered
         @param lines: How many lines of it's output to return. (this depends on the specific command)
-        @returns The output of the run command as a string, or None
+        @returns The output of the run command as a list of lines, or None
         """
-        console = self.getConsoleOutput()
-        #get a view of the console containing only command run lines and no spaces what-so-ever
-        #command run lines take the form `>>> command <<<` in the output. We strip spaces because
-        #we can't rely on them being detected by OCR. We also cant rely on ALL of the >>> / <<< characters to
-        #be correctly OCR'd. Here, we rely on at least two consecutive of both
-        #StrippedConsole elements include their index in the actual console output array
-        strippedConsole = [
-            (index, s.replace(" ", "")) 
-            for index,s in enumerate(console) 
-            if ">>" in s and "<<" in s
-        ]
-        for i, s in reversed(strippedConsole): #searching backwards through all commands run
-            if command.replace(" ", "") in s: #if this line is the running of the requested command
-                if i < len(console)-1: #if this is not the last line of the console output
-                    n = lines+1
-                    #return some number of lines, n, output after the command run, or the rest of the
-                    #output of the console if there are less than n lines left
-                    #this is more general than it needs to be, but this is intended to
-                    return console[i+1:i+n] if i+n < len(console) else console[i+1:]
-                else:
-                    return None
-        return None
+        #the scrollback indexes command run lines, so finding the command is a dictionary lookup and only
+        #the lines that appeared since the last read get OCR'd
+        self.readConsole()
+        return self.getConsoleScrollback().commandOutput(command, lines)
 
     def consoleSend(self, message):
         """Send a command to the chivalry console.
@@ -309,7 +343,46 @@ class Chivalry:
         else:
             print("[OPENCONSOLE] ERROR: Console opening failed")
 
-    # closeConsole() removed - console auto-closes after Enter
+    # The single line console auto-closes after Enter, only the extended view needs closing
+
+    def openExtendedConsole(self):
+        """Open the chivalry console into extended mode, showing its output.
+
+        PRECONDITION: The chivalry console is currently closed
+        """
+        self.openConsole()
+        inputLib.sendConsoleKey()
+        sleep(0.1)
+
+    def closeConsole(self):
+        """Close the extended view of the chivalry console.
+
+        PRECONDITION: The extended view of the console is open in chivalry
+        """
+        inputLib.sendConsoleKey()
+        sleep(0.05)
+
+    def verifyCommand(self, command):
+        """Returns whether a command was just run, from its echo in the console output.
+
+        The extended console is opened to be read, then closed. Only the lines that appeared since the previous
+            verification are OCR'd, so this is cheap enough to check every moderation command.
+
+        @param command: The command, or its start (e.g. "banbyid <id>"), since long commands wrap in the console
+        @returns True if a new echo of the command was read, False if not, None if the console could not be read
+        """
+        scrollback = self.getConsoleScrollback()
+        before = scrollback.findCommand(command)
+        self.openExtendedConsole()
+        try:
+            self.readConsole()
+        except Exception as e:
+            print(f"[VERIFY] Could not read the console: {e}")
+            return None
+        finally:
+            self.closeConsole()
+        after = scrollback.findCommand(command)
+        return after is not None and after != before
 
 
     def SavePreset(self, slot, payload):
@@ -404,4 +477,18 @@ class Chivalry:
 
         return presets
 
+def enableDpiAwareness():
+    """Makes window coordinates physical pixels so they match screenshots on scaled displays.
+
+    The awareness of a process can only be set before its first window is created, so this must be called at
+        startup, before the QApplication. Qt may also set it, in which case the calls below fail harmlessly."""
+    try:
+        import ctypes
+        try:
+            ctypes.windll.shcore.SetProcessDpiAwareness(2) #per monitor
+        except Exception:
+            ctypes.windll.user32.SetProcessDPIAware()
+    except Exception:
+        pass
+
 #Chiv win32gui window class: "UnrealWindow"
\ No newline at end of file
@@ -46,6 +46,15 @@ def sendShiftedKeyPress(vk_code):
     win32api.keybd_event(win32con.VK_LSHIFT, 0, win32con.KEYEVENTF_KEYUP)
     sleep(KEY_SEQUENCE_DELAY)
 
+def tabDown():
+    """Hold the Tab key down, which shows the in-game scoreboard until tabUp() is called."""
+    win32api.keybd_event(win32con.VK_TAB, 0, 0)
+
+def tabUp():
+    """Release the Tab key pressed by tabDown()."""
+    win32api.keybd_event(win32con.VK_TAB, 0, win32con.KEYEVENTF_KEYUP)
+    sleep(KEY_SEQUENCE_DELAY)
+
 def sendCharacter(char):
     """Send a single character using layout-aware mapping.
 
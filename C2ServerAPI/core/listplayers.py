@@ -0,0 +1,122 @@
+"""Parser for the output of the listplayers console command, as copied to the clipboard by the game.
+
+Expected format:
+    ServerName - OATS Duelyard  [Flourish to Duel Pit FFA Discord oatsduelyard] 134.255.251.182:10180
+    Name - PlayFabPlayerId - EOSPlayerId - ...
+    SomePlayer - 1A2B3C4D5E6F7A8B - 0002a1b2c3d4e5f6a7b8c9d0e1f2a3b4 - ...
+
+The clipboard may hold several of these blocks back to back. Everything is read in a single pass over the lines,
+    which are taken from the text one at a time rather than split up front, and each block is turned into a
+    ServerRoster as soon as it ends."""
+
+import re
+from collections import namedtuple
+
+ServerRoster = namedtuple("ServerRoster", ["server_name", "address", "columns", "players"])
+ServerRoster.__doc__ = """One listplayers snapshot: server name and IP:port from the header (None when missing), the
+    column names of the player rows, and a tuple of PlayerRow."""
+
+PlayerRow = namedtuple("PlayerRow", ["name", "playfab_id", "eos_id", "columns"])
+PlayerRow.__doc__ = """A player of a listplayers snapshot. columns maps every column name of the header to its value."""
+
+DEFAULT_COLUMNS = ("Name", "PlayFabPlayerId", "EOSPlayerId")
+
+# "ServerName - <name>  [<description>] <ip>:<port>", the name ends at the first double space
+_SERVER_LINE = re.compile(
+    r"^\s*ServerName\s*-\s*(?P<rest>.*?)\s*(?P<address>(?:\d{1,3}\.){3}\d{1,3}(?::\d+)?)?\s*$"
+)
+
+def _server_name(rest):
+    name = rest.split("  ", 1)[0].strip()
+    return name or None
+
+def iter_lines(text):
+    """Yields the lines of text one at a time, without their line break, and without copying the whole text into
+        a list of lines first."""
+    start = 0
+    length = len(text)
+    while start < length:
+        end = text.find("\n", start)
+        if end < 0:
+            end = length
+        line = text[start:end]
+        yield line[:-1] if line.endswith("\r") else line
+        start = end + 1
+
+def iter_rosters(text):
+    """Yields a ServerRoster for every listplayers block found in text, in order.
+
+    Rows are de-duplicated by PlayFab ID within a block. Rows that don't carry a plausible PlayFab ID (at least
+        12 characters) are skipped.
+
+    @param text: listplayers output, or any iterable of its lines, e.g. an open file
+    """
+    server_name = None
+    address = None
+    columns = DEFAULT_COLUMNS
+    players = []
+    seen_ids = set()
+    in_block = False
+
+    lines = iter_lines(text) if isinstance(text, str) else (line.rstrip("\r\n") for line in text or ())
+    for line in lines:
+        if " - " not in line:
+            continue
+
+        m = _SERVER_LINE.match(line)
+        if m:
+            if in_block:
+                yield ServerRoster(server_name, address, columns, tuple(players))
+            server_name = _server_name(m.group("rest"))
+            address = m.group("address")
+            columns = DEFAULT_COLUMNS
+            players = []
+            seen_ids = set()
+            in_block = True
+            continue
+
+        if "PlayFabPlayerId" in line and "Name" in line:
+            # A header without its server line still starts a new snapshot
+            if players:
+                yield ServerRoster(server_name, address, columns, tuple(players))
+                players = []
+                seen_ids = set()
+            columns = tuple(c.strip() for c in line.split(" - "))
+            in_block = True
+            continue
+
+        parts = line.split(" - ")
+        extra = len(parts) - len(columns)
+        if extra > 0:
+            # The name itself contains " - "
+            parts[0:extra + 1] = [" - ".join(parts[0:extra + 1])]
+        parts = [p.strip() for p in parts]
+        if len(parts) < 2:
+            continue
+        name = parts[0]
+        playfab_id = parts[1]
+        if len(playfab_id) < 12 or playfab_id in seen_ids:
+            continue
+        seen_ids.add(playfab_id)
+        players.append(PlayerRow(name, playfab_id, parts[2] if len(parts) > 2 else None, dict(zip(columns, parts))))
+        in_block = True
+
+    if in_block:
+        yield ServerRoster(server_name, address, columns, tuple(players))
+
+def parse_listplayers(text):
+    """Returns the last ServerRoster found in text, which is the most recent listplayers output, or an empty
+        roster if there is none.
+
+    Older blocks are skipped without being parsed: a server line always starts a new block, so parsing starts
+        at the last one.
+    """
+    text = text or ""
+    start = text.rfind("ServerName")
+    if start > 0:
+        start = text.rfind("\n", 0, start) + 1
+        text = text[start:]
+    roster = None
+    for roster in iter_rosters(text):
+        pass
+    return roster if roster is not None else ServerRoster(None, None, DEFAULT_COLUMNS, ())
@@ -0,0 +1,128 @@
+"""Continuous reading of the in-game match timer.
+
+MatchTimerSampler reads the timer about once per second in a background thread, without giving the game focus,
+    and reports a smoothed number of remaining seconds through a callback."""
+
+import re
+import threading
+from time import monotonic
+
+from . import ocrLib
+
+_TIMER_PATTERN = re.compile(r"(?:(\d{1,2}):)?(\d{1,2}):(\d{2})")
+
+def parseTimer(text):
+    """Parses timer text such as "12:34" or "1:02:03" into a number of seconds.
+
+    @returns The number of seconds, or None if text does not contain a timer
+    """
+    m = _TIMER_PATTERN.search((text or "").replace(" ", ""))
+    if not m:
+        return None
+    hours, minutes, seconds = m.groups()
+    if int(seconds) >= 60:
+        return None
+    return int(hours or 0)*3600 + int(minutes)*60 + int(seconds)
+
+def readTimer(image):
+    """Runs the digit recognizer on a processed timer image and returns the remaining seconds, or None."""
+    return parseTimer(ocrLib.imageToString(image, config=ocrLib.DIGITS_CONFIG))
+
+class TimerSmoother:
+    """Smooths successive timer readings.
+
+    Between readings the timer is assumed to count down in real time. A reading close to that prediction is
+        blended into it. A reading far from it is either a misread or a real jump (time added, new map), so it is
+        only accepted once the next reading confirms it.
+    """
+    def __init__(self, alpha=0.5, tolerance=3, clock=monotonic):
+        """@param alpha: Weight of a new reading against the prediction
+        @param tolerance: Maximum distance in seconds between a reading and the prediction to blend them
+        """
+        self.alpha = alpha
+        self.tolerance = tolerance
+        self.clock = clock
+        self.reset()
+
+    def reset(self):
+        self._value = None
+        self._time = None
+        self._pending = None
+
+    def estimate(self, now=None):
+        """Returns the predicted remaining seconds at time now, or None before the first reading."""
+        if self._value is None:
+            return None
+        now = self.clock() if now is None else now
+        return max(0, round(self._value - (now - self._time)))
+
+    def update(self, seconds, now=None):
+        """Feeds a new reading and returns the smoothed remaining seconds."""
+        now = self.clock() if now is None else now
+        if self._value is None:
+            self._value, self._time = seconds, now
+            return self.estimate(now)
+
+        predicted = max(0, self._value - (now - self._time))
+        if abs(seconds - predicted) <= self.tolerance:
+            self._value = predicted + self.alpha*(seconds - predicted)
+            self._time = now
+            self._pending = None
+        elif self._pending is not None and abs(seconds - max(0, self._pending[0] - (now - self._pending[1]))) <= self.tolerance:
+            self._value, self._time = seconds, now
+            self._pending = None
+        else:
+            self._pending = (seconds, now)
+        return self.estimate(now)
+
+class MatchTimerSampler(threading.Thread):
+    """Background thread reading the match timer of a Chivalry instance.
+
+    Frames where the timer region did not change since the previous sample are skipped without running OCR.
+    """
+    def __init__(self, game, onUpdate, interval=1.0):
+        """@param game: Chivalry instance to read the timer from
+        @param onUpdate: Called from the sampler thread with the smoothed remaining seconds, or None when the timer
+            can't be read (e.g. main menu, scoreboard open)
+        @param interval: Seconds between two samples
+        """
+        super().__init__(name="MatchTimerSampler", daemon=True)
+        self.game = game
+        self.onUpdate = onUpdate
+        self.interval = interval
+        self.smoother = TimerSmoother()
+        self._stopEvent = threading.Event()
+        self._lastDigest = None
+        self._failures = 0
+
+    def stop(self):
+        """Asks the thread to exit after the current sample."""
+        self._stopEvent.set()
+
+    def run(self):
+        while not self._stopEvent.wait(self.interval):
+            self.sample()
+
+    def sample(self):
+        """Takes one sample and publishes the result if it changed anything."""
+        try:
+            image = self.game.getTimerImage(focus=False)
+            digest = ocrLib.imageDigest(image)
+            if digest == self._lastDigest:
+                return
+            self._lastDigest = digest
+            seconds = readTimer(image)
+        except Exception as e:
+            if self._failures == 0:
+                print(f"[TIMER] Could not read the match timer: {e}")
+            seconds = None
+
+        if seconds is None:
+            #a couple of misreads in a row means the timer is gone from the screen
+            self._failures += 1
+            if self._failures == 3:
+                self.smoother.reset()
+                self.onUpdate(None)
+            return
+        self._failures = 0
+        self.onUpdate(self.smoother.update(seconds))
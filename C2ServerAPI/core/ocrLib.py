@@ -0,0 +1,261 @@
+"""Small OCR helpers shared by the Chivalry screen readers.
+
+Everything in here works on PIL images. PIL and pytesseract are imported lazily, like in guiServer, so that
+    the GUI keeps working on machines where OCR is not installed."""
+
+import atexit
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# Tesseract page segmentation mode for a single line of text
+SINGLE_LINE_CONFIG = "--psm 7"
+# Single line made only of digits and colons, used for the in-game timer
+DIGITS_CONFIG = "--psm 7 -c tessedit_char_whitelist=0123456789:"
+
+# File the recognition cache is persisted to between sessions
+OCR_CACHE_FILE = "ocrcache.json"
+
+def binarize(image, threshold=128):
+    """Return a grayscale copy of image where every pixel is either 0 or 255.
+
+    @param image: PIL image in any mode
+    @param threshold: Gray level at or above which a pixel becomes white
+    """
+    return image.convert("L").point(lambda x: 255 if x >= threshold else 0)
+
+def rowBands(image, minInk=1, minHeight=3, maxGap=1):
+    """Segment an image into horizontal text rows using its horizontal projection profile.
+
+    The background value is taken to be the most common one, so this works for both light-on-dark (console)
+        and dark-on-light text.
+
+    @param image: PIL image, ideally already binarized
+    @param minInk: Minimum number of non-background pixels for a pixel row to count as text
+    @param minHeight: Bands shorter than this (in pixels) are treated as noise and dropped
+    @param maxGap: Bands separated by at most this many blank pixel rows are merged (e.g. the dot of an i)
+    @returns A list of (top, bottom) pixel ranges, bottom exclusive, from top to bottom
+    """
+    gray = image.convert("L")
+    width, height = gray.size
+    if width == 0 or height == 0:
+        return []
+    data = gray.tobytes()
+    histogram = gray.histogram()
+    background = histogram.index(max(histogram))
+    bg = bytes([background])
+
+    bands = []
+    top = None
+    gap = 0
+    for y in range(height):
+        row = data[y*width:(y+1)*width]
+        inked = width - row.count(bg) >= minInk
+        if inked:
+            if top is None:
+                top = y
+            gap = 0
+        elif top is not None:
+            gap += 1
+            if gap > maxGap:
+                bands.append((top, y - gap + 1))
+                top = None
+                gap = 0
+    if top is not None:
+        bands.append((top, height - gap))
+
+    return [(t, b) for t, b in bands if b - t >= minHeight]
+
+def imageDigest(image):
+    """Returns a short hex digest identifying the exact pixel content of an image.
+
+    Two images get the same digest only if their mode, size and pixels are identical.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{image.mode}:{image.size[0]}x{image.size[1]}:".encode())
+    h.update(image.tobytes())
+    return h.hexdigest()
+
+def padImage(image, border=8, fill=None):
+    """Return image with a uniform border around it. Tesseract reads tightly cropped strips poorly without one.
+
+    @param fill: Border color. Defaults to the color of the top-left pixel.
+    """
+    from PIL import ImageOps
+    if fill is None:
+        fill = image.getpixel((0, 0))
+    return ImageOps.expand(image, border=border, fill=fill)
+
+def imageToString(image, config=""):
+    """Run tesseract on image and return the recognized text.
+
+    @param config: Extra tesseract command line options, e.g. SINGLE_LINE_CONFIG
+    """
+    try:
+        import pytesseract
+    except Exception as e:
+        raise RuntimeError("pytesseract is required for OCR operations but is not installed.") from e
+    return pytesseract.image_to_string(image, config=config)
+
+def imageToData(image, config=""):
+    """Run tesseract on image and return the recognized text along with its confidence.
+
+    @returns A (text, confidence) tuple. The confidence is the mean word confidence, from 0 to 100, or -1 if no
+        word was recognized.
+    """
+    try:
+        import pytesseract
+    except Exception as e:
+        raise RuntimeError("pytesseract is required for OCR operations but is not installed.") from e
+    data = pytesseract.image_to_data(image, config=config, output_type=pytesseract.Output.DICT)
+    words = []
+    confidences = []
+    for word, conf in zip(data["text"], data["conf"]):
+        if word.strip() and float(conf) >= 0:
+            words.append(word.strip())
+            confidences.append(float(conf))
+    if not words:
+        return "", -1
+    return " ".join(words), sum(confidences)/len(confidences)
+
+_pool = None
+def getPool():
+    """Returns the thread pool used to run OCR jobs in parallel.
+
+    Each tesseract call runs in its own process, so threads are enough to keep every core busy.
+    """
+    global _pool
+    if _pool is None:
+        #tesseract's own threading only adds contention when several instances run at once
+        os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+        _pool = ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1), thread_name_prefix="ocr")
+    return _pool
+
+def recognizeMany(images, config="", withConfidence=False):
+    """Recognize several images in parallel on the OCR pool.
+
+    @param withConfidence: Return (text, confidence) tuples, as imageToData() does, instead of plain text
+    @returns The results in the same order as images
+    """
+    recognize = imageToData if withConfidence else imageToString
+    return list(getPool().map(lambda image: recognize(image, config=config), images))
+
+class OcrCache:
+    """Bounded LRU cache of recognition results, keyed by the digest of the processed image and the tesseract
+        options. The same UI elements (menu labels, overlays, prompts) are captured over and over, so most reads
+        are answered from here without running tesseract.
+
+    The cache is thread-safe. When a path is given, entries are loaded from it on creation and written back by
+        save().
+    """
+    def __init__(self, maxEntries=512, path=None):
+        self.maxEntries = maxEntries
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._dirty = False
+        if path:
+            self.load()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def key(image, config=""):
+        return f"{imageDigest(image)}|{config}"
+
+    def get(self, key):
+        """Returns the cached (text, confidence) for key, or None."""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, text, confidence):
+        with self._lock:
+            self._entries[key] = (text, confidence)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxEntries:
+                self._entries.popitem(last=False)
+            self._dirty = True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._dirty = True
+
+    def load(self):
+        """Loads entries from the cache file, keeping the most recently used ones if there are too many.
+
+        Entries that are not [key, [text, confidence]] are skipped, the cache only saves time.
+        """
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except Exception as e:
+            print(f"[OCR] Could not read the OCR cache {self.path}: {e}")
+            return
+        if not isinstance(entries, list):
+            print(f"[OCR] Ignoring the OCR cache {self.path}: not a list of entries")
+            return
+        skipped = 0
+        with self._lock:
+            for entry in entries[-self.maxEntries:]:
+                try:
+                    key, (text, confidence) = entry
+                    if not isinstance(key, str) or not isinstance(text, str):
+                        raise TypeError
+                    self._entries[key] = (text, float(confidence))
+                except (TypeError, ValueError):
+                    skipped += 1
+        if skipped:
+            print(f"[OCR] Skipped {skipped} malformed entries of the OCR cache {self.path}")
+
+    def save(self):
+        """Writes the entries to the cache file, least recently used first. Does nothing if nothing changed."""
+        if not self.path or not self._dirty:
+            return
+        with self._lock:
+            entries = [[key, list(value)] for key, value in self._entries.items()]
+            self._dirty = False
+        try:
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump(entries, f)
+        except Exception as e:
+            print(f"[OCR] Could not write the OCR cache {self.path}: {e}")
+
+_cache = None
+def getCache():
+    """Returns the shared OCR cache, persisted to OCR_CACHE_FILE when the program exits."""
+    global _cache
+    if _cache is None:
+        _cache = OcrCache(path=OCR_CACHE_FILE)
+        atexit.register(_cache.save)
+    return _cache
+
+def recognizeCached(image, config="", cache=None):
+    """Like imageToData(), but answered from the OCR cache when the exact same image was recognized before.
+
+    @param image: Processed PIL image, as it would be passed to tesseract
+    @param cache: OcrCache to use, the shared one by default
+    @returns A (text, confidence) tuple
+    """
+    cache = getCache() if cache is None else cache
+    key = cache.key(image, config)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+    text, confidence = imageToData(image, config=config)
+    cache.put(key, text, confidence)
+    return text, confidence
@@ -0,0 +1,150 @@
+"""Local history of every player seen in listplayers snapshots, stored in SQLite.
+
+Each (PlayFab ID, name, server) combination is a sighting with the time it was first and last seen, so the
+    aliases of a player can be looked up instantly and offline instead of through chivalry2stats.com. A snapshot
+    is written in a single transaction.
+
+Names are indexed case-insensitively for prefix search. Substring search uses an FTS5 trigram index when the
+    SQLite library supports it, and a scan of the distinct names otherwise."""
+
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+from .roster import server_key
+
+HISTORY_FILE = "playerhistory.db"
+
+Alias = namedtuple("Alias", ["name", "server", "first_seen", "last_seen"])
+Alias.__doc__ = """A name used by a player on a server, with the time of the first and last snapshot it was in."""
+
+PlayerMatch = namedtuple("PlayerMatch", ["playfab_id", "name", "last_seen"])
+PlayerMatch.__doc__ = """A player whose name matched a search, with the matching name and when it was last seen."""
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS names (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE INDEX IF NOT EXISTS names_nocase ON names (name COLLATE NOCASE);
+CREATE TABLE IF NOT EXISTS sightings (
+    playfab_id TEXT NOT NULL,
+    name_id INTEGER NOT NULL REFERENCES names (id),
+    server TEXT NOT NULL DEFAULT '',
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    PRIMARY KEY (playfab_id, name_id, server)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS sightings_name ON sightings (name_id, last_seen);
+"""
+
+_TRIGRAM_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS names_trigram USING fts5 (
+    name, content='names', content_rowid='id', tokenize='trigram case_sensitive 0'
+);
+CREATE TRIGGER IF NOT EXISTS names_trigram_insert AFTER INSERT ON names BEGIN
+    INSERT INTO names_trigram (rowid, name) VALUES (new.id, new.name);
+END;
+"""
+
+def _escape_like(text):
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+class PlayerHistory:
+    """Player sightings persisted to a SQLite database. Safe to use from several threads."""
+    def __init__(self, path=HISTORY_FILE):
+        """@param path: Database file, or ":memory:" to keep the history in memory only"""
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        # LIKE must be case-insensitive for the NOCASE index to serve prefix searches
+        self._conn.execute("PRAGMA case_sensitive_like=OFF")
+        with self._conn:
+            self._conn.executescript(_SCHEMA)
+        self.has_trigram_index = self._create_trigram_index()
+
+    def _create_trigram_index(self):
+        try:
+            with self._conn:
+                exists = self._conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE name = 'names_trigram'").fetchone()
+                self._conn.executescript(_TRIGRAM_SCHEMA)
+                if not exists:
+                    #index the names recorded before the trigram index was available
+                    self._conn.execute("INSERT INTO names_trigram (names_trigram) VALUES ('rebuild')")
+            return True
+        except sqlite3.OperationalError as e:
+            print(f"[HISTORY] No trigram index, substring search will scan names: {e}")
+            return False
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def record(self, roster, timestamp=None):
+        """Records every player of a listplayers snapshot in one transaction.
+
+        @param roster: listplayers.ServerRoster
+        @param timestamp: Time of the snapshot, now by default
+        @returns Number of players recorded
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        server = server_key(roster)
+        players = [(row.playfab_id, row.name) for row in roster.players]
+        if not players:
+            return 0
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR IGNORE INTO names (name) VALUES (?)", [(name,) for _, name in players])
+            self._conn.executemany(
+                "INSERT INTO sightings (playfab_id, name_id, server, first_seen, last_seen) "
+                "SELECT ?, id, ?, ?, ? FROM names WHERE name = ? "
+                "ON CONFLICT (playfab_id, name_id, server) DO UPDATE SET last_seen = excluded.last_seen",
+                [(pid, server, timestamp, timestamp, name) for pid, name in players]
+            )
+        return len(players)
+
+    def aliases(self, playfab_id):
+        """Returns every Alias of a player, most recently seen first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT n.name, s.server, s.first_seen, s.last_seen FROM sightings s "
+                "JOIN names n ON n.id = s.name_id WHERE s.playfab_id = ? ORDER BY s.last_seen DESC",
+                (playfab_id,)
+            ).fetchall()
+        return [Alias(*row) for row in rows]
+
+    def names(self):
+        """Returns every (PlayFab ID, name) pair ever seen."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT s.playfab_id, n.name FROM sightings s JOIN names n ON n.id = s.name_id "
+                "GROUP BY s.playfab_id, s.name_id"
+            ).fetchall()
+
+    def _players_with_names(self, name_ids_query, params, limit):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT s.playfab_id, n.name, MAX(s.last_seen) AS seen FROM sightings s "
+                f"JOIN names n ON n.id = s.name_id WHERE s.name_id IN ({name_ids_query}) "
+                "GROUP BY s.playfab_id, n.id ORDER BY seen DESC LIMIT ?",
+                (*params, limit)
+            ).fetchall()
+        return [PlayerMatch(*row) for row in rows]
+
+    def find_by_prefix(self, prefix, limit=50):
+        """Returns players who used a name starting with prefix, ignoring case, most recently seen first."""
+        return self._players_with_names(
+            "SELECT id FROM names WHERE name LIKE ? ESCAPE '\\'", (_escape_like(prefix) + "%",), limit)
+
+    def find_by_substring(self, text, limit=50):
+        """Returns players who used a name containing text, ignoring case, most recently seen first."""
+        if self.has_trigram_index and len(text) >= 3:
+            #a quoted phrase matches the text as a substring, wildcards included
+            phrase = '"' + text.replace('"', '""') + '"'
+            return self._players_with_names(
+                "SELECT rowid FROM names_trigram WHERE names_trigram MATCH ?", (phrase,), limit)
+        return self._players_with_names(
+            "SELECT id FROM names WHERE name LIKE ? ESCAPE '\\'", ("%" + _escape_like(text) + "%",), limit)
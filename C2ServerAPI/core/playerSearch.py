@@ -0,0 +1,238 @@
+"""In-memory trigram index over player names and PlayFab IDs.
+
+Every indexed text is lowercased and padded with a space on both ends, then split into trigrams. The index maps
+    each trigram to the keys whose texts contain it, so a search only looks at players sharing trigrams with the
+    query instead of testing every name. Padding makes texts and queries shorter than three characters
+    searchable too.
+
+Substring matches are found by intersecting the posting sets of the query trigrams and checking the few
+    candidates left. Fuzzy matches are the texts sharing the most trigrams with the query, scored by how few
+    edits turn the query into some part of the text: a partial query with a typo, e.g. "kngiht", still finds
+    "xX_Knight_Xx". A search can also be restricted to a few keys, such as the players of a roster, in which case
+    all of them are scored.
+
+The index is seeded with every player of the player history at startup, on a background thread, then kept up
+    to date from roster events."""
+
+import heapq
+import threading
+from collections import Counter, namedtuple
+from itertools import islice
+
+SearchResult = namedtuple("SearchResult", ["key", "text", "score", "exact"])
+SearchResult.__doc__ = """A key matching a search. text is its best matching text, exact is True for substring
+    matches, score goes from 0 to 1, higher is better."""
+
+def normalize(text):
+    return " ".join(text.lower().split())
+
+def trigrams(text, pad=True):
+    """Returns the set of trigrams of an already normalized text."""
+    if pad:
+        text = f" {text} "
+    return {text[i:i+3] for i in range(len(text) - 2)}
+
+def substring_distance(query, text):
+    """Returns the fewest edits turning query into any part of text: inserting, deleting or replacing a
+        character.
+
+    Uses Myers' bit-parallel algorithm: the vertical differences between the edit distances of successive query
+        prefixes are kept as bits of two integers, updated with a few operations per character of text.
+    """
+    m = len(query)
+    mask = (1 << m) - 1
+    last = 1 << (m - 1)
+    masks = {}
+    for i, c in enumerate(query):
+        masks[c] = masks.get(c, 0) | (1 << i)
+    plus, minus = mask, 0
+    distance = best = m
+    for c in text:
+        eq = masks.get(c, 0)
+        xv = eq | minus
+        xh = (((eq & plus) + plus) ^ plus) | eq
+        horizontal_plus = minus | (~(xh | plus) & mask)
+        horizontal_minus = plus & xh
+        if horizontal_plus & last:
+            distance += 1
+        elif horizontal_minus & last:
+            distance -= 1
+        # Not shifting a 1 in: a match may start anywhere in the text
+        horizontal_plus = (horizontal_plus << 1) & mask
+        horizontal_minus = (horizontal_minus << 1) & mask
+        plus = horizontal_minus | (~(xv | horizontal_plus) & mask)
+        minus = horizontal_plus & xv
+        if distance < best:
+            best = distance
+    return best
+
+# Fuzzy searches over the whole index only score the keys sharing the most trigrams with the query, or every
+# key when there are few of them
+FUZZY_CANDIDATES = 500
+
+class TrigramIndex:
+    """Maps keys (PlayFab IDs) to one or more texts (names, the ID itself) and finds keys by text. Safe to use
+        from several threads."""
+    def __init__(self, fuzzy_threshold=0.5):
+        """@param fuzzy_threshold: Lowest fuzzy match score returned: the share of the characters of the query
+            that need no edit to be found in the text"""
+        self.fuzzy_threshold = fuzzy_threshold
+        self._lock = threading.RLock()
+        self._texts = {} # key -> tuple of normalized texts
+        self._joined = {} # key -> its texts joined by newlines, for scans
+        self._grams = {} # key -> set of trigrams of all its texts
+        self._postings = {} # trigram -> set of keys
+
+    def __len__(self):
+        return len(self._texts)
+
+    def __contains__(self, key):
+        return key in self._texts
+
+    def texts(self, key):
+        return self._texts.get(key, ())
+
+    def add(self, key, *texts):
+        """Indexes more texts for key, keeping the ones it already has."""
+        with self._lock:
+            self._add(key, texts)
+
+    def add_many(self, entries, batch=500):
+        """Indexes many (key, text, ...) tuples, e.g. a whole player history.
+
+        The lock is released every batch entries, so searches from other threads are not held up for long.
+        @returns Number of entries indexed
+        """
+        count = 0
+        entries = iter(entries)
+        while True:
+            chunk = list(islice(entries, batch))
+            if not chunk:
+                return count
+            with self._lock:
+                for entry in chunk:
+                    self._add(entry[0], entry[1:])
+            count += len(chunk)
+
+    def _add(self, key, texts):
+        texts = tuple(t for t in (normalize(t) for t in texts if t) if t and t not in self._texts.get(key, ()))
+        if not texts:
+            return
+        self._texts[key] = self._texts.get(key, ()) + texts
+        self._joined[key] = "\n".join(self._texts[key])
+        grams = self._grams.setdefault(key, set())
+        for text in texts:
+            for gram in trigrams(text) - grams:
+                grams.add(gram)
+                self._postings.setdefault(gram, set()).add(key)
+
+    def replace(self, key, *texts):
+        """Makes texts the only texts of key."""
+        with self._lock:
+            self.remove(key)
+            self.add(key, *texts)
+
+    def remove(self, key):
+        with self._lock:
+            self._texts.pop(key, None)
+            self._joined.pop(key, None)
+            for gram in self._grams.pop(key, ()):
+                keys = self._postings[gram]
+                keys.discard(key)
+                if not keys:
+                    del self._postings[gram]
+
+    def _substring_candidates(self, query, keys=None):
+        """Returns (key, texts) pairs that may contain query."""
+        if keys is not None:
+            # A handful of keys: checking each of them is cheaper than merging postings
+            return [(key, self._texts[key]) for key in keys if key in self._joined and query in self._joined[key]]
+        if len(query) < 3:
+            # Too short to have a trigram of its own, and likely to match a large share of the keys anyway:
+            # a plain scan is cheaper than merging the postings of every trigram containing it
+            return [(key, self._texts[key]) for key, joined in self._joined.items() if query in joined]
+        # Unpadded trigrams: the query may sit anywhere in the text
+        grams = sorted((self._postings.get(g, set()) for g in trigrams(query, pad=False)), key=len)
+        if not grams[0]:
+            return ()
+        candidates = set(grams[0])
+        for keys in grams[1:]:
+            candidates &= keys
+            if not candidates:
+                break
+        return [(key, self._texts[key]) for key in candidates]
+
+    def search(self, query, limit=None, fuzzy=True, keys=None):
+        """Finds the keys whose texts contain query, then, if fuzzy, the ones whose texts look like it.
+
+        Substring matches come first: exact texts, then prefixes, then shorter texts. Fuzzy matches follow by
+            decreasing similarity.
+
+        @param keys: Only search among these keys, e.g. the players of a roster
+        @returns A list of SearchResult, best first
+        """
+        query = normalize(query)
+        if not query:
+            return []
+        with self._lock:
+            return self._search(query, limit, fuzzy, keys)
+
+    def _search(self, query, limit, fuzzy, keys):
+        results = []
+        exact_keys = set()
+        for key, texts in self._substring_candidates(query, keys):
+            best = None
+            for text in texts:
+                position = text.find(query)
+                if position >= 0:
+                    rank = (text != query, position != 0, len(text))
+                    if best is None or rank < best[0]:
+                        best = (rank, text, key)
+            if best is not None:
+                exact_keys.add(key)
+                results.append(best)
+        if limit is None:
+            results.sort()
+        else:
+            results = heapq.nsmallest(limit, results)
+        results = [SearchResult(key, text, len(query) / len(text), True) for _, text, key in results]
+
+        if fuzzy and (limit is None or len(results) < limit):
+            fuzzy_results = self._fuzzy(query, exact_keys, keys)
+            results.extend(fuzzy_results if limit is None else fuzzy_results[:limit - len(results)])
+        return results
+
+    def _fuzzy(self, query, exclude, keys=None):
+        if len(query) < 3:
+            # Too short to tell a typo from another name
+            return []
+        if keys is not None:
+            candidates = {key for key in keys if key in self._grams} - exclude
+        elif len(self._texts) <= FUZZY_CANDIDATES:
+            candidates = set(self._texts) - exclude
+        else:
+            # A typo spoils the few trigrams around it, texts holding the query with a typo still share the others
+            shared = Counter()
+            for gram in trigrams(query):
+                shared.update(self._postings.get(gram, ()))
+            for key in exclude:
+                shared.pop(key, None)
+            candidates = [key for key, _ in heapq.nlargest(FUZZY_CANDIDATES, shared.items(), key=lambda e: e[1])]
+
+        matches = []
+        for key in candidates:
+            best = None
+            for text in self._texts[key]:
+                score = 1 - substring_distance(query, text) / len(query)
+                if best is None or score > best[0] or score == best[0] and len(text) < len(best[1]):
+                    best = (score, text)
+            if best is not None and best[0] >= self.fuzzy_threshold:
+                matches.append(SearchResult(key, best[1], best[0], False))
+        matches.sort(key=lambda r: (-r.score, len(r.text), r.text))
+        return matches
+
+    def apply_roster_events(self, events):
+        """Keeps the index up to date from RosterStore events. Old names of renamed players stay searchable."""
+        for ev in events:
+            if ev.name:
+                self.add(ev.playfab_id, ev.playfab_id, ev.name)
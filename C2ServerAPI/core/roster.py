@@ -0,0 +1,200 @@
+"""Roster state kept across listplayers snapshots.
+
+RosterStore remembers every player seen on a server, keyed by PlayFab ID, and turns each new snapshot into join,
+    leave and rename events. Features that care about who is on the server subscribe to these events instead of
+    comparing player lists themselves.
+
+ServerRosters keeps one RosterStore per server, picked from the server identity in the snapshot header, and
+    indexes which servers every PlayFab ID is on according to their latest snapshots."""
+
+import time
+from collections import namedtuple
+
+JOIN = "join"
+LEAVE = "leave"
+RENAME = "rename"
+
+RosterEvent = namedtuple("RosterEvent", ["kind", "playfab_id", "name", "old_name", "timestamp", "server"],
+                         defaults=(None,))
+RosterEvent.__doc__ = """A change between two snapshots. old_name is only set for renames, server is the key of the
+    server (see server_key) when the store belongs to a ServerRosters."""
+
+ServerPresence = namedtuple("ServerPresence", ["server", "server_name", "address", "last_update"])
+ServerPresence.__doc__ = """A server a player is on according to its latest snapshot, taken at last_update."""
+
+def server_key(roster):
+    """Identifies the server of a listplayers snapshot: its name, else its IP:port, else an empty string.
+
+    This is the identity of a server for every feature: rosters, player history, roster archive, and the server
+        names of the Discord routes, which moderators write by name. A renamed server is a new server."""
+    return roster.server_name or roster.address or ""
+
+class TrackedPlayer:
+    """A player seen at least once, with the time of the first and last snapshot they were in, and the time of
+        the snapshot where their current (or last) stay on the server began."""
+    __slots__ = ("playfab_id", "name", "eos_id", "first_seen", "last_seen", "joined_at", "online")
+
+    def __init__(self, playfab_id, name, eos_id, timestamp):
+        self.playfab_id = playfab_id
+        self.name = name
+        self.eos_id = eos_id
+        self.first_seen = timestamp
+        self.last_seen = timestamp
+        self.joined_at = timestamp
+        self.online = True
+
+    def time_on_server(self, now=None):
+        """Seconds since the player joined, or length of their last stay if they left."""
+        end = (time.time() if now is None else now) if self.online else self.last_seen
+        return max(0, end - self.joined_at)
+
+    def __repr__(self):
+        return f"TrackedPlayer({self.name!r}, {self.playfab_id!r}, online={self.online})"
+
+class RosterStore:
+    """Current and past players of a server, updated from listplayers snapshots."""
+    def __init__(self, server=None):
+        """@param server: Key of the server, copied into the events"""
+        self.server = server
+        self.server_name = None
+        self.address = None
+        self.players = {} #PlayFab ID -> TrackedPlayer, including players who left
+        self.online = set() #PlayFab IDs in the latest snapshot
+        self.last_update = None
+        self.snapshot_count = 0
+        self.last_events = [] #RosterEvent of the latest snapshot, empty if it changed nothing
+        self._subscribers = []
+
+    def subscribe(self, callback):
+        """Registers callback to be called with the list of RosterEvent produced by each snapshot. It is not
+            called for snapshots that changed nothing."""
+        if callback not in self._subscribers:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def recent_joins(self):
+        """Returns the PlayFab IDs that joined in the latest snapshot. Empty after the first snapshot, where
+            everyone "joins"."""
+        if self.snapshot_count <= 1:
+            return set()
+        return {ev.playfab_id for ev in self.last_events if ev.kind == JOIN}
+
+    def online_players(self):
+        """Returns the TrackedPlayer of everyone in the latest snapshot."""
+        return [self.players[pid] for pid in self.online]
+
+    def apply(self, roster, timestamp=None):
+        """Updates the store with a listplayers snapshot and publishes the resulting events.
+
+        This is a single pass over the snapshot plus one over the players who were online before.
+
+        @param roster: listplayers.ServerRoster
+        @param timestamp: Time of the snapshot, now by default
+        @returns The list of RosterEvent, joins and renames in snapshot order followed by leaves
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        server = self.server
+        self.server_name = roster.server_name or self.server_name
+        self.address = roster.address or self.address
+        events = []
+        seen = set()
+        for row in roster.players:
+            pid = row.playfab_id
+            seen.add(pid)
+            player = self.players.get(pid)
+            if player is None:
+                self.players[pid] = TrackedPlayer(pid, row.name, row.eos_id, timestamp)
+                events.append(RosterEvent(JOIN, pid, row.name, None, timestamp, server))
+                continue
+            if not player.online:
+                player.online = True
+                player.joined_at = timestamp
+                events.append(RosterEvent(JOIN, pid, row.name, None, timestamp, server))
+            if player.name != row.name:
+                events.append(RosterEvent(RENAME, pid, row.name, player.name, timestamp, server))
+                player.name = row.name
+            player.last_seen = timestamp
+
+        for pid in self.online - seen:
+            player = self.players[pid]
+            player.online = False
+            events.append(RosterEvent(LEAVE, pid, player.name, None, timestamp, server))
+
+        self.online = seen
+        self.last_update = timestamp
+        self.snapshot_count += 1
+        self.last_events = events
+        if events:
+            for callback in list(self._subscribers):
+                try:
+                    callback(events)
+                except Exception as e:
+                    print(f"[ROSTER] Roster subscriber failed: {e}")
+        return events
+
+class ServerRosters:
+    """One RosterStore per server, and an index of the servers each PlayFab ID is on right now.
+
+    Subscribers receive the events of every server, each event carrying the key of its server.
+    """
+    def __init__(self):
+        self.stores = {} #server key -> RosterStore
+        self.current = None #key of the server of the latest snapshot
+        self._locations = {} #PlayFab ID -> set of server keys whose latest snapshot has them
+        self._subscribers = []
+
+    def subscribe(self, callback):
+        """Registers callback to be called with the list of RosterEvent produced by each snapshot, whatever
+            its server."""
+        if callback not in self._subscribers:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def store(self, server=None):
+        """Returns the RosterStore of a server, by default the one of the latest snapshot, or None."""
+        return self.stores.get(self.current if server is None else server)
+
+    def apply(self, roster, timestamp=None):
+        """Routes a listplayers snapshot to the store of its server and publishes the resulting events.
+
+        @returns The list of RosterEvent
+        """
+        key = server_key(roster)
+        store = self.stores.get(key)
+        if store is None:
+            store = self.stores[key] = RosterStore(key)
+        self.current = key
+        events = store.apply(roster, timestamp)
+        for ev in events:
+            if ev.kind == JOIN:
+                self._locations.setdefault(ev.playfab_id, set()).add(key)
+            elif ev.kind == LEAVE:
+                servers = self._locations.get(ev.playfab_id)
+                if servers is not None:
+                    servers.discard(key)
+                    if not servers:
+                        del self._locations[ev.playfab_id]
+        if events:
+            for callback in list(self._subscribers):
+                try:
+                    callback(events)
+                except Exception as e:
+                    print(f"[ROSTER] Roster subscriber failed: {e}")
+        return events
+
+    def where_is(self, playfab_id):
+        """Returns a ServerPresence for every server the player is on in its latest snapshot, most recent
+            snapshot first. A player only moves between servers from one snapshot to the next, so there is
+            usually one, unless the other server has not been refreshed since the player left it."""
+        presences = []
+        for key in self._locations.get(playfab_id, ()):
+            store = self.stores[key]
+            presences.append(ServerPresence(key, store.server_name, store.address, store.last_update))
+        presences.sort(key=lambda p: p.last_update, reverse=True)
+        return presences
@@ -0,0 +1,231 @@
+"""Append-only archive of listplayers snapshots, to answer "who was on a server at time T".
+
+Each line of the archive file is one record:
+    K<TAB><timestamp><TAB><server><TAB>{"players": [[playfab_id, name], ...]}
+    D<TAB><timestamp><TAB><server><TAB>{"join": [[playfab_id, name], ...], "leave": [playfab_id, ...]}
+
+where <server> is the JSON string of the server key (see roster.server_key). Every server has its own stream of
+    records, interleaved in the file. A keyframe (K) holds a full roster, a delta (D) only what changed since the
+    previous record of the same server, renames being stored as joins. Snapshots that changed nothing are not
+    written, so the file grows with churn rather than with the size of the roster or with switches between
+    servers. A keyframe is written every keyframe_interval deltas of a server, so reading its roster at any time
+    means seeking to its last keyframe before it and replaying a bounded number of its deltas. The first snapshot
+    of every server in a session is a keyframe too, as players may have come and gone while the program was
+    closed.
+
+The offsets and times of the keyframes of every server are kept in memory as the time index. It is rebuilt when
+    the archive is opened from the record prefixes; only the records since the last keyframe of each server are
+    decoded, to resume from its latest roster. A corrupt record is skipped, it does not hide the ones after it."""
+
+import bisect
+import json
+import os
+import threading
+from collections import namedtuple
+
+from .roster import server_key
+
+ARCHIVE_FILE = "rosterarchive.log"
+
+ArchivedRoster = namedtuple("ArchivedRoster", ["timestamp", "server", "players"])
+ArchivedRoster.__doc__ = """The roster as of an archive record: time of the snapshot it comes from, server key and
+    a dict of PlayFab ID to name."""
+
+KEYFRAME = b"K"
+DELTA = b"D"
+
+class _Stream:
+    """Time index and latest roster of the records of one server."""
+    def __init__(self, server):
+        self.server = server
+        self.keyframe_times = []
+        self.keyframe_offsets = []
+        self.since_keyframe = 0
+        self.last_timestamp = None
+        self.new_session = True
+        self.players = {}
+
+    def indexed(self, kind, timestamp, offset):
+        if kind == KEYFRAME:
+            self.keyframe_times.append(timestamp)
+            self.keyframe_offsets.append(offset)
+            self.since_keyframe = 0
+        else:
+            self.since_keyframe += 1
+        self.last_timestamp = timestamp
+
+def _parse_record(line):
+    """Splits an archive line.
+
+    @returns (kind, timestamp, server, payload bytes)
+    @raises ValueError if the line is not a record
+    """
+    parts = line.rstrip(b"\n").split(b"\t", 3)
+    if len(parts) != 4:
+        raise ValueError("not an archive record")
+    kind, timestamp, server, payload = parts
+    server = json.loads(server)
+    if kind not in (KEYFRAME, DELTA) or not isinstance(server, str) and server is not None:
+        raise ValueError("not an archive record")
+    return kind, float(timestamp), server, payload
+
+class RosterArchive:
+    """Stores every roster change of every server in an append-only file and rebuilds the roster of a server at
+        any past time."""
+    def __init__(self, path=ARCHIVE_FILE, keyframe_interval=50):
+        """@param keyframe_interval: Number of deltas of a server after which its full roster is written again"""
+        self.path = path
+        self.keyframe_interval = keyframe_interval
+        self._lock = threading.Lock()
+        self._streams = {} # server key -> _Stream
+        self._current = None # server of the latest record
+        self._open()
+
+    def _stream(self, server):
+        stream = self._streams.get(server)
+        if stream is None:
+            stream = self._streams[server] = _Stream(server)
+        return stream
+
+    def _open(self):
+        size = 0
+        if os.path.exists(self.path):
+            skipped = 0
+            with open(self.path, 'rb') as f:
+                offset = 0
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        # Cut short by a crash, always the last line
+                        break
+                    try:
+                        kind, timestamp, server, _ = _parse_record(line)
+                    except ValueError:
+                        skipped += 1
+                    else:
+                        self._stream(server).indexed(kind, timestamp, offset)
+                        self._current = server
+                    offset += len(line)
+                size = offset
+            if skipped:
+                print(f"[ARCHIVE] Skipped {skipped} corrupt records of {self.path}")
+            if size != os.path.getsize(self.path):
+                # Drop a record cut short by a crash, it would corrupt the next one
+                print(f"[ARCHIVE] Dropping an incomplete record at the end of {self.path}")
+                with open(self.path, 'r+b') as f:
+                    f.truncate(size)
+        for stream in self._streams.values():
+            if stream.keyframe_times:
+                stream.players = dict(self._read_at(stream, stream.last_timestamp).players)
+            else:
+                # Only deltas survived, start over with a keyframe
+                stream.new_session = True
+        self._file = open(self.path, 'ab')
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def _append(self, stream, kind, timestamp, payload):
+        offset = self._file.tell()
+        line = b"\t".join((
+            kind,
+            repr(float(timestamp)).encode(),
+            json.dumps(stream.server, ensure_ascii=False).encode("utf-8"),
+            json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8"),
+        )) + b"\n"
+        self._file.write(line)
+        self._file.flush()
+        stream.indexed(kind, timestamp, offset)
+        self._current = stream.server
+
+    def record(self, roster, timestamp):
+        """Archives a listplayers snapshot in the stream of its server.
+
+        @param roster: listplayers.ServerRoster
+        @param timestamp: Time of the snapshot, must not be older than the previous one of the same server
+        @returns "keyframe", "delta", or None if nothing changed and nothing was written
+        """
+        players = {row.playfab_id: row.name for row in roster.players}
+        with self._lock:
+            stream = self._stream(server_key(roster))
+            if stream.last_timestamp is not None and timestamp < stream.last_timestamp:
+                print("[ARCHIVE] Ignoring a snapshot older than the last archived one of its server")
+                return None
+            if stream.new_session or stream.since_keyframe >= self.keyframe_interval:
+                self._append(stream, KEYFRAME, timestamp, {"players": [list(p) for p in players.items()]})
+                written = "keyframe"
+                stream.new_session = False
+            else:
+                joins = [[pid, name] for pid, name in players.items() if stream.players.get(pid) != name]
+                leaves = [pid for pid in stream.players if pid not in players]
+                if not joins and not leaves:
+                    return None
+                self._append(stream, DELTA, timestamp, {"join": joins, "leave": leaves})
+                written = "delta"
+            stream.players = players
+        return written
+
+    def _read_at(self, stream, timestamp):
+        i = bisect.bisect_right(stream.keyframe_times, timestamp) - 1
+        if i < 0:
+            return None
+        with open(self.path, 'rb') as f:
+            while True:
+                f.seek(stream.keyframe_offsets[i])
+                _, record_time, _, payload = _parse_record(f.readline())
+                try:
+                    players = dict(json.loads(payload)["players"])
+                    break
+                except (ValueError, KeyError, TypeError):
+                    # A corrupt keyframe: start from the one before
+                    i -= 1
+                    if i < 0:
+                        return None
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    kind, line_time, server, payload = _parse_record(line)
+                except ValueError:
+                    continue
+                if server != stream.server:
+                    continue
+                if kind == KEYFRAME or line_time > timestamp:
+                    break
+                try:
+                    data = json.loads(payload)
+                    leaves, joins = data["leave"], data["join"]
+                except (ValueError, KeyError):
+                    continue
+                for pid in leaves:
+                    players.pop(pid, None)
+                players.update(joins)
+                record_time = line_time
+        return ArchivedRoster(record_time, stream.server, players)
+
+    def servers(self):
+        """Returns the keys of every archived server, the one of the latest record first."""
+        with self._lock:
+            return sorted(self._streams, key=lambda s: self._streams[s].last_timestamp or 0, reverse=True)
+
+    def roster_at(self, timestamp, server=None):
+        """Returns the ArchivedRoster of a server in effect at timestamp, or None if its archive starts later.
+
+        @param server: Key of the server, by default the one of the latest record
+        """
+        with self._lock:
+            self._file.flush()
+            stream = self._streams.get(self._current if server is None else server)
+            if stream is None:
+                return None
+            return self._read_at(stream, timestamp)
+
+    def time_range(self, server=None):
+        """Returns the times of the first and last records, of one server or of all of them, or None if there
+            are none."""
+        with self._lock:
+            streams = self._streams.values() if server is None else [self._streams.get(server)]
+            streams = [s for s in streams if s is not None and s.keyframe_times]
+            if not streams:
+                return None
+            return min(s.keyframe_times[0] for s in streams), max(s.last_timestamp for s in streams)
@@ -0,0 +1,72 @@
+"""Reads the in-game scoreboard row by row.
+
+The scoreboard crop is split into one strip per player row using its horizontal projection, and the strips are
+    recognized in parallel on the OCR pool. This is the fallback when the clipboard output of listplayers is not
+    available."""
+
+import re
+from collections import Counter, namedtuple
+
+from . import ocrLib
+
+ScoreboardRow = namedtuple("ScoreboardRow", ["name", "score", "confidence"])
+ScoreboardRow.__doc__ = """A player row of the scoreboard. score is None when it could not be read, confidence goes
+    from 0 to 100."""
+
+_INTEGER = re.compile(r"^-?\d+$")
+_HEADER = re.compile(r"^(name|player)\b", re.IGNORECASE)
+
+def trailingNumbers(text):
+    """Returns how many integer columns end the OCR text of a row, always leaving at least one word for the name."""
+    tokens = text.split()
+    count = 0
+    while count < len(tokens) - 1 and _INTEGER.match(tokens[-1 - count]):
+        count += 1
+    return count
+
+def parseScoreboardRow(text, confidence=-1, columns=None):
+    """Splits the OCR text of a scoreboard row into the player name and score.
+
+    The score is the first column of numbers following the name.
+
+    @param columns: Number of integer columns of the scoreboard. Without it, a name ending in a separate
+        number, like "Knight 42", loses that number to the columns
+    @returns A ScoreboardRow, or None if the text is empty or a column header
+    """
+    tokens = text.split()
+    if not tokens or _HEADER.match(text.strip()):
+        return None
+    trailing = trailingNumbers(text)
+    if columns is not None:
+        #numbers beyond the columns belong to the name
+        trailing = min(trailing, columns)
+    end = len(tokens) - trailing
+    name = " ".join(tokens[:end])
+    score = int(tokens[end]) if end < len(tokens) else None
+    return ScoreboardRow(name, score, confidence)
+
+def countColumns(texts):
+    """Returns the number of integer columns of a scoreboard, the most common count among its rows, or None.
+
+    Rows whose name ends in a number show one more, and rows where OCR missed a column one less, but they are
+        few enough not to change the most common count.
+    """
+    counts = Counter(trailingNumbers(text) for text in texts if text.strip() and not _HEADER.match(text.strip()))
+    counts.pop(0, None)
+    if not counts:
+        return None
+    return counts.most_common(1)[0][0]
+
+def readScoreboard(image):
+    """Recognizes every player row of a scoreboard crop.
+
+    @param image: PIL image of the scoreboard area
+    @returns A list of ScoreboardRow, from top to bottom
+    """
+    image = ocrLib.binarize(image)
+    width = image.size[0]
+    strips = [ocrLib.padImage(image.crop((0, top, width, bottom))) for top, bottom in ocrLib.rowBands(image)]
+    results = ocrLib.recognizeMany(strips, config=ocrLib.SINGLE_LINE_CONFIG, withConfidence=True)
+    columns = countColumns(text for text, _ in results)
+    rows = [parseScoreboardRow(text, confidence, columns) for text, confidence in results]
+    return [row for row in rows if row is not None]
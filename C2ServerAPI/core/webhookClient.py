@@ -0,0 +1,209 @@
+"""Minimal Discord webhook client, on the standard library only.
+
+Importing discord.py pulls in aiohttp and most of asyncio, which noticeably slows down the start of the program,
+    and its SyncWebhook opens a new HTTPS connection for every message. Executing a webhook is a single JSON
+    POST, so this client sends it with http.client instead, over keep-alive connections kept in a pool per
+    host: after the first message, sending skips the TCP and TLS handshakes. The pool is shared by every
+    webhook of the same host, i.e. all the Discord webhooks.
+
+Failed sends raise a WebhookError carrying the HTTP status and, when rate limited, the delay Discord asks for,
+    which is what the dispatcher needs to decide whether and when to retry."""
+
+import http.client
+import json
+import os
+import select
+import ssl
+import uuid
+import threading
+import time
+from urllib.parse import urlsplit
+
+USER_AGENT = "C2ServerAPI Moderation Panel"
+
+class WebhookError(Exception):
+    """A webhook request Discord answered with an error status."""
+    def __init__(self, message, status=None, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+class ConnectionPool:
+    """Idle keep-alive HTTP connections, per scheme, host and port. Safe to use from several threads: a
+        connection is used by one request at a time, threads sending at once get a connection each."""
+    def __init__(self, max_idle=4, timeout=10.0, idle_timeout=30.0):
+        """@param max_idle: Most idle connections kept per host
+        @param timeout: Seconds to wait for the server when connecting and reading
+        @param idle_timeout: Connections idle for longer are closed rather than reused, as the server has
+            likely closed its end already
+        """
+        self.max_idle = max_idle
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        self._idle = {} # (scheme, host, port) -> list of (connection, time it was released)
+        self._ssl_context = None
+
+    def _connect(self, scheme, host, port):
+        if scheme == "https":
+            if self._ssl_context is None:
+                self._ssl_context = ssl.create_default_context()
+            return http.client.HTTPSConnection(host, port, timeout=self.timeout, context=self._ssl_context)
+        return http.client.HTTPConnection(host, port, timeout=self.timeout)
+
+    @staticmethod
+    def _dropped(conn):
+        """Tells whether the server closed an idle connection: it then reads as ready, at its end."""
+        if conn.sock is None:
+            return True
+        try:
+            return bool(select.select([conn.sock], [], [], 0)[0])
+        except (OSError, ValueError):
+            return True
+
+    def _acquire(self, key):
+        """Returns (connection, True if it was used before)."""
+        now = time.monotonic()
+        with self._lock:
+            idle = self._idle.get(key, [])
+            while idle:
+                conn, released = idle.pop()
+                if now - released < self.idle_timeout and not self._dropped(conn):
+                    return conn, True
+                conn.close()
+        return self._connect(*key), False
+
+    def _release(self, key, conn):
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle:
+                idle.append((conn, time.monotonic()))
+                return
+        conn.close()
+
+    def close(self):
+        with self._lock:
+            for idle in self._idle.values():
+                for conn, _ in idle:
+                    conn.close()
+            self._idle.clear()
+
+    def request(self, method, url, body=None, headers=None):
+        """Sends a request and reads the whole response.
+
+        A reused connection the server closed while sending is replaced by a new one and the request sent again:
+            the server cannot have read it. A request that fails once sent is not sent again, as the server may
+            have processed it; when the caller retries it, e.g. the dispatcher, the message may be posted twice.
+
+        @returns (status, reason, headers, body)
+        """
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        port = parts.port or (443 if scheme == "https" else 80)
+        key = (scheme, parts.hostname, port)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        while True:
+            conn, reused = self._acquire(key)
+            try:
+                conn.request(method, path, body=body, headers=headers or {})
+            except (ConnectionResetError, BrokenPipeError):
+                conn.close()
+                if reused:
+                    # The server closed the idle connection in the meantime: try again on a new one
+                    continue
+                raise
+            except Exception:
+                conn.close()
+                raise
+            try:
+                response = conn.getresponse()
+                data = response.read()
+            except Exception:
+                conn.close()
+                raise
+            if response.will_close:
+                conn.close()
+            else:
+                self._release(key, conn)
+            return response.status, response.reason, response.headers, data
+
+def multipart_body(payload, files):
+    """Encodes a message with file uploads as multipart/form-data, the way Discord expects it: the JSON
+        payload in a payload_json part, listing the files as attachments, and one files[n] part per file.
+
+    @returns (body, content type)
+    """
+    boundary = uuid.uuid4().hex
+    payload = dict(payload)
+    payload["attachments"] = [{"id": i, "filename": os.path.basename(path)} for i, path in enumerate(files)]
+    parts = [(
+        b'Content-Disposition: form-data; name="payload_json"\r\nContent-Type: application/json\r\n\r\n',
+        json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    )]
+    for i, path in enumerate(files):
+        name = os.path.basename(path).replace('"', '')
+        with open(path, 'rb') as f:
+            content = f.read()
+        parts.append((
+            f'Content-Disposition: form-data; name="files[{i}]"; filename="{name}"\r\n'
+            f'Content-Type: application/octet-stream\r\n\r\n'.encode("utf-8"),
+            content
+        ))
+    body = b"".join(b"--" + boundary.encode() + b"\r\n" + head + content + b"\r\n" for head, content in parts)
+    body += b"--" + boundary.encode() + b"--\r\n"
+    return body, f"multipart/form-data; boundary={boundary}"
+
+# Shared by every webhook client created without a pool of its own
+default_pool = ConnectionPool()
+
+class WebhookClient:
+    """Executes a Discord webhook. Usable as a dispatcher destination."""
+    def __init__(self, url, pool=None):
+        """@param url: Webhook URL, e.g. https://discord.com/api/webhooks/<id>/<token>
+        @param pool: ConnectionPool to send through, default_pool by default
+        """
+        parts = urlsplit(url)
+        if parts.scheme.lower() not in ("http", "https") or not parts.hostname:
+            raise ValueError(f"Invalid webhook URL: {url}")
+        self.url = url
+        self.pool = pool if pool is not None else default_pool
+
+    @classmethod
+    def from_url(cls, url, pool=None):
+        return cls(url, pool)
+
+    def post(self, payload):
+        """Sends a message.
+
+        @param payload: JSON body of the message, e.g. {"username": ..., "embeds": [...]}, plus optionally
+            "files", a list of paths of files to upload with it. Files that no longer exist are left out.
+        @raises WebhookError if Discord refused it, OSError if it could not be reached
+        """
+        files = [path for path in payload.get("files", ()) if os.path.exists(path)]
+        payload = {key: value for key, value in payload.items() if key != "files"}
+        if files:
+            body, content_type = multipart_body(payload, files)
+        else:
+            body = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+            content_type = "application/json"
+        status, reason, headers, data = self.pool.request("POST", self.url, body, {
+            "Content-Type": content_type,
+            "User-Agent": USER_AGENT,
+        })
+        if 200 <= status < 300:
+            return
+        try:
+            details = json.loads(data)
+        except ValueError:
+            details = {}
+        if not isinstance(details, dict):
+            details = {}
+        retry_after = details.get("retry_after", headers.get("Retry-After"))
+        try:
+            retry_after = float(retry_after) if retry_after is not None else None
+        except (TypeError, ValueError):
+            retry_after = None
+        message = details.get("message") or data[:200].decode("utf-8", "replace")
+        raise WebhookError(f"{status} {reason}: {message}", status, retry_after)
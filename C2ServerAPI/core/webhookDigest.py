@@ -0,0 +1,165 @@
+"""Digest of low-severity Discord notifications.
+
+Instead of one message per kick, the notifications of the digest categories are gathered for a window of time,
+    then sent as one summary per category and server. The first notification of a window starts it; when it
+    ends, every summary is handed to the flush callback, which sends it.
+
+The gathered notifications are kept in memory, and every one of them is also appended to a journal file, so
+    that a digest interrupted by a crash or by closing the program is not lost: the journal is replayed at the
+    next start, and the digest is sent once its window is over and the webhooks are set up. The journal is
+    emptied once every summary is handed over to the outbox, so a crash between the two can at worst send a
+    digest twice. Summaries the outbox refuses, e.g. when it is full, stay in the digest and the journal, and
+    are tried again a window later.
+
+Bans are never held back, even if asked for."""
+
+import json
+import os
+import threading
+import time
+
+DIGEST_FILE = "webhookdigest.log"
+
+# Categories always sent at once
+IMMEDIATE_CATEGORIES = frozenset({"ban"})
+
+class WebhookDigest:
+    """Notifications waiting for the end of their digest window. Safe to use from several threads."""
+    def __init__(self, path=DIGEST_FILE, categories=(), window=600.0, on_flush=None, paused=False):
+        """@param path: Journal file, None to keep the digest in memory only
+        @param categories: Categories to send as a digest
+        @param window: Seconds from the first notification of a digest to its sending
+        @param on_flush: Called with (category, server, entries, start, end) for every summary to send, where
+            entries is the list of entry dicts given to add() and start and end the times of the first and last.
+            Returns True if the summary was accepted, False to keep it for later
+        @param paused: Whether to wait for resume() before sending anything, e.g. until there is somewhere to
+            send it
+        """
+        self.path = path
+        self.on_flush = on_flush
+        self.categories = frozenset()
+        self.window = window
+        self._paused = paused
+        self._lock = threading.RLock()
+        self._groups = {} # (category, server) -> list of (timestamp, entry)
+        self._started = None # time the digest window started, usually that of the oldest entry
+        self._timer = None
+        self._file = None
+        if path is not None:
+            self._load()
+            self._file = open(path, 'a', encoding='utf-8')
+        self.configure(categories, window)
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    self._remember(record["c"], record["s"], record["e"], record["t"])
+                except (ValueError, KeyError, TypeError):
+                    # A record cut short by a crash, nothing after it was written
+                    break
+        if self._groups:
+            print(f"[WEBHOOK] Resuming a digest of {self.pending} notifications from {self.path}")
+
+    def _remember(self, category, server, entry, timestamp):
+        self._groups.setdefault((category, server), []).append((timestamp, entry))
+        if self._started is None or timestamp < self._started:
+            self._started = timestamp
+
+    def configure(self, categories, window=None):
+        """Changes the digest categories and window. Notifications already waiting stay in the digest."""
+        with self._lock:
+            self.categories = frozenset(categories) - IMMEDIATE_CATEGORIES
+            if window is not None:
+                self.window = window
+            self._schedule()
+
+    def accepts(self, category):
+        """True if notifications of category go to the digest."""
+        return category in self.categories
+
+    @property
+    def pending(self):
+        """Number of notifications waiting in the digest."""
+        with self._lock:
+            return sum(len(entries) for entries in self._groups.values())
+
+    def add(self, category, server, entry, timestamp=None):
+        """Adds a notification to the digest.
+
+        @param entry: JSON serializable dict describing the notification
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            self._remember(category, server, entry, timestamp)
+            if self._file is not None:
+                self._journal(category, server, entry, timestamp)
+                self._file.flush()
+            if self._timer is None:
+                self._schedule()
+
+    def _journal(self, category, server, entry, timestamp):
+        self._file.write(json.dumps({"t": timestamp, "c": category, "s": server, "e": entry},
+                                    separators=(",", ":"), ensure_ascii=False) + "\n")
+
+    def resume(self):
+        """Starts sending the digests, after being created paused."""
+        with self._lock:
+            self._paused = False
+            self._schedule()
+
+    def _schedule(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._started is None or self._paused:
+            return
+        self._timer = threading.Timer(max(0.0, self._started + self.window - time.time()), self.flush)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def flush(self):
+        """Hands every summary to the flush callback now and starts a new digest. Summaries it did not accept
+            start the new digest, to be tried again at its end."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            groups = self._groups
+            self._groups = {}
+            self._started = None
+            for (category, server), entries in groups.items():
+                if self.on_flush is None:
+                    continue
+                try:
+                    accepted = self.on_flush(category, server, [entry for _, entry in entries], entries[0][0],
+                                             entries[-1][0])
+                except Exception as e:
+                    print(f"[WEBHOOK] Could not send the {category} digest: {e}")
+                    accepted = False
+                if not accepted:
+                    self._groups[(category, server)] = entries
+            if self._groups:
+                print(f"[WEBHOOK] {self.pending} digest notifications could not be sent, retrying later")
+                # A full window from now, not from the oldest entry, which would be right away
+                self._started = time.time()
+            if self._file is not None:
+                self._file.truncate(0)
+                self._file.seek(0)
+                for (category, server), entries in self._groups.items():
+                    for timestamp, entry in entries:
+                        self._journal(category, server, entry, timestamp)
+                self._file.flush()
+            self._schedule()
+
+    def close(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if self._file is not None:
+                self._file.close()
+                self._file = None
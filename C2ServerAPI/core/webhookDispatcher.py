@@ -0,0 +1,310 @@
+"""Delivers Discord notifications from a background thread, through a persistent outbox.
+
+Sending a webhook is a blocking HTTPS request that can take seconds when Discord is slow, so callers only store
+    a notification in the outbox (see webhookOutbox) and return. A worker thread takes the oldest pending
+    deliveries of every destination and sends them all at once on a small thread pool. Failed deliveries are
+    retried with exponential backoff, or after the delay Discord asks for when rate limiting, and deliveries
+    left in the outbox when the program closes are sent at the next start.
+
+A Discord message holds up to 10 embeds, and a webhook is rate limited per message, so a burst of moderation
+    actions is sent as a few messages of several embeds rather than one message each. A new delivery waits up to
+    linger seconds for others to join it, or less if a full message is already waiting. Deliveries sent together
+    succeed or fail together, except when Discord rejects the message for good: one bad notification must not
+    take the others down with it, so they are all sent again one by one, and only the ones rejected on their
+    own are given up.
+
+Every delivery attempt ends in a DeliveryResult handed to the subscribers, from the worker threads: GUI
+    subscribers must forward it to their own thread, e.g. through a Qt signal."""
+
+import atexit
+import random
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait
+from itertools import takewhile
+
+from .webhookOutbox import WebhookOutbox
+from .webhookRouting import EVERY_DESTINATION
+
+DeliveryResult = namedtuple("DeliveryResult", ["destination", "category", "ok", "error", "latency", "retry_in",
+                                               "status"], defaults=(None, None))
+DeliveryResult.__doc__ = """Outcome of sending a notification to one destination. error is the error message when ok
+    is False, latency the seconds from queueing to the end of the send, retry_in the seconds before the next
+    attempt of a failed delivery, None if it was given up, status the HTTP status of a failed send if known."""
+
+# Discord limits of a single message
+MAX_EMBEDS = 10
+MAX_EMBED_CHARACTERS = 6000
+
+def embed_size(embed):
+    """Number of characters of an embed counted by Discord against MAX_EMBED_CHARACTERS."""
+    size = len(embed.get("title") or "") + len(embed.get("description") or "")
+    size += len((embed.get("footer") or {}).get("text") or "") + len((embed.get("author") or {}).get("name") or "")
+    for field in embed.get("fields") or ():
+        size += len(field.get("name") or "") + len(field.get("value") or "")
+    return size
+
+def pack_deliveries(deliveries):
+    """Returns the longest run of deliveries, oldest first, whose embeds fit in one message. The first delivery
+        is always included, even if it is too large on its own: Discord will reject it and it will be given up."""
+    batch = deliveries[:1]
+    first = deliveries[0].payload
+    embeds = len(first.get("embeds", ()))
+    size = sum(embed_size(e) for e in first.get("embeds", ()))
+    for delivery in deliveries[1:]:
+        payload = delivery.payload
+        # Only embeds can be merged, a message has a single author and content
+        if set(payload) - {"username", "embeds"} or set(first) - {"username", "embeds"} \
+                or payload.get("username") != first.get("username"):
+            break
+        extra = payload.get("embeds", ())
+        extra_size = sum(embed_size(e) for e in extra)
+        if embeds + len(extra) > MAX_EMBEDS or size + extra_size > MAX_EMBED_CHARACTERS:
+            break
+        batch.append(delivery)
+        embeds += len(extra)
+        size += extra_size
+    return batch
+
+def merge_payloads(deliveries):
+    """Returns the payload of one message carrying the embeds of every delivery."""
+    if len(deliveries) == 1:
+        return deliveries[0].payload
+    payload = dict(deliveries[0].payload)
+    payload["embeds"] = [embed for delivery in deliveries for embed in delivery.payload.get("embeds", ())]
+    return payload
+
+# Statuses meaning the webhook itself is wrong: retrying will not help
+PERMANENT_STATUSES = (400, 401, 403, 404)
+
+def error_status(error):
+    """HTTP status of a failed send, if the error carries one."""
+    return getattr(error, "status", None)
+
+def error_retry_after(error):
+    """Seconds Discord asked to wait before retrying, from a rate limit error, or None."""
+    value = getattr(error, "retry_after", None)
+    if value is None:
+        headers = getattr(getattr(error, "response", None), "headers", None)
+        if headers is not None:
+            value = headers.get("Retry-After")
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+class WebhookDispatcher:
+    """Sends stored notifications to every destination concurrently, off the calling thread."""
+    def __init__(self, outbox=None, max_pending=1000, workers=4, base_delay=2.0, max_delay=600.0, linger=1.0):
+        """@param outbox: WebhookOutbox storing the notifications, in memory only by default
+        @param max_pending: Most deliveries waiting to be sent; submit() refuses more
+        @param workers: Threads sending to destinations in parallel
+        @param base_delay: Delay before the first retry, doubled after every failure up to max_delay
+        @param linger: Seconds a new delivery waits for others to be sent in the same message, 0 to send at once
+        """
+        self.outbox = outbox if outbox is not None else WebhookOutbox(":memory:")
+        self.max_pending = max_pending
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.linger = linger
+        # Sent deliveries, and the requests it took to send them
+        self.delivered = 0
+        self.requests = 0
+        self.destinations = {} #name -> webhook client with a post(payload) method
+        self.routes = None #webhookRouting.RoutingTable, None to send everything everywhere
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="webhook")
+        self._subscribers = []
+        # Deliveries of a rejected message, to be sent alone
+        self._isolated = set()
+        # Destination name -> future of the message being sent to it, one at a time to keep it in order
+        self._sending = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def set_destinations(self, destinations):
+        """Sets the webhooks to send to and starts sending, including what is left in the outbox. Deliveries left
+            for other destinations are given up, they would never be sent.
+
+        @param destinations: dict of name to webhook client; clients that are None are left out
+        """
+        with self._lock:
+            self.destinations = {name: hook for name, hook in destinations.items() if hook is not None}
+            names = list(self.destinations)
+        abandoned = self.outbox.abandon_other_destinations(names)
+        if abandoned:
+            print(f"[WEBHOOK] Giving up on {abandoned} notifications for webhooks that are no longer configured")
+        self.start()
+        self._wakeup.set()
+
+    def set_routes(self, routes):
+        """Sets the RoutingTable choosing the destinations of each notification, None to send every
+            notification to every destination."""
+        with self._lock:
+            self.routes = routes
+
+    def subscribe(self, callback):
+        """Registers callback to be called with every DeliveryResult, from a worker thread."""
+        if callback not in self._subscribers:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    @property
+    def pending(self):
+        """Number of deliveries waiting to be sent to the configured destinations."""
+        with self._lock:
+            names = list(self.destinations)
+        return self.outbox.pending_count(names)
+
+    def pending_stats(self):
+        """Returns the outbox pending_stats() of the configured destinations."""
+        with self._lock:
+            names = list(self.destinations)
+        return self.outbox.pending_stats(names)
+
+    @property
+    def requests_saved(self):
+        """Number of requests batching avoided so far."""
+        return self.delivered - self.requests
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="webhook-dispatcher", daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+
+    def stop(self, timeout=5):
+        """Stops the worker thread, then waits up to timeout seconds for the sends in progress. Deliveries not
+            sent yet stay in the outbox."""
+        if self._thread is None:
+            return
+        deadline = time.time() + timeout
+        self._stopping.set()
+        self._wakeup.set()
+        self._thread.join(timeout)
+        self._thread = None
+        with self._lock:
+            sending = list(self._sending.values())
+        wait(sending, max(0.0, deadline - time.time()))
+
+    def submit(self, category, payload, server=None):
+        """Stores a notification for each of its destinations and wakes the worker up.
+
+        @param payload: JSON body of the webhook message, e.g. {"username": ..., "embeds": [...]}
+        @param server: Name of the server the notification is about, for routing
+        @returns False if the outbox is full or the notification has no destination, and it was dropped
+        """
+        with self._lock:
+            routed = EVERY_DESTINATION if self.routes is None else self.routes.lookup(category, server)
+            if routed is EVERY_DESTINATION:
+                names = list(self.destinations)
+            else:
+                names = [name for name in routed if name in self.destinations]
+        if not names:
+            # Routed only to webhooks that are not configured
+            where = f" on {server}" if server else ""
+            print(f"[WEBHOOK] No configured webhook for {category} notifications{where}, dropping notification")
+            self._publish(DeliveryResult(None, category, False, "no configured destination", 0.0))
+            return False
+        if self.pending >= self.max_pending:
+            print(f"[WEBHOOK] Outbox full, dropping {category} notification")
+            self._publish(DeliveryResult(None, category, False, "outbox full", 0.0))
+            return False
+        self.outbox.add(category, payload, names)
+        self._wakeup.set()
+        return True
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wakeup.clear()
+            with self._lock:
+                destinations = {name: hook for name, hook in self.destinations.items() if name not in self._sending}
+            now = time.time()
+            due = []
+            next_wakeup = None
+            # Destinations with a message in flight are left out, the end of its send wakes the worker up
+            for name, hook in destinations.items():
+                pending = self.outbox.next_pending(name, MAX_EMBEDS)
+                if not pending:
+                    continue
+                # Deliveries waiting for a later retry than the oldest one are left for later
+                first = pending[0]
+                ready = max(now, first.next_attempt)
+                pending = list(takewhile(lambda d: d.next_attempt <= ready, pending))
+                if first.id in self._isolated:
+                    batch = pending[:1]
+                else:
+                    pending = list(takewhile(lambda d: d.id not in self._isolated, pending))
+                    batch = pack_deliveries(pending)
+                due_at = first.next_attempt
+                if first.attempts == 0 and len(batch) == len(pending) and len(pending) < MAX_EMBEDS:
+                    # Room left in the message: give other notifications a chance to join
+                    due_at = max(due_at, first.created + self.linger)
+                if due_at <= now:
+                    due.append((name, batch, hook))
+                elif next_wakeup is None or due_at < next_wakeup:
+                    next_wakeup = due_at
+            # A slow destination does not hold the others back: each is sent to as soon as it is done
+            with self._lock:
+                for name, batch, hook in due:
+                    self._sending[name] = self._pool.submit(self._send, name, batch, hook)
+            self._wakeup.wait(None if next_wakeup is None else next_wakeup - now)
+
+    def _retry_delay(self, delivery, error):
+        retry_after = error_retry_after(error)
+        if retry_after is not None:
+            return retry_after
+        delay = min(self.max_delay, self.base_delay * 2 ** delivery.attempts)
+        return delay * random.uniform(0.8, 1.2)
+
+    def _send(self, name, batch, hook):
+        try:
+            self._deliver(batch, hook)
+        finally:
+            with self._lock:
+                del self._sending[name]
+            self._wakeup.set()
+
+    def _deliver(self, batch, hook):
+        ids = [delivery.id for delivery in batch]
+        try:
+            hook.post(merge_payloads(batch))
+        except Exception as e:
+            error = str(e)
+            status = error_status(e)
+            if status in PERMANENT_STATUSES and len(batch) > 1:
+                # Any of them may be the one Discord refuses: send each alone to find out
+                retry_in = 0.0
+                self._isolated.update(ids)
+                self.outbox.mark_failed(ids, error, time.time())
+            elif status in PERMANENT_STATUSES:
+                retry_in = None
+                self._isolated.difference_update(ids)
+                self.outbox.mark_failed(ids, error)
+            else:
+                retry_in = self._retry_delay(batch[0], e)
+                self.outbox.mark_failed(ids, error, time.time() + retry_in)
+            ok = False
+        else:
+            self.outbox.mark_sent(ids)
+            self._isolated.difference_update(ids)
+            with self._lock:
+                self.delivered += len(batch)
+                self.requests += 1
+            ok, error, retry_in, status = True, None, None, None
+        end = time.time()
+        for delivery in batch:
+            self._publish(DeliveryResult(delivery.destination, delivery.category, ok, error, end - delivery.created,
+                                         retry_in, status))
+
+    def _publish(self, result):
+        for callback in list(self._subscribers):
+            try:
+                callback(result)
+            except Exception as e:
+                print(f"[WEBHOOK] Delivery subscriber failed: {e}")
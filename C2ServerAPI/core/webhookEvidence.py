@@ -0,0 +1,94 @@
+"""Evidence screenshots attached to Discord notifications.
+
+Frames from the evidence buffer are encoded to JPEG and saved in the evidence folder, where they stay as a local
+    record of the ban; the notification only carries their paths, which the webhook client uploads with it. The
+    whole message must stay under Discord's upload limit, so every frame gets an equal share of MAX_UPLOAD_BYTES
+    and is encoded at the best JPEG quality that fits in it, found by a binary search over the quality. A frame
+    that does not fit even at the lowest quality is downscaled and tried again.
+
+Encoding a frame takes tens of milliseconds, so it is done on a worker thread, never on the ban command path."""
+
+import io
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+EVIDENCE_DIR = "evidence"
+
+# Discord refuses uploads over 10 MiB for servers without boosts; leave room for the rest of the message
+MAX_UPLOAD_BYTES = 8 * 1024 * 1024
+
+MIN_QUALITY = 40
+MAX_QUALITY = 85
+MIN_WIDTH = 480
+
+def encode_jpeg(image, max_bytes, min_quality=MIN_QUALITY, max_quality=MAX_QUALITY, min_width=MIN_WIDTH):
+    """Encodes a PIL image to JPEG at the highest quality that fits in max_bytes, downscaling it if needed.
+
+    @returns (JPEG bytes, quality, (width, height)); the bytes may still exceed max_bytes when the image cannot
+        be made small enough
+    """
+    def encode(img, quality):
+        out = io.BytesIO()
+        img.save(out, format="JPEG", quality=quality, optimize=True)
+        return out.getvalue()
+
+    while True:
+        # Most frames fit at the best quality: no search needed
+        data = encode(image, max_quality)
+        if len(data) <= max_bytes:
+            return data, max_quality, image.size
+        best = None
+        low, high = min_quality, max_quality - 1
+        while low <= high:
+            quality = (low + high) // 2
+            data = encode(image, quality)
+            if len(data) <= max_bytes:
+                best = (data, quality)
+                low = quality + 1
+            else:
+                high = quality - 1
+        if best is not None:
+            return best[0], best[1], image.size
+        if image.width * 3 // 4 < min_width:
+            return encode(image, min_quality), min_quality, image.size
+        image = image.resize((image.width * 3 // 4, image.height * 3 // 4))
+
+def save_evidence(frames, name, max_bytes=MAX_UPLOAD_BYTES, directory=EVIDENCE_DIR):
+    """Encodes frames and saves them in directory.
+
+    @param frames: List of (timestamp, PIL image), oldest first
+    @param name: Start of the file names, e.g. "ban_<PlayFab ID>"
+    @returns The list of file paths, in the order of frames
+    """
+    os.makedirs(directory, exist_ok=True)
+    share = max_bytes // max(1, len(frames))
+    paths = []
+    for timestamp, image in frames:
+        data, quality, size = encode_jpeg(image, share)
+        stamp = time.strftime("%Y%m%d_%H%M%S", time.localtime(timestamp))
+        path = os.path.join(directory, f"{name}_{stamp}_{int(timestamp * 1000) % 1000:03d}.jpg")
+        with open(path, 'wb') as f:
+            f.write(data)
+        paths.append(path)
+    return paths
+
+class EvidenceEncoder:
+    """Encodes evidence and hands the saved files over, on a single worker thread."""
+    def __init__(self):
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="evidence")
+
+    def submit(self, frames, name, callback):
+        """Saves frames in the background, then calls callback with the list of paths, from the worker thread.
+            If saving fails, callback gets an empty list: the notification is still worth sending."""
+        def work():
+            try:
+                paths = save_evidence(frames, name)
+            except Exception as e:
+                print(f"[EVIDENCE] Could not save the evidence screenshots: {e}")
+                paths = []
+            try:
+                callback(paths)
+            except Exception as e:
+                print(f"[EVIDENCE] Could not send the evidence screenshots: {e}")
+        self._pool.submit(work)
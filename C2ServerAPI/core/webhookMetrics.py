@@ -0,0 +1,185 @@
+"""Health of the Discord notifications: what was sent, what failed, how long it took, what is still waiting.
+
+WebhookMetrics subscribes to the dispatcher and counts, per destination, the notifications sent, the failed
+    attempts, the ones Discord rate limited (HTTP 429) and the ones given up on, along with a histogram of the
+    latency from queueing to delivery. Counters cover the whole session; the latency of the last few
+    notifications is also kept, to tell a slow Discord right now from a slow evening. The queue depth and the age of the
+    oldest pending notification come from the outbox when a snapshot is taken, as they change without any
+    delivery happening.
+
+A snapshot is a plain dict, ready to be written as JSON."""
+
+import json
+import threading
+import time
+from collections import deque
+
+# Upper bounds, in seconds, of the latency histogram buckets; the last bucket has no upper bound
+LATENCY_BUCKETS = (0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+RATE_LIMITED = 429
+
+# Number of latest latencies the recent percentile is computed from
+RECENT_LATENCIES = 50
+
+# Thresholds above which a destination is reported as degraded
+DEGRADED_OLDEST_PENDING = 60.0
+DEGRADED_P95 = 10.0
+
+class LatencyHistogram:
+    """Counts of latencies per bucket, and their sum."""
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+        self.max = 0.0
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+    def add(self, seconds):
+        for i, bound in enumerate(self.bounds):
+            if seconds <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q):
+        """Returns the upper bound of the bucket holding the q quantile, the largest latency for the last
+            bucket, or None if empty."""
+        count = self.count
+        if not count:
+            return None
+        rank = q * count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return self.bounds[i] if i < len(self.bounds) else self.max
+        return self.max
+
+    def to_dict(self):
+        count = self.count
+        return {
+            "buckets": {**{f"le_{b:g}": n for b, n in zip(self.bounds, self.counts)}, "inf": self.counts[-1]},
+            "count": count,
+            "mean": self.total / count if count else None,
+            "max": self.max if count else None,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+        }
+
+class DestinationMetrics:
+    """Counters of one destination."""
+    def __init__(self):
+        self.sent = 0
+        self.failed = 0
+        self.rate_limited = 0
+        self.given_up = 0
+        self.latency = LatencyHistogram()
+        self.recent = deque(maxlen=RECENT_LATENCIES)
+        self.last_success = None
+        self.last_failure = None
+        self.last_error = None
+
+    def recent_p95(self):
+        if not self.recent:
+            return None
+        latencies = sorted(self.recent)
+        return latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+
+    def to_dict(self):
+        return {
+            "sent": self.sent,
+            "failed": self.failed,
+            "rate_limited": self.rate_limited,
+            "given_up": self.given_up,
+            "latency": self.latency.to_dict(),
+            "recent_p95": self.recent_p95(),
+            "last_success": self.last_success,
+            "last_failure": self.last_failure,
+            "last_error": self.last_error,
+        }
+
+class WebhookMetrics:
+    """Delivery metrics of every destination. Safe to use from several threads."""
+    def __init__(self, dispatcher=None):
+        """@param dispatcher: WebhookDispatcher to subscribe to and read the queue of"""
+        self.dispatcher = dispatcher
+        self.started = time.time()
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._destinations = {} # name -> DestinationMetrics
+        if dispatcher is not None:
+            dispatcher.subscribe(self.record)
+
+    def record(self, result):
+        """Dispatcher subscriber counting a DeliveryResult."""
+        now = time.time()
+        with self._lock:
+            if result.destination is None:
+                # Refused before reaching the outbox
+                self.dropped += 1
+                return
+            metrics = self._destinations.get(result.destination)
+            if metrics is None:
+                metrics = self._destinations[result.destination] = DestinationMetrics()
+            if result.ok:
+                metrics.sent += 1
+                metrics.latency.add(result.latency)
+                metrics.recent.append(result.latency)
+                metrics.last_success = now
+            else:
+                metrics.failed += 1
+                if result.status == RATE_LIMITED:
+                    metrics.rate_limited += 1
+                if result.retry_in is None:
+                    metrics.given_up += 1
+                metrics.last_failure = now
+                metrics.last_error = result.error
+
+    def snapshot(self):
+        """Returns the metrics of every destination, with their queue, as a JSON serializable dict."""
+        now = time.time()
+        queues = self.dispatcher.pending_stats() if self.dispatcher is not None else {}
+        with self._lock:
+            names = set(self._destinations) | set(queues)
+            if self.dispatcher is not None:
+                names |= set(self.dispatcher.destinations)
+            destinations = {}
+            for name in sorted(names):
+                metrics = self._destinations.get(name) or DestinationMetrics()
+                data = metrics.to_dict()
+                depth, oldest = queues.get(name, (0, None))
+                data["queue_depth"] = depth
+                data["oldest_pending_age"] = now - oldest if oldest is not None else None
+                data["degraded"] = is_degraded(data)
+                destinations[name] = data
+        snapshot = {
+            "time": now,
+            "uptime": now - self.started,
+            "dropped": self.dropped,
+            "destinations": destinations,
+        }
+        if self.dispatcher is not None:
+            snapshot["requests"] = self.dispatcher.requests
+            snapshot["requests_saved"] = self.dispatcher.requests_saved
+        return snapshot
+
+    def export(self, path):
+        """Writes a snapshot to a JSON file."""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, indent=2)
+
+def is_degraded(data):
+    """True if a destination snapshot shows sends failing, or notifications waiting or taking too long."""
+    if data["last_failure"] is not None and (data["last_success"] is None
+                                             or data["last_failure"] > data["last_success"]):
+        return True
+    if data["oldest_pending_age"] is not None and data["oldest_pending_age"] > DEGRADED_OLDEST_PENDING:
+        return True
+    return data["recent_p95"] is not None and data["recent_p95"] > DEGRADED_P95
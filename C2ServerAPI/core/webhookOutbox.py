@@ -0,0 +1,166 @@
+"""Persistent outbox of webhook notifications, stored in SQLite.
+
+Every notification is written here, once per destination, before anything is sent. A delivery is deleted once
+    the destination accepted it; a failed one stays, with the time of its next attempt, so nothing queued is lost
+    when Discord is down or the program is closed. Deliveries Discord will never accept (e.g. the webhook was
+    deleted), and those of destinations that are no longer configured, are kept as dead for the record instead
+    of being retried forever, until they are older than the retention period."""
+
+import json
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+OUTBOX_FILE = "webhookoutbox.db"
+
+PENDING = "pending"
+DEAD = "dead"
+
+# Seconds dead deliveries are kept
+DEAD_RETENTION = 30 * 24 * 3600
+
+Delivery = namedtuple("Delivery", ["id", "destination", "category", "payload", "created", "attempts", "next_attempt",
+                                   "last_error"])
+Delivery.__doc__ = """A notification waiting to be sent to one destination. payload is the decoded JSON body, created
+    the time it was queued. next_attempt is the time a dead delivery was given up."""
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    destination TEXT NOT NULL,
+    category TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    created REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL,
+    last_error TEXT,
+    state TEXT NOT NULL DEFAULT 'pending'
+);
+CREATE INDEX IF NOT EXISTS outbox_pending ON outbox (state, destination, id);
+"""
+
+_COLUMNS = "id, destination, category, payload, created, attempts, next_attempt, last_error"
+
+class WebhookOutbox:
+    """Deliveries waiting to be sent, persisted to a SQLite database. Safe to use from several threads."""
+    def __init__(self, path=OUTBOX_FILE, dead_retention=DEAD_RETENTION):
+        """@param path: Database file, or ":memory:" to keep the outbox in memory only
+        @param dead_retention: Seconds dead deliveries are kept, they are deleted when the outbox is opened
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.executescript(_SCHEMA)
+        expired = self.expire_dead(time.time() - dead_retention)
+        if expired:
+            print(f"[WEBHOOK] Deleted {expired} dead notifications older than {dead_retention / 86400:.0f} days")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def add(self, category, payload, destinations, timestamp=None):
+        """Stores a notification for every destination, in one transaction.
+
+        @param payload: JSON serializable body of the webhook message
+        @returns Number of deliveries stored
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        body = json.dumps(payload, separators=(",", ":"), ensure_ascii=False)
+        rows = [(destination, category, body, timestamp, timestamp) for destination in destinations]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO outbox (destination, category, payload, created, next_attempt) VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+        return len(rows)
+
+    def _delivery(self, row):
+        row = list(row)
+        row[3] = json.loads(row[3])
+        return Delivery(*row)
+
+    def next_pending(self, destination, limit=1):
+        """Returns the oldest pending Delivery objects of a destination, oldest first. Deliveries of a destination
+            are sent in order, so a newer one never overtakes one that is waiting for a retry."""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {_COLUMNS} FROM outbox WHERE state = ? AND destination = ? ORDER BY id LIMIT ?",
+                (PENDING, destination, limit)
+            ).fetchall()
+        return [self._delivery(row) for row in rows]
+
+    def mark_sent(self, delivery_ids):
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM outbox WHERE id = ?", [(i,) for i in delivery_ids])
+
+    def mark_failed(self, delivery_ids, error, next_attempt=None):
+        """Records a failed attempt.
+
+        @param next_attempt: Time of the next attempt, or None to give up on the deliveries
+        """
+        with self._lock, self._conn:
+            if next_attempt is None:
+                self._conn.executemany(
+                    "UPDATE outbox SET attempts = attempts + 1, last_error = ?, next_attempt = ?, state = ? "
+                    "WHERE id = ?",
+                    [(error, time.time(), DEAD, i) for i in delivery_ids]
+                )
+            else:
+                self._conn.executemany(
+                    "UPDATE outbox SET attempts = attempts + 1, last_error = ?, next_attempt = ? WHERE id = ?",
+                    [(error, next_attempt, i) for i in delivery_ids]
+                )
+
+    def abandon_other_destinations(self, destinations, error="destination no longer configured"):
+        """Gives up on the pending deliveries of every destination but the given ones.
+
+        @returns Number of deliveries given up
+        """
+        destinations = list(destinations)
+        placeholders = ", ".join("?" * len(destinations))
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "UPDATE outbox SET last_error = ?, next_attempt = ?, state = ? "
+                f"WHERE state = ? AND destination NOT IN ({placeholders})",
+                (error, time.time(), DEAD, PENDING, *destinations)
+            )
+        return cursor.rowcount
+
+    def expire_dead(self, before):
+        """Deletes the dead deliveries given up before a time.
+
+        @returns Number of deliveries deleted
+        """
+        with self._lock, self._conn:
+            cursor = self._conn.execute("DELETE FROM outbox WHERE state = ? AND next_attempt < ?", (DEAD, before))
+        return cursor.rowcount
+
+    def _pending_filter(self, destinations):
+        if destinations is None:
+            return "state = ?", (PENDING,)
+        destinations = list(destinations)
+        return f"state = ? AND destination IN ({', '.join('?' * len(destinations))})", (PENDING, *destinations)
+
+    def pending_stats(self, destinations=None):
+        """Returns a dict of destination to (number of pending deliveries, creation time of the oldest).
+
+        @param destinations: Destinations to count, all of them by default
+        """
+        where, params = self._pending_filter(destinations)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT destination, COUNT(*), MIN(created) FROM outbox WHERE {where} GROUP BY destination", params
+            ).fetchall()
+        return {destination: (count, oldest) for destination, count, oldest in rows}
+
+    def pending_count(self, destinations=None):
+        """Returns the number of pending deliveries of some destinations, all of them by default."""
+        where, params = self._pending_filter(destinations)
+        with self._lock:
+            row = self._conn.execute(f"SELECT COUNT(*) FROM outbox WHERE {where}", params).fetchone()
+        return row[0]
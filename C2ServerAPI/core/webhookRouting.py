@@ -0,0 +1,115 @@
+"""Routing of Discord notifications to webhooks, by category and by server.
+
+Routes are read from a JSON file, along with the webhooks they may send to besides the primary and secondary
+    ones of localconfig:
+    {"destinations": {"Cross-clan bans": "https://discord.com/api/webhooks/...",
+                      "Tournament": "https://discord.com/api/webhooks/..."},
+     "routes": [
+        {"categories": ["ban"], "destinations": ["Cross-clan bans", "Primary"]},
+        {"categories": ["kick"], "servers": ["My Server EU"], "destinations": ["Primary"]},
+        {"categories": ["ft"], "destinations": ["Tournament"]}
+     ],
+     "default": ["Primary"],
+     "digest": {"categories": ["kick"], "minutes": 10}}
+
+A notification goes to the destinations of every route it matches. A route without "categories" matches every
+    category, one without "servers" every server; server names ignore case. Notifications matching no route go
+    to the "default" destinations, or to every destination if there is no "default". Without a routes file,
+    every notification goes to every destination.
+
+The optional "digest" sends the notifications of its categories as one summary per category and server every
+    few minutes, instead of one message each (see webhookDigest).
+
+The routes are compiled into a table of every category and server they name, plus "any other" for both, so
+    routing a notification is a single dictionary lookup however many routes there are."""
+
+import json
+import os
+
+ROUTES_FILE = "webhookroutes.json"
+
+# Returned by lookup() for notifications going to every destination
+EVERY_DESTINATION = None
+
+class RoutingTable:
+    """Compiled routes, mapping (category, server) to destination names."""
+    def __init__(self, routes=(), default=EVERY_DESTINATION, destinations=None, digest=None):
+        """@param routes: Iterable of route dicts, in the format of the routes file
+        @param default: Destination names of notifications no route matches, EVERY_DESTINATION for all of them
+        @param destinations: dict of destination name to webhook URL, from the routes file
+        @param digest: Digest settings dict, in the format of the routes file
+        """
+        self.destinations = dict(destinations or {})
+        digest = digest or {}
+        self.digest_categories = frozenset(digest.get("categories", ()))
+        self.digest_window = float(digest.get("minutes", 10)) * 60
+        self.default = tuple(default) if default is not EVERY_DESTINATION else EVERY_DESTINATION
+        self.routes = []
+        for route in routes:
+            categories = route.get("categories")
+            servers = route.get("servers")
+            self.routes.append((
+                frozenset(categories) if categories else None,
+                frozenset(s.lower() for s in servers) if servers else None,
+                tuple(route.get("destinations", ())),
+            ))
+        self._categories = {c for categories, _, _ in self.routes if categories for c in categories}
+        self._servers = {s for _, servers, _ in self.routes if servers for s in servers}
+
+        # Indexes of the routes matching a category whatever the server, a server whatever the category, and
+        # a category on a server. None stands for any category or server no route names
+        by_category = {c: [] for c in self._categories | {None}}
+        by_server = {s: [] for s in self._servers | {None}}
+        by_both = {}
+        for i, (categories, servers, _) in enumerate(self.routes):
+            if servers is None:
+                for category in (by_category if categories is None else categories):
+                    by_category[category].append(i)
+            elif categories is None:
+                for server in servers:
+                    by_server[server].append(i)
+            else:
+                for category in categories:
+                    for server in servers:
+                        by_both.setdefault((category, server), []).append(i)
+
+        self._table = {}
+        for category, category_routes in by_category.items():
+            for server, server_routes in by_server.items():
+                names = []
+                for i in sorted(category_routes + server_routes + by_both.get((category, server), [])):
+                    names.extend(n for n in self.routes[i][2] if n not in names)
+                self._table[category, server] = tuple(names) if names else self.default
+
+    @classmethod
+    def from_file(cls, path=ROUTES_FILE):
+        """Loads the routes file. A missing file means every notification goes to every destination."""
+        if not os.path.exists(path):
+            return cls()
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(data.get("routes", ()), data.get("default", EVERY_DESTINATION), data.get("destinations"),
+                   data.get("digest"))
+
+    def __len__(self):
+        return len(self.routes)
+
+    def destination_names(self):
+        """Returns every destination name the routes send to."""
+        names = set(self.default or ())
+        for _, _, route_destinations in self.routes:
+            names.update(route_destinations)
+        return names
+
+    def lookup(self, category, server=None):
+        """Returns the names of the destinations of a notification, or EVERY_DESTINATION.
+
+        @param server: Name of the server the notification is about, None if it is about none in particular
+        """
+        if category not in self._categories:
+            category = None
+        if server is not None:
+            server = server.lower()
+            if server not in self._servers:
+                server = None
+        return self._table[category, server]
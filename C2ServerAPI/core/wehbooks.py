@@ -1,12 +1,138 @@
-import discord
-from discord import SyncWebhook, Embed
 import datetime
 import os
+import sqlite3
+import time
 from PyQt5.QtWidgets import QInputDialog, QMessageBox, QApplication
 
+from .webhookClient import WebhookClient
+from .webhookDigest import WebhookDigest, DIGEST_FILE
+from .webhookDispatcher import WebhookDispatcher
+from .webhookEvidence import EvidenceEncoder
+from .webhookMetrics import WebhookMetrics
+from .webhookOutbox import WebhookOutbox, OUTBOX_FILE
+from .webhookRouting import RoutingTable, ROUTES_FILE
+
 # Global webhook variables
 webhook_primary = None
 webhook_secondary = None
+# Webhooks of the routes file, by name
+webhook_extra = {}
+webhook_routes = RoutingTable()
+
+# "http" sends with the built-in client, "discord" with discord.py, which must then be installed
+WEBHOOK_BACKEND = os.environ.get("C2_WEBHOOK_BACKEND", "http").lower()
+
+class DiscordPyDestination:
+    """Dispatcher destination sending through a discord.py SyncWebhook"""
+    def __init__(self, webhook):
+        self.webhook = webhook
+
+    def post(self, payload):
+        from discord import Embed, File
+        self.webhook.send(
+            username=payload.get("username"),
+            embeds=[Embed.from_dict(e) for e in payload.get("embeds", [])],
+            files=[File(path) for path in payload.get("files", []) if os.path.exists(path)]
+        )
+
+def create_destination(url):
+    """Returns a dispatcher destination sending to a webhook URL, with the configured backend"""
+    if WEBHOOK_BACKEND == "discord":
+        # Only imported when asked for: discord.py is optional and slow to import
+        from discord import SyncWebhook
+        return DiscordPyDestination(SyncWebhook.from_url(url))
+    return WebhookClient.from_url(url)
+
+def open_outbox():
+    try:
+        return WebhookOutbox()
+    except sqlite3.Error as e:
+        print(f"[WEBHOOK] Could not open {OUTBOX_FILE}, undelivered notifications will be lost on exit: {e}")
+        return WebhookOutbox(":memory:")
+
+# Sends notifications in the background, so a slow Discord never blocks the interface. Notifications are stored
+# in the outbox first, and retried until Discord accepts them, across restarts
+dispatcher = WebhookDispatcher(open_outbox())
+
+def log_delivery(result):
+    """Dispatcher subscriber printing the outcome of every send"""
+    if result.ok:
+        print(f"[WEBHOOK] {result.destination} Discord notification sent for {result.category} ({result.latency:.2f}s)")
+    elif result.destination is None:
+        print(f"[WEBHOOK] Failed to queue Discord notification for {result.category}: {result.error}")
+    elif result.retry_in is None:
+        print(f"[WEBHOOK] Giving up on {result.destination.lower()} Discord notification: {result.error}")
+    else:
+        print(f"[WEBHOOK] Failed to send {result.destination.lower()} Discord notification, retrying in {result.retry_in:.0f}s: {result.error}")
+
+dispatcher.subscribe(log_delivery)
+
+# Delivery counters, latencies and queue of every webhook, for the dashboard and metrics exports
+metrics = WebhookMetrics(dispatcher)
+
+# Encodes evidence screenshots off the calling thread
+evidence_encoder = EvidenceEncoder()
+
+DIGEST_NOUNS = {"kick": "kick", "unban": "unban", "automod": "auto-moderation alert", "ft": "match result"}
+
+def send_digest(category, server, entries, start, end):
+    """Digest flush callback: sends the summary of the notifications of a category on a server. Returns False if
+    the dispatcher refused it, to keep it in the digest"""
+    noun = DIGEST_NOUNS.get(category, category)
+    config = get_config()
+    moderator_id = config['discord_user_id'] if config['discord_user_id'] else "Unknown"
+    embed = {
+        "type": "rich",
+        "title": "Admin Log Digest",
+        "color": 0xF5A505,
+        "timestamp": datetime.datetime.fromtimestamp(end, datetime.timezone.utc).isoformat(),
+        # Discord shows these timestamps in the reader's own time zone
+        "description": f"**{len(entries)} {noun}{'s' if len(entries) > 1 else ''}** between <t:{int(start)}:t> and <t:{int(end)}:t>",
+        "fields": []
+    }
+
+    reasons = {}
+    for entry in entries:
+        reasons[entry.get("reason")] = reasons.get(entry.get("reason"), 0) + 1
+    if category != "ft":
+        tally = [f"{count}x {reason}" for reason, count in sorted(reasons.items(), key=lambda r: -r[1])]
+        embed["fields"].append({"name": "Reasons", "value": digest_lines(tally), "inline": False})
+
+    lines = []
+    for entry in entries:
+        if entry.get("user_id", "N/A") == "N/A":
+            lines.append(f"{entry.get('reason')}")
+        else:
+            lines.append(f"{entry.get('username')} ({entry.get('user_id')}): {entry.get('reason')}")
+    embed["fields"].append({"name": "Players" if category != "ft" else "Results", "value": digest_lines(lines),
+                            "inline": False})
+    embed["fields"].append({"name": "Moderator" if category != "ft" else "Referee", "value": f"<@{moderator_id}>",
+                            "inline": False})
+    if server:
+        embed["fields"].append({"name": "Server", "value": server, "inline": False})
+    embed["footer"] = {"text": "Admin Interface"}
+    return dispatcher.submit(category, {"username": "Admin Bot", "embeds": [embed]}, server)
+
+def digest_lines(lines, limit=1024):
+    """Joins lines into an embed field value, within Discord's length limit"""
+    value = ""
+    for i, line in enumerate(lines):
+        more = f"\n... and {len(lines) - i} more"
+        if len(value) + len(line) + 1 + len(more) > limit:
+            return value + more
+        value += ("\n" if value else "") + line
+    return value or "-"
+
+def open_digest():
+    try:
+        return WebhookDigest(on_flush=send_digest, paused=True)
+    except (OSError, ValueError) as e:
+        print(f"[WEBHOOK] Could not open {DIGEST_FILE}, digests will be lost on exit: {e}")
+        return WebhookDigest(None, on_flush=send_digest, paused=True)
+
+# Low-severity notifications gathered into periodic summaries, when enabled in the routes file. A digest resumed
+# from the journal is only sent once initialize_webhook() has set the webhooks up
+digest = open_digest()
 
 def load_config_from_file():
     """Load configuration from localconfig file"""
@@ -37,9 +163,34 @@ def load_config_from_file():
 
     return config
 
+# Snapshot of the Discord settings of localconfig, so sending a notification never reads the file. Whatever
+# changes these settings must call invalidate_config()
+_config = None
+
+def get_config():
+    """Returns the Discord settings, as load_config_from_file() does, reading localconfig only the first time
+    after an invalidation. The returned dict is shared and must not be modified"""
+    global _config
+    if _config is None:
+        _config = load_config_from_file()
+    return _config
+
+def invalidate_config():
+    """Makes the next get_config() read localconfig again"""
+    global _config
+    _config = None
+
+def load_routes():
+    """Load the routes file, see webhookRouting"""
+    try:
+        return RoutingTable.from_file()
+    except (OSError, ValueError, TypeError, AttributeError) as e:
+        print(f"[WEBHOOK] Could not load {ROUTES_FILE}, sending every notification to every webhook: {e}")
+        return RoutingTable()
+
 def get_webhook_urls():
     """Get Discord webhook URLs using the correct startup flow"""
-    config = load_config_from_file()
+    config = get_config()
 
     # If file exists, use what's in it (even if empty/invalid)
     if config['file_exists']:
@@ -142,6 +293,7 @@ def prompt_for_initial_setup():
 def save_initial_config(primary_url, secondary_url, discord_user_id):
     """Save initial configuration to localconfig file"""
     localconfig = "localconfig"
+    invalidate_config()
     try:
         with open(localconfig, 'w', encoding='utf-8') as f:
             f.write(f"{primary_url if primary_url else 'None'}\n")
@@ -164,6 +316,8 @@ def save_initial_config(primary_url, secondary_url, discord_user_id):
 def initialize_webhook():
     """Initialize the Discord webhooks"""
     global webhook_primary, webhook_secondary
+    # The webhooks may have been reconfigured
+    invalidate_config()
     primary_url, secondary_url = get_webhook_urls()
 
     primary_success = False
@@ -172,7 +326,7 @@ def initialize_webhook():
     # Initialize primary webhook
     if primary_url:
         try:
-            webhook_primary = SyncWebhook.from_url(primary_url)
+            webhook_primary = create_destination(primary_url)
             primary_success = True
         except Exception as e:
             app = QApplication.instance()
@@ -189,7 +343,7 @@ def initialize_webhook():
     # Initialize secondary webhook
     if secondary_url:
         try:
-            webhook_secondary = SyncWebhook.from_url(secondary_url)
+            webhook_secondary = create_destination(secondary_url)
             secondary_success = True
         except Exception as e:
             app = QApplication.instance()
@@ -203,88 +357,144 @@ def initialize_webhook():
     else:
         webhook_secondary = None
 
+    # Other webhooks and the routes between them. Webhooks of the same host share connections
+    global webhook_extra, webhook_routes
+    webhook_routes = load_routes()
+    webhook_extra = {}
+    for name, url in webhook_routes.destinations.items():
+        if name in ("Primary", "Secondary"):
+            print(f"[WEBHOOK] {name} is the name of a localconfig webhook, ignoring it in {ROUTES_FILE}")
+            continue
+        try:
+            webhook_extra[name] = create_destination(url)
+        except Exception as e:
+            print(f"[WEBHOOK] Unable to initialize the {name} Discord webhook: {e}")
+    destinations = {"Primary": webhook_primary, "Secondary": webhook_secondary, **webhook_extra}
+    for name in sorted(webhook_routes.destination_names() - {n for n, hook in destinations.items() if hook}):
+        print(f"[WEBHOOK] Routes of {ROUTES_FILE} send to {name}, which is not configured")
+
+    dispatcher.set_routes(webhook_routes)
+    dispatcher.set_destinations(destinations)
+    digest.configure(webhook_routes.digest_categories, webhook_routes.digest_window)
+    digest.resume()
+
     return primary_success or secondary_success
 
 def get_webhook_status():
-    """Get the current status of both webhooks"""
+    """Get the current status of the webhooks"""
     return {
         'primary_active': webhook_primary is not None,
         'secondary_active': webhook_secondary is not None,
-        'any_active': webhook_primary is not None or webhook_secondary is not None
+        'extra_active': len(webhook_extra),
+        'any_active': webhook_primary is not None or webhook_secondary is not None or bool(webhook_extra)
     }
 
-def MessageForAdmin(user_id, username, reason, duration_or_msg, category):
+def MessageForAdmin(user_id, username, reason, duration_or_msg, category, server=None, evidence=None):
+    """Sends a notification of a moderation action to the webhooks its category and server are routed to
+
+    @param server: Name of the server the action was taken on, if known
+    @param evidence: List of (timestamp, PIL image) frames of the game to attach, see evidenceCapture
+    """
     # Check if any webhook is initialized
-    if webhook_primary is None and webhook_secondary is None:
+    if not get_webhook_status()['any_active']:
         print(f"[WEBHOOK] Discord webhooks not configured, skipping notification for {category}")
         return
 
-    # Get Discord user ID from config
-    config = load_config_from_file()
+    if digest.accepts(category):
+        # Sent later, in a summary
+        digest.add(category, server, {"user_id": user_id, "username": username, "reason": reason})
+        return
+
+    # Get Discord user ID from the config snapshot
+    config = get_config()
     moderator_id = config['discord_user_id'] if config['discord_user_id'] else "Unknown"
 
-    embed = Embed(
-        title="Admin Log Notification",
-        color=0xF52D05,
-        timestamp=datetime.datetime.now(datetime.timezone.utc)
-    )
+    # Embed in the JSON format of the Discord API
+    embed = {
+        "type": "rich",
+        "title": "Admin Log Notification",
+        "color": 0xF52D05,
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "fields": []
+    }
 
     if category == "ban":
-        embed.description = "A **ban** has been executed"
-        embed.add_field(
-            name="Information",
-            value=f"\nPlayFabID: {user_id}\nUsername: {username}\nReason: {reason}\nDuration: {duration_or_msg}h",
-            inline=False
-        )
+        embed["description"] = "A **ban** has been executed"
+        embed["fields"].append({
+            "name": "Information",
+            "value": f"\nPlayFabID: {user_id}\nUsername: {username}\nReason: {reason}\nDuration: {duration_or_msg}h",
+            "inline": False
+        })
 
     elif category == "unban":
-        embed.description = "An **unban** has been executed"
-        embed.add_field(
-            name="Information",
-            value=f"\nPlayFabID: {user_id}",
-            inline=False
-        )
+        embed["description"] = "An **unban** has been executed"
+        embed["fields"].append({
+            "name": "Information",
+            "value": f"\nPlayFabID: {user_id}",
+            "inline": False
+        })
 
     elif category == "kick":
-        embed.description = "A **kick** has been executed"
-        embed.add_field(
-            name="Information",
-            value=f"\nPlayFabID: {user_id}\nUsername: {username}\nReason: {reason}",
-            inline=False
-        )
+        embed["description"] = "A **kick** has been executed"
+        embed["fields"].append({
+            "name": "Information",
+            "value": f"\nPlayFabID: {user_id}\nUsername: {username}\nReason: {reason}",
+            "inline": False
+        })
+
+    elif category == "automod":
+        embed["description"] = "**Auto-moderation** flagged a player"
+        embed["fields"].append({
+            "name": "Information",
+            "value": f"\nPlayFabID: {user_id}\nUsername: {username}\nReason: {reason}\nRule: {duration_or_msg}",
+            "inline": False
+        })
 
     elif category == "ft":
-        embed.description = "A **First To match** has been completed"
-        embed.add_field(
-            name="Results",
-            value=f"\n{reason}",
-            inline=False
-        )
+        embed["description"] = "A **First To match** has been completed"
+        embed["fields"].append({
+            "name": "Results",
+            "value": f"\n{reason}",
+            "inline": False
+        })
 
     if category != "ft":
-        embed.add_field(name="Moderator",
-                        value=f"<@{moderator_id}>",
-                        inline=False)
+        embed["fields"].append({"name": "Moderator",
+                                "value": f"<@{moderator_id}>",
+                                "inline": False})
     else:
-        embed.add_field(name="Referee",
-                        value=f"<@{moderator_id}>",
-                        inline=False)
-
-    embed.set_footer(text="Admin Interface")
-
-    # Send to primary webhook
-    if webhook_primary:
-        try:
-            webhook_primary.send(username="Admin Bot", embed=embed)
-            print(f"[WEBHOOK] Primary Discord notification sent for {category}")
-        except Exception as e:
-            print(f"[WEBHOOK] Failed to send primary Discord notification: {str(e)}")
+        embed["fields"].append({"name": "Referee",
+                                "value": f"<@{moderator_id}>",
+                                "inline": False})
+
+    if server:
+        embed["fields"].append({"name": "Server", "value": server, "inline": False})
+
+    embed["footer"] = {"text": "Admin Interface"}
+    payload = {"username": "Admin Bot", "embeds": [embed]}
+
+    if evidence:
+        count = len(evidence)
+        embed["fields"].append({
+            "name": "Evidence",
+            "value": f"{count} screenshot{'s' if count > 1 else ''} of the game, taken up to {int(time.time() - evidence[0][0])}s before the {category}",
+            "inline": False
+        })
+
+        def send_with_evidence(paths):
+            if paths:
+                # The latest frame is shown in the embed, the others are attached below it
+                embed["image"] = {"url": f"attachment://{os.path.basename(paths[-1])}"}
+                payload["files"] = paths
+            else:
+                embed["fields"].pop()
+            dispatcher.submit(category, payload, server)
+
+        # Encoded on the evidence thread, then stored in the outbox with the paths of the files
+        name = "".join(c for c in f"{category}_{user_id}" if c.isalnum() or c == "_")
+        evidence_encoder.submit(evidence, name, send_with_evidence)
+        return
 
-    # Send to secondary webhook
-    if webhook_secondary:
-        try:
-            webhook_secondary.send(username="Admin Bot", embed=embed)
-            print(f"[WEBHOOK] Secondary Discord notification sent for {category}")
-        except Exception as e:
-            print(f"[WEBHOOK] Failed to send secondary Discord notification: {str(e)}")
+    # Stored in the outbox, then sent to the routed webhooks by the dispatcher thread
+    dispatcher.submit(category, payload, server)
 
@@ -1,65 +1,50 @@
 import sys
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QLabel, QPushButton, QDialog,
-    QFormLayout, QLineEdit, QDialogButtonBox, QMessageBox, QListWidget, QHBoxLayout, QGroupBox, QSpacerItem, QSizePolicy, QInputDialog, QProgressBar, QCheckBox
+    QFormLayout, QLineEdit, QDialogButtonBox, QMessageBox, QListWidget, QHBoxLayout, QGroupBox, QSpacerItem, QSizePolicy, QInputDialog, QProgressBar, QCheckBox,
+    QFileDialog, QListWidgetItem
 )
 from PyQt5.QtGui import QFont, QIntValidator
-from PyQt5.QtCore import Qt, QTimer, QAbstractNativeEventFilter, QAbstractEventDispatcher
-from PyQt5.QtCore import QObject, QEvent
+from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtCore import QObject, QEvent, pyqtSignal
 from PyQt5.QtGui import QCursor
 from PyQt5.QtWidgets import QToolTip
-from PyQt5.QtWidgets import QGridLayout
+from PyQt5.QtWidgets import QGridLayout, QComboBox
+from PyQt5.QtGui import QImage, QPixmap, QPainter, QPen, QColor
+from PyQt5.QtCore import QRect, QPoint
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, QSortFilterProxyModel
+from PyQt5.QtWidgets import QTableView, QHeaderView, QAbstractItemView, QDateTimeEdit, QPlainTextEdit
+from PyQt5.QtCore import QDateTime
 
 import pyperclip
 import time
 import os
+import threading
 import sys
 import win32gui
 import json
+from collections import deque
+import html
+import sqlite3
 
 import re
 
 
 from core.C2ServerAPIExample import GameChivalry
-from core.guiServer import Chivalry
+from core.guiServer import Chivalry, enableDpiAwareness
+from core.matchTimer import MatchTimerSampler
+from core.calibration import REGIONS
+from core.clipboardIngest import PlayerListIngestor
+from core.listplayers import parse_listplayers
+from core.roster import ServerRosters, JOIN, LEAVE, RENAME
+from core.autoRefresh import AdaptiveRefreshPolicy, TypingMonitor
+from core.playerHistory import PlayerHistory, HISTORY_FILE
+from core.playerSearch import TrigramIndex
+from core.rosterArchive import RosterArchive, ARCHIVE_FILE
+from core.autoModeration import AutoModerator, RULES_FILE, ALERT, BAN
+from core.evidenceCapture import EvidenceBuffer, EvidenceRecorder
+from core.commandApi import CommandApiServer, load_api_config, API_CONFIG_FILE
 import core.wehbooks as wehbooks
-import ctypes
-import ctypes.wintypes as wintypes
-
-# Windows clipboard update message
-WM_CLIPBOARDUPDATE = 0x031D
-
-class MSG(ctypes.Structure):
-    _fields_ = [
-        ("hwnd", wintypes.HWND),
-        ("message", wintypes.UINT),
-        ("wParam", wintypes.WPARAM),
-        ("lParam", wintypes.LPARAM),
-        ("time", wintypes.DWORD),
-        ("pt_x", wintypes.LONG),
-        ("pt_y", wintypes.LONG),
-    ]
-
-class WinClipboardEventFilter(QAbstractNativeEventFilter):
-    def __init__(self, callback):
-        super().__init__()
-        self._callback = callback
-
-    def nativeEventFilter(self, eventType, message):
-        try:
-            if eventType != 'windows_generic_MSG':
-                return False, 0
-            msg = MSG.from_address(int(message))
-            if msg.message == WM_CLIPBOARDUPDATE:
-                # Fire callback on clipboard update
-                self._callback()
-        except Exception:
-            pass
-        return False, 0
-
-user32 = ctypes.windll.user32
-user32.AddClipboardFormatListener.argtypes = [wintypes.HWND]
-user32.AddClipboardFormatListener.restype = wintypes.BOOL
 
 class InstantToolTipFilter(QObject):
     """Global event filter that shows tooltips after a small delay.
@@ -118,8 +103,38 @@ class InstantToolTipFilter(QObject):
             # Be robust: never break the app from tooltip logic
             pass
 
-user32.RemoveClipboardFormatListener.argtypes = [wintypes.HWND]
-user32.RemoveClipboardFormatListener.restype = wintypes.BOOL
+class MatchTimerBridge(QObject):
+    """Carries match timer samples from the sampler thread to the UI thread."""
+    updated = pyqtSignal(object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.seconds = None
+        self.updated.connect(self._store)
+
+    def _store(self, seconds):
+        self.seconds = seconds
+
+
+class WebhookBridge(QObject):
+    """Carries webhook delivery results from the dispatcher threads to the UI thread."""
+    delivered = pyqtSignal(object)
+
+
+class CommandApiBridge(QObject):
+    """Carries commands from the local command API thread to the UI thread."""
+    received = pyqtSignal(object)
+
+
+def format_time_remaining(seconds):
+    """Format a number of seconds like the in-game timer, or '--:--' when unknown."""
+    if seconds is None:
+        return "--:--"
+    minutes, secs = divmod(int(seconds), 60)
+    if minutes >= 60:
+        hours, minutes = divmod(minutes, 60)
+        return f"{hours}:{minutes:02d}:{secs:02d}"
+    return f"{minutes:02d}:{secs:02d}"
 
 
 def check_chivalry_window():
@@ -264,46 +279,114 @@ class ChivalryWaitingDialog(QDialog):
 
 def parse_player_list_from_clipboard(text: str = None):
     """Parse players from provided clipboard text or current clipboard.
-    Strategy:
-      - Find the last occurrence of the header row (with Name/PlayFabPlayerId/EOSPlayerId...),
-        and parse only the rows that follow it. This avoids mixing old and new snapshots
-        if the clipboard happens to contain multiple blocks.
-      - Return a list of (name, playfab_id) with simple de-duplication by PlayFab ID.
+    Only the most recent listplayers block is used if the clipboard holds several.
+    Returns a list of (name, playfab_id), de-duplicated by PlayFab ID.
     """
     if text is None:
         try:
             text = pyperclip.paste()
         except Exception:
             text = ""
-    lines = (text or "").strip().splitlines()
-
-    # Find the last header line index
-    header_indices = [i for i, l in enumerate(lines)
-                      if ('Name' in l and 'PlayFabPlayerId' in l and 'EOSPlayerId' in l)]
-    start_idx = header_indices[-1] + 1 if header_indices else (2 if len(lines) >= 3 else 0)
-
-    players = []
-    seen_ids = set()
-    for line in lines[start_idx:]:
-        if ' - ' not in line:
-            continue
-        parts = [p.strip() for p in line.split(' - ')]
-        if len(parts) < 2:
-            continue
-        name = parts[0]
-        playfab_id = parts[1]
-        # Skip if looks like header row
-        if name.lower() == 'name' or playfab_id.lower().startswith('playfab'):
-            continue
-        # Basic sanity for PlayFab ID (hex-like and length >= 12)
-        if len(playfab_id) < 12:
-            continue
-        if playfab_id in seen_ids:
-            continue
-        seen_ids.add(playfab_id)
-        players.append((name, playfab_id))
-
-    return players
+    return [(p.name, p.playfab_id) for p in parse_listplayers(text).players]
+
+# Shared reader of listplayers output: the clipboard is read and parsed once per refresh,
+# and every subscriber receives the same snapshot
+player_list_ingestor = PlayerListIngestor(parse_listplayers)
+
+# Players seen across refreshes, per server; features interested in joins, leaves and renames subscribe to it
+server_rosters = ServerRosters()
+player_list_ingestor.subscribe(lambda snapshot: server_rosters.apply(snapshot.roster, snapshot.timestamp))
+
+
+def current_server_name(key=None):
+    """Name of a server for Discord notifications, by default the one of the latest player list, or None.
+        This is its key in the rosters (see roster.server_key), so routes and rosters agree on servers."""
+    store = server_rosters.store(key)
+    if store is None:
+        return None
+    return store.server or None
+
+
+def log_roster_events(events):
+    for ev in events:
+        if ev.kind == RENAME:
+            print(f"[ROSTER] {ev.old_name} renamed to {ev.name} ({ev.playfab_id})")
+        else:
+            print(f"[ROSTER] {ev.kind}: {ev.name} ({ev.playfab_id})")
+
+
+server_rosters.subscribe(log_roster_events)
+
+# Names (current and previous) and PlayFab IDs of the players of every server, for the players window search
+player_search_index = TrigramIndex()
+server_rosters.subscribe(player_search_index.apply_roster_events)
+
+
+def open_player_history():
+    try:
+        return PlayerHistory()
+    except sqlite3.Error as e:
+        print(f"[HISTORY] Could not open {HISTORY_FILE}, player history will not be saved: {e}")
+        return PlayerHistory(":memory:")
+
+
+# Every name and server each PlayFab ID was seen with, kept between sessions
+player_history = open_player_history()
+player_list_ingestor.subscribe(lambda snapshot: player_history.record(snapshot.roster, snapshot.timestamp))
+
+
+def seed_player_search_index():
+    """Indexes every player of the history, so that searches also find players who are not online."""
+    start = time.time()
+    count = player_search_index.add_many((pid, pid, name) for pid, name in player_history.names())
+    print(f"[SEARCH] Indexed {count} known names in {time.time() - start:.1f}s")
+
+
+# Tens of thousands of names take seconds to index, searches meanwhile see the ones indexed so far
+threading.Thread(target=seed_player_search_index, name="SearchIndexSeed", daemon=True).start()
+
+
+def open_roster_archive():
+    try:
+        return RosterArchive()
+    except OSError as e:
+        print(f"[ARCHIVE] Could not open {ARCHIVE_FILE}, rosters will not be archived: {e}")
+        return None
+
+
+def load_auto_moderator():
+    try:
+        moderator = AutoModerator.from_file()
+    except (OSError, ValueError) as e:
+        print(f"[AUTOMOD] Could not load {RULES_FILE}, auto-moderation has no rules: {e}")
+        return AutoModerator()
+    if moderator:
+        print(f"[AUTOMOD] Loaded {len(moderator.rules)} rules ({moderator.word_count} words, {moderator.pattern_count} patterns)")
+    return moderator
+
+
+# Name rules checked against every player who joins or is renamed
+auto_moderator = load_auto_moderator()
+
+# Every roster change, to look up who was on the server at a given time
+roster_archive = open_roster_archive()
+if roster_archive is not None:
+    player_list_ingestor.subscribe(lambda snapshot: roster_archive.record(snapshot.roster, snapshot.timestamp))
+
+# Latest frames of the game, recorded by the dashboard while ban evidence is enabled
+evidence_buffer = EvidenceBuffer()
+
+# Ban evidence settings: persisted value -> (label, seconds of game attached, seconds between two captures)
+BAN_EVIDENCE_MODES = {
+    "": ("No screenshot", None, None),
+    "screenshot": ("Screenshot at ban time", 0, 1.0),
+    "recent": ("Last 10 seconds", 10, 2.0),
+}
+
+
+def ban_evidence():
+    """Frames to attach to a ban notification: whatever the evidence recorder kept, if it is running."""
+    return evidence_buffer.frames(maxStaleness=5)
 
 class ActionForm(QDialog):
     def __init__(self, action_name, player_id, player_name, parent=None):
@@ -530,6 +613,7 @@ class ActionForm(QDialog):
             action_executed = False
             if hasattr(self.game, 'banbyid'):
                 try:
+                    evidence = ban_evidence()
                     self.game.banbyid(player_id, time_hour, reason)
                     action_executed = True
                 except Exception as e:
@@ -540,7 +624,8 @@ class ActionForm(QDialog):
                 # Persist last-used values for bans
                 set_persisted_value('last_ban_reason', reason)
                 set_persisted_value('last_ban_duration', str(time_hour))
-                wehbooks.MessageForAdmin(player_id, player_name, reason, time_hour, "ban")
+                wehbooks.MessageForAdmin(player_id, player_name, reason, time_hour, "ban", current_server_name(),
+                                         evidence)
         else:
             print(f"[{self.action_name.upper()}] Player ID={player_id}, Reason={reason}")
 
@@ -555,7 +640,7 @@ class ActionForm(QDialog):
 
             # Only send Discord notification if the action was actually executed
             if action_executed:
-                wehbooks.MessageForAdmin(player_id, player_name, reason, None, "kick")
+                wehbooks.MessageForAdmin(player_id, player_name, reason, None, "kick", current_server_name())
         self.accept()
 
     def toggle_theme(self):
@@ -596,6 +681,18 @@ class PlayerActionDialog(QDialog):
         label.setWordWrap(True)
         label.setAlignment(Qt.AlignCenter)
         layout.addWidget(label)
+
+        # Servers this player is on, from the latest refresh of each server
+        self.location_label = QLabel(self.format_location())
+        self.location_label.setWordWrap(True)
+        layout.addWidget(self.location_label)
+
+        # Names this player was seen with, from the local player history
+        self.aliases_label = QLabel(self.format_aliases())
+        self.aliases_label.setWordWrap(True)
+        self.aliases_label.setTextInteractionFlags(Qt.TextSelectableByMouse)
+        layout.addWidget(self.aliases_label)
+
         btn_ban = QPushButton("Ban")
         btn_ban.setStyleSheet("background-color:#e74c3c; color: white; font-weight: bold;")
         btn_ban.clicked.connect(self.ban_player)
@@ -619,6 +716,34 @@ class PlayerActionDialog(QDialog):
 
         self.setLayout(layout)
 
+    def format_location(self):
+        presences = server_rosters.where_is(self.player_id)
+        if not presences:
+            return "<i>Not on any server in the latest refreshes.</i>"
+        servers = []
+        for presence in presences:
+            as_of = time.strftime("%H:%M", time.localtime(presence.last_update))
+            name = presence.server_name or presence.address or "Unknown server"
+            servers.append(f"<b>{html.escape(name)}</b> (refreshed at {as_of})")
+        return "Online on: " + ", ".join(servers)
+
+    def format_aliases(self, limit=10):
+        try:
+            aliases = player_history.aliases(self.player_id)
+        except sqlite3.Error as e:
+            print(f"[HISTORY] Could not read the aliases of {self.player_id}: {e}")
+            aliases = []
+        if not aliases:
+            return "<i>No names on record for this player.</i>"
+        lines = []
+        for alias in aliases[:limit]:
+            last_seen = time.strftime("%Y-%m-%d %H:%M", time.localtime(alias.last_seen))
+            server = f" on {alias.server}" if alias.server else ""
+            lines.append(f"<b>{html.escape(alias.name)}</b>{html.escape(server)}, last seen {last_seen}")
+        if len(aliases) > limit:
+            lines.append(f"... and {len(aliases) - limit} more")
+        return "Known names:<br>" + "<br>".join(lines)
+
     def copy_player_id(self):
         pyperclip.copy(self.player_id)
         QMessageBox.information(self, "PlayFabID Copied", f"Player's PlayFabID {self.player_id} copied to clipboard.")
@@ -647,6 +772,201 @@ class PlayerActionDialog(QDialog):
                 f"Failed to open player profile:\n{str(e)}"
             )
 
+class PlayerTableModel(QAbstractTableModel):
+    """Players of a server's roster store, one row per PlayFab ID. Rows are never removed: players who left stay in
+    the model and are hidden by PlayerFilterProxy, so a refresh only appends new players and repaints the rest."""
+    NAME, PLAYFAB_ID, TIME_ON_SERVER = range(3)
+    HEADERS = ("Name", "PlayFab ID", "Time on server")
+    SORT_ROLE = Qt.UserRole
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.players = None # RosterStore.players the rows come from
+        self.rows = [] # TrackedPlayer, in order of first sighting
+        self.row_of = {} # PlayFab ID -> row
+        self.recent_joins = set()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        player = self.rows[index.row()]
+        column = index.column()
+        if role == Qt.DisplayRole:
+            if column == self.NAME:
+                return player.name
+            if column == self.PLAYFAB_ID:
+                return player.playfab_id
+            return format_time_remaining(player.time_on_server())
+        if role == self.SORT_ROLE:
+            if column == self.NAME:
+                return player.name.lower()
+            if column == self.PLAYFAB_ID:
+                return player.playfab_id
+            return player.time_on_server()
+        if role == Qt.ForegroundRole:
+            if player.playfab_id in self.recent_joins:
+                return QColor("#2ecc71")
+            if not player.online:
+                return QColor("#888888")
+        if role == Qt.ToolTipRole:
+            if player.playfab_id in self.recent_joins:
+                return "Joined since the previous refresh"
+            if not player.online:
+                return "Left the server"
+        return None
+
+    def player_at(self, row):
+        return self.rows[row]
+
+    def sync(self, players, recent_joins=()):
+        """Brings the model up to date with a roster store.
+
+        @param players: dict of PlayFab ID to TrackedPlayer, see RosterStore.players
+        """
+        self.recent_joins = set(recent_joins)
+        if players is not self.players:
+            # Another server: its TrackedPlayer objects are different ones
+            self.beginResetModel()
+            self.players = players
+            self.rows = list(players.values())
+            self.row_of = {p.playfab_id: row for row, p in enumerate(self.rows)}
+            self.endResetModel()
+            return
+        new_players = [p for pid, p in players.items() if pid not in self.row_of]
+        if new_players:
+            first = len(self.rows)
+            self.beginInsertRows(QModelIndex(), first, first + len(new_players) - 1)
+            for player in new_players:
+                self.row_of[player.playfab_id] = len(self.rows)
+                self.rows.append(player)
+            self.endInsertRows()
+        # TrackedPlayer objects are updated in place by the store, existing rows only need repainting
+        if self.rows:
+            self.dataChanged.emit(self.index(0, 0), self.index(len(self.rows) - 1, len(self.HEADERS) - 1))
+
+    def refresh_times(self):
+        """Repaints the time on server column."""
+        if self.rows:
+            column = self.TIME_ON_SERVER
+            self.dataChanged.emit(self.index(0, column), self.index(len(self.rows) - 1, column))
+
+class PlayerFilterProxy(QSortFilterProxyModel):
+    """Filters the player table down to the results of a search, ordered by relevance, and hides players who
+    left unless asked otherwise."""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.matches = None # PlayFab ID -> rank of the current search results, None when not searching
+        self.show_departed = False
+        self.setSortRole(PlayerTableModel.SORT_ROLE)
+        self.setDynamicSortFilter(True)
+
+    def set_matches(self, results):
+        """@param results: Search results from best to worst (see TrigramIndex.search), or None to show everyone"""
+        self.matches = None if results is None else {r.key: rank for rank, r in enumerate(results)}
+        self.invalidate()
+
+    def set_show_departed(self, show):
+        self.show_departed = show
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        player = self.sourceModel().player_at(source_row)
+        if not player.online and not self.show_departed:
+            return False
+        return self.matches is None or player.playfab_id in self.matches
+
+    def lessThan(self, left, right):
+        if self.matches is None:
+            return super().lessThan(left, right)
+        model = self.sourceModel()
+        left_rank = self.matches.get(model.player_at(left.row()).playfab_id, len(self.matches))
+        right_rank = self.matches.get(model.player_at(right.row()).playfab_id, len(self.matches))
+        # Best results on top whichever way the column is sorted
+        if self.sortOrder() == Qt.DescendingOrder:
+            return left_rank > right_rank
+        return left_rank < right_rank
+
+class RosterHistoryDialog(QDialog):
+    """Shows the archived roster of a server at a chosen date and time."""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Roster at a Past Time")
+        self.resize(520, 600)
+        self.setModal(True)
+        self.setWindowModality(Qt.WindowModal)
+        self.setWindowFlag(Qt.WindowStaysOnTopHint, True)
+
+        layout = QVBoxLayout()
+        time_range = roster_archive.time_range() if roster_archive is not None else None
+        if time_range is None:
+            range_text = "No roster has been archived yet."
+        else:
+            first, last = (time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(t)) for t in time_range)
+            range_text = f"Archived rosters go from {first} to {last}."
+        range_label = QLabel(range_text)
+        range_label.setWordWrap(True)
+        layout.addWidget(range_label)
+
+        row = QHBoxLayout()
+        # Every archived server, the one refreshed last first
+        self.server_combo = QComboBox()
+        self.server_combo.setSizeAdjustPolicy(QComboBox.AdjustToContents)
+        for server in (roster_archive.servers() if roster_archive is not None else []):
+            self.server_combo.addItem(server or "Unknown server", server)
+        row.addWidget(self.server_combo)
+        self.time_edit = QDateTimeEdit(QDateTime.currentDateTime())
+        self.time_edit.setCalendarPopup(True)
+        self.time_edit.setDisplayFormat("yyyy-MM-dd HH:mm:ss")
+        row.addWidget(self.time_edit, 1)
+        show_btn = QPushButton("Show Roster")
+        show_btn.clicked.connect(self.show_roster)
+        row.addWidget(show_btn)
+        layout.addLayout(row)
+
+        self.result_label = QLabel("")
+        self.result_label.setWordWrap(True)
+        layout.addWidget(self.result_label)
+        self.roster_text = QPlainTextEdit()
+        self.roster_text.setReadOnly(True)
+        layout.addWidget(self.roster_text)
+        self.setLayout(layout)
+
+    def show_roster(self):
+        self.roster_text.clear()
+        if roster_archive is None:
+            self.result_label.setText("The roster archive could not be opened.")
+            return
+        timestamp = self.time_edit.dateTime().toSecsSinceEpoch()
+        if self.server_combo.count() == 0:
+            self.result_label.setText("No roster has been archived yet.")
+            return
+        archived = roster_archive.roster_at(timestamp, self.server_combo.currentData())
+        if archived is None:
+            self.result_label.setText("No roster of that server was archived before that time.")
+            return
+        as_of = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(archived.timestamp))
+        self.result_label.setText(
+            f"<b>{html.escape(archived.server or 'Unknown server')}</b>: {len(archived.players)} players, "
+            f"as of the refresh at {as_of}"
+        )
+        lines = sorted(f"{name} - {pid}" for pid, name in archived.players.items())
+        self.roster_text.setPlainText("\n".join(lines))
+
+# Most players of the history listed under the players window search
+KNOWN_PLAYER_RESULTS = 20
+
+
 class PlayersWindow(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -666,23 +986,30 @@ class PlayersWindow(QDialog):
 
         # Info row for server name and players count
         info_row = QHBoxLayout()
-        self.server_label = QLabel("Server: -")
+        self.server_label = QLabel("Server:")
+        # Every server refreshed so far; the first entry follows whichever server was refreshed last
+        self.server_combo = QComboBox()
+        self.server_combo.setSizeAdjustPolicy(QComboBox.AdjustToContents)
+        self.server_combo.currentIndexChanged.connect(self.on_server_selected)
         self.player_count_label = QLabel("Players: 0")
         info_row.addWidget(self.server_label)
+        info_row.addWidget(self.server_combo)
         info_row.addStretch(1)
         info_row.addWidget(self.player_count_label)
         top_layout = QHBoxLayout()
         title = QLabel("<h3>Players List:</h3>")
         title.setAlignment(Qt.AlignLeft)
         top_layout.addWidget(title)
+        top_layout.addStretch(1)
+        history_btn = QPushButton("Roster at a Past Time...")
+        history_btn.clicked.connect(self.open_roster_history)
+        top_layout.addWidget(history_btn)
         refresh_btn = QPushButton("Refresh Player List")
-        # Register for clipboard update messages via native event filter
-        app = QApplication.instance()
-        try:
-            self._cb_event_filter = WinClipboardEventFilter(self._on_native_clipboard_update)
-            QAbstractEventDispatcher.instance().installNativeEventFilter(self._cb_event_filter)
-        except Exception:
-            self._cb_event_filter = None
+        # Parsed player lists come from the shared ingestor; clipboard notifications only prompt it to check
+        player_list_ingestor.subscribe(self.on_player_list)
+        self.finished.connect(lambda _: player_list_ingestor.unsubscribe(self.on_player_list))
+        QApplication.clipboard().dataChanged.connect(self.on_clipboard_changed)
+        self.finished.connect(lambda _: QApplication.clipboard().dataChanged.disconnect(self.on_clipboard_changed))
 
         refresh_btn.clicked.connect(self.refresh_player_list)
         refresh_btn.setStyleSheet("""
@@ -709,124 +1036,167 @@ class PlayersWindow(QDialog):
         self.search_bar = QLineEdit()
         self.search_bar.setPlaceholderText("Search by ID or Player Name...")
         self.search_bar.textChanged.connect(self.filter_players)
-        self.player_list = QListWidget()
-        main_layout.addWidget(self.player_list)
-        main_layout.addWidget(self.search_bar)
-        self.player_list.itemClicked.connect(self.open_player_actions)
+        # Searches run once typing pauses rather than on every keystroke
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(150)
+        self.search_timer.timeout.connect(self.apply_search)
+        self.show_departed_checkbox = QCheckBox("Show players who left")
+        self.show_departed_checkbox.toggled.connect(self.set_show_departed)
+
+        self.player_model = PlayerTableModel(self)
+        self.player_proxy = PlayerFilterProxy(self)
+        self.player_proxy.setSourceModel(self.player_model)
+        self.player_table = QTableView()
+        self.player_table.setModel(self.player_proxy)
+        self.player_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.player_table.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.player_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.player_table.setSortingEnabled(True)
+        self.player_table.sortByColumn(PlayerTableModel.NAME, Qt.AscendingOrder)
+        self.player_table.setAlternatingRowColors(True)
+        self.player_table.setWordWrap(False)
+        self.player_table.verticalHeader().hide()
+        # Fixed row heights and column modes keep the view from measuring every row's contents
+        self.player_table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        header = self.player_table.horizontalHeader()
+        header.setSectionResizeMode(PlayerTableModel.NAME, QHeaderView.Stretch)
+        header.setSectionResizeMode(PlayerTableModel.PLAYFAB_ID, QHeaderView.Interactive)
+        header.setSectionResizeMode(PlayerTableModel.TIME_ON_SERVER, QHeaderView.Fixed)
+        self.player_table.setColumnWidth(PlayerTableModel.PLAYFAB_ID, 170)
+        self.player_table.setColumnWidth(PlayerTableModel.TIME_ON_SERVER, 100)
+        self.player_table.clicked.connect(self.open_player_actions)
+        main_layout.addWidget(self.player_table)
+        search_row = QHBoxLayout()
+        search_row.addWidget(self.search_bar, 1)
+        search_row.addWidget(self.show_departed_checkbox)
+        main_layout.addLayout(search_row)
+        # Players of the history matching the search who are not in the list, e.g. to ban someone who left
+        self.known_players_label = QLabel("Seen before, not in this list:")
+        self.known_players_list = QListWidget()
+        self.known_players_list.setMaximumHeight(120)
+        self.known_players_list.itemClicked.connect(self.open_known_player_actions)
+        main_layout.addWidget(self.known_players_label)
+        main_layout.addWidget(self.known_players_list)
+        self.show_known_players([])
         self.setLayout(main_layout)
+
+        # Time on server keeps counting between refreshes
+        self.time_timer = QTimer(self)
+        self.time_timer.timeout.connect(self.player_model.refresh_times)
+        self.time_timer.start(1000)
+        self.finished.connect(lambda _: self.time_timer.stop())
+
+        # Show what the previous refreshes found right away
+        self.update_server_choices()
+        self.show_server_roster()
         if self.game is not None:
             self.refresh_player_list()
 
     def refresh_player_list(self):
-        self.awaiting_player_list = True
+        # Note the clipboard sequence before listplayers copies its output
+        player_list_ingestor.expect()
         try:
             if hasattr(self.game, 'ListPlayers'):
                 self.game.ListPlayers()
             else:
                 QMessageBox.warning(self, "No Game Connection", "Cannot refresh player list - Chivalry 2 not connected.\n\nPlease ensure Chivalry 2 is running.")
-                self.awaiting_player_list = False
+                player_list_ingestor.cancel()
                 return
         except Exception as e:
             QMessageBox.warning(self, "Game Connection Error", f"Could not refresh player list:\n{str(e)}")
-            self.awaiting_player_list = False
+            player_list_ingestor.cancel()
             return
 
         # Fallback if clipboard update signal does not arrive
         QTimer.singleShot(1500, self._fallback_parse_clipboard)
 
     def on_clipboard_changed(self):
-        """Qt clipboard signal handler; process only when awaiting player list."""
-        if not getattr(self, 'awaiting_player_list', False):
-            return
-        try:
-            text = pyperclip.paste()
-        except Exception:
-            text = ""
-        if " - " in (text or ""):
-            self.players = parse_player_list_from_clipboard()
-            self.filtered_players = self.players.copy()
-            self.populate_list()
-            self._update_info_from_text(text)
-            self.awaiting_player_list = False
+        """Qt clipboard signal handler; the ingestor only reads the clipboard if a player list is awaited."""
+        player_list_ingestor.poll()
 
     def _fallback_parse_clipboard(self):
-        if not getattr(self, 'awaiting_player_list', False):
+        player_list_ingestor.poll()
+
+    def on_player_list(self, snapshot):
+        """Called by the ingestor with each new parsed player list, after the server rosters were updated."""
+        self.update_server_choices()
+        self.show_server_roster()
+
+    def viewed_server(self):
+        """Key of the server shown in the list, None for the server refreshed last."""
+        return self.server_combo.currentData()
+
+    def update_server_choices(self):
+        """Adds the servers refreshed since the window was opened to the server selector."""
+        known = {self.server_combo.itemData(i) for i in range(1, self.server_combo.count())}
+        if self.server_combo.count() == 0:
+            self.server_combo.addItem("Last refreshed server", None)
+        for key, store in server_rosters.stores.items():
+            if key not in known:
+                self.server_combo.addItem(store.server_name or key or "Unknown server", key)
+
+    def on_server_selected(self, _index):
+        self.show_server_roster()
+
+    def show_server_roster(self):
+        store = server_rosters.store(self.viewed_server())
+        if store is None:
             return
-        try:
-            text = pyperclip.paste()
-        except Exception:
-            text = ""
-        if " - " in (text or ""):
-            self.players = parse_player_list_from_clipboard()
-            self.filtered_players = self.players.copy()
-            self.populate_list()
-            self._update_info_from_text(text)
-            self.awaiting_player_list = False
-
-    def populate_list(self):
-        self.player_list.clear()
-        for name, pid in self.filtered_players:
-            self.player_list.addItem(f"{name} - {pid}")
-
-    def _update_info_from_text(self, text: str):
-        """Extract server name and player count and update the info row labels.
-        Expected header example:
-        "ServerName - OATS Duelyard  [Flourish to Duel Pit FFA Discord oatsduelyard] 134.255.251.182:10180"
-        """
-        lines = (text or "").strip().splitlines()
-        server_name = "-"
-        if lines:
-            header = lines[0].strip()
-            # Remove a trailing IP:port from header if present
-            header_no_ip = re.sub(r"\s*(?:\d{1,3}\.){3}\d{1,3}(?::\d+)?\s*$", "", header)
-
-            # Preferred: capture the name after 'ServerName - ' up to a double space before the next section
-            m = re.match(r"^\s*ServerName\s*-\s*(.+?)\s{2,}.*$", header_no_ip)
-            if m:
-                server_name = m.group(1).strip()
-            else:
-                # Fallbacks if format varies slightly
-                if header_no_ip.lower().startswith("servername") and '-' in header_no_ip:
-                    try:
-                        after_dash = header_no_ip.split('-', 1)[1].strip()
-                        # stop at first double-space chunk if present
-                        server_name = after_dash.split('  ')[0].strip() or server_name
-                    except Exception:
-                        pass
-                elif ' - ' in header_no_ip:
-                    try:
-                        server_name = header_no_ip.split(' - ', 1)[1].split('  ')[0].strip() or server_name
-                    except Exception:
-                        pass
-            # Extra safety: strip any trailing IP:port if it slipped into the name
-            server_name = re.sub(r"\s*(?:\d{1,3}\.){3}\d{1,3}(?::\d+)?\s*$", "", server_name)
-
-        # Count players: skip the two header lines and count rows that look like player entries
-        data_lines = lines[2:] if len(lines) >= 3 else []
-        player_rows = [ln for ln in data_lines if " - " in ln]
-        count = len(player_rows)
-        self.server_label.setText(f"Server: {server_name}")
-        self.player_count_label.setText(f"Players: {count}")
-
-    def populate_list(self):
-        self.player_list.clear()
-        for name, pid in self.filtered_players:
-            self.player_list.addItem(f"{name} - {pid}")
+        # Players who joined since the previous refresh of that server are highlighted
+        self.player_model.sync(store.players, store.recent_joins())
+        if self.player_proxy.matches is not None:
+            # New players may match the current search
+            self.apply_search()
+        self._update_info(store)
+
+    def _update_info(self, store):
+        """Show the server name and player count of a roster store in the info row labels."""
+        self.server_combo.setItemText(0, f"Last refreshed: {server_rosters.store().server_name or '-'}")
+        self.player_count_label.setText(f"Players: {len(store.online)}")
 
     def filter_players(self, text):
-        text = text.lower()
-        self.filtered_players = [
-            (name, pid) for name, pid in self.players
-            if text in name.lower() or text in pid.lower()
-        ]
-        self.populate_list()
-
-    def open_player_actions(self, item):
-        text = item.text()
-        if " - " not in text:
+        self.search_timer.start()
+
+    def apply_search(self):
+        text = self.search_bar.text().strip()
+        if not text:
+            self.player_proxy.set_matches(None)
+            self.show_known_players([])
+            return
+        listed = self.player_model.players or {}
+        self.player_proxy.set_matches(player_search_index.search(text, keys=listed))
+        results = player_search_index.search(text, limit=KNOWN_PLAYER_RESULTS + len(listed))
+        self.show_known_players([r for r in results if r.key not in listed][:KNOWN_PLAYER_RESULTS])
+
+    def show_known_players(self, results):
+        self.known_players_list.clear()
+        for result in results:
+            aliases = player_history.aliases(result.key)
+            name = aliases[0].name if aliases else result.text
+            item = QListWidgetItem(f"{name} ({result.key})")
+            item.setData(Qt.UserRole, (result.key, name))
+            self.known_players_list.addItem(item)
+        self.known_players_label.setVisible(bool(results))
+        self.known_players_list.setVisible(bool(results))
+
+    def open_known_player_actions(self, item):
+        playfab_id, name = item.data(Qt.UserRole)
+        dialog = PlayerActionDialog(playfab_id, name, parent=self)
+        dialog.exec_()
+
+    def set_show_departed(self, show):
+        self.player_proxy.set_show_departed(show)
+
+    def open_roster_history(self):
+        dialog = RosterHistoryDialog(parent=self)
+        dialog.exec_()
+
+    def open_player_actions(self, index):
+        if not index.isValid():
             return
-        name, pid = text.split(" - ", 1)
-        dialog = PlayerActionDialog(pid, name, parent=self)
+        player = self.player_model.player_at(self.player_proxy.mapToSource(index).row())
+        dialog = PlayerActionDialog(player.playfab_id, player.name, parent=self)
         dialog.exec_()
 
 class ActionDialog(QDialog):
@@ -909,6 +1279,148 @@ class ConsoleKeyDialog(QDialog):
         self.status.setText(f"Captured key: VK {self.captured_vk}. Click OK to save or press another key.")
         self.ok_button.setEnabled(True)
 
+class RegionCanvas(QLabel):
+    """Shows a game screenshot scaled down, with the OCR regions drawn on top.
+    Dragging with the mouse draws a new rectangle for the selected region."""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setAlignment(Qt.AlignLeft | Qt.AlignTop)
+        self.pixmap_full = None
+        self.scale = 1.0
+        self.rects = {}
+        self.selected = None
+        self._drag_start = None
+        self._drag_rect = None
+
+    def set_screenshot(self, pixmap, max_width=1100):
+        self.pixmap_full = pixmap
+        self.scale = min(1.0, max_width / max(1, pixmap.width()))
+        self.setFixedSize(int(pixmap.width() * self.scale), int(pixmap.height() * self.scale))
+        self.update()
+
+    def _to_image(self, pos):
+        return QPoint(int(pos.x() / self.scale), int(pos.y() / self.scale))
+
+    def mousePressEvent(self, event):
+        if self.pixmap_full is not None and self.selected:
+            self._drag_start = self._to_image(event.pos())
+            self._drag_rect = None
+
+    def mouseMoveEvent(self, event):
+        if self._drag_start is not None:
+            self._drag_rect = QRect(self._drag_start, self._to_image(event.pos())).normalized()
+            self.update()
+
+    def mouseReleaseEvent(self, event):
+        if self._drag_start is not None and self._drag_rect is not None and self._drag_rect.width() > 2 and self._drag_rect.height() > 2:
+            r = self._drag_rect
+            self.rects[self.selected] = (r.left(), r.top(), r.right() + 1, r.bottom() + 1)
+        self._drag_start = None
+        self._drag_rect = None
+        self.update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        if self.pixmap_full is not None:
+            painter.drawPixmap(self.rect(), self.pixmap_full)
+        for name, (left, top, right, bottom) in self.rects.items():
+            color = QColor("#e74c3c") if name == self.selected else QColor("#2ecc71")
+            painter.setPen(QPen(color, 2))
+            r = QRect(int(left * self.scale), int(top * self.scale), int((right - left) * self.scale), int((bottom - top) * self.scale))
+            painter.drawRect(r)
+            painter.drawText(r.topLeft() + QPoint(3, 12), name)
+        if self._drag_rect is not None:
+            painter.setPen(QPen(QColor("#3d5afe"), 2, Qt.DashLine))
+            r = self._drag_rect
+            painter.drawRect(QRect(int(r.left() * self.scale), int(r.top() * self.scale), int(r.width() * self.scale), int(r.height() * self.scale)))
+        painter.end()
+
+class RegionCalibrationDialog(QDialog):
+    """One-shot calibration of the screen regions read by OCR, stored for the current resolution and DPI."""
+    def __init__(self, chivalry, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Calibrate Screen Regions")
+        self.setModal(True)
+        self.setWindowModality(Qt.WindowModal)
+        self.chivalry = chivalry
+        self.size_px = None
+        self.dpi = 96
+
+        layout = QVBoxLayout()
+        instructions = QLabel(
+            "Capture the game, pick a region and drag a rectangle over where it appears on screen.\n"
+            "Saved regions are used for this resolution and display scaling only."
+        )
+        instructions.setWordWrap(True)
+        layout.addWidget(instructions)
+
+        row = QHBoxLayout()
+        capture_btn = QPushButton("Capture Game Screen")
+        capture_btn.clicked.connect(self.capture)
+        row.addWidget(capture_btn)
+        self.region_combo = QComboBox()
+        self.region_combo.addItems(list(REGIONS))
+        self.region_combo.currentTextChanged.connect(self.select_region)
+        row.addWidget(self.region_combo, 1)
+        self.profile_label = QLabel("No capture yet")
+        row.addWidget(self.profile_label)
+        layout.addLayout(row)
+
+        self.canvas = RegionCanvas()
+        self.canvas.selected = self.region_combo.currentText()
+        layout.addWidget(self.canvas)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.Save | QDialogButtonBox.Reset | QDialogButtonBox.Cancel)
+        buttons.accepted.connect(self.save)
+        buttons.rejected.connect(self.reject)
+        buttons.button(QDialogButtonBox.Reset).setText("Reset to Defaults")
+        buttons.button(QDialogButtonBox.Reset).clicked.connect(self.reset_defaults)
+        layout.addWidget(buttons)
+        self.setLayout(layout)
+
+    def select_region(self, name):
+        self.canvas.selected = name
+        self.canvas.update()
+
+    def capture(self):
+        try:
+            image = self.chivalry.getChivScreenshot().convert("RGB")
+        except Exception as e:
+            QMessageBox.warning(self, "Capture Failed", f"Could not capture the game window:\n{str(e)}")
+            return
+        # Bring the dialog back in front of the game
+        self.raise_()
+        self.activateWindow()
+        self.size_px = image.size
+        self.dpi = self.chivalry.getWindowDpi()
+        data = image.tobytes("raw", "RGB")
+        qimage = QImage(data, image.size[0], image.size[1], 3 * image.size[0], QImage.Format_RGB888).copy()
+        self.canvas.rects = dict(self.chivalry.getCalibration().regions(self.size_px, self.dpi))
+        self.canvas.set_screenshot(QPixmap.fromImage(qimage))
+        self.profile_label.setText(f"{self.size_px[0]}x{self.size_px[1]} @ {self.dpi} DPI")
+        self.adjustSize()
+
+    def save(self):
+        if self.size_px is None:
+            QMessageBox.warning(self, "No Capture", "Capture the game screen before saving.")
+            return
+        if self.chivalry.getCalibration().store(self.size_px, self.dpi, self.canvas.rects):
+            QMessageBox.information(self, "Calibration Saved", "Screen regions saved for this resolution.")
+            self.accept()
+        else:
+            QMessageBox.warning(self, "Save Failed", "Unable to save the calibration file.")
+
+    def reset_defaults(self):
+        if self.size_px is None:
+            return
+        calibration = self.chivalry.getCalibration()
+        calibration.reset(self.size_px, self.dpi)
+        self.canvas.rects = dict(calibration.regions(self.size_px, self.dpi))
+        self.canvas.update()
+
+# Milliseconds between two commands typed into the console, for it to close before the next one
+CONSOLE_GAP_MS = 1500
+
 class AdminDashboard(QWidget):
     def __init__(self):
         super().__init__()
@@ -940,9 +1452,30 @@ class AdminDashboard(QWidget):
         # Add webhook status
         self.webhook_status_label = QLabel()
         self.webhook_status_label.setAlignment(Qt.AlignCenter)
+        self.webhook_bridge = WebhookBridge(self)
+        self.webhook_bridge.delivered.connect(self.on_webhook_delivery)
+        # Kept to unsubscribe the very same callable on close
+        self.webhook_subscriber = self.webhook_bridge.delivered.emit
+        wehbooks.dispatcher.subscribe(self.webhook_subscriber)
+        # The queue ages without any delivery happening
+        self.webhook_health_timer = QTimer(self)
+        self.webhook_health_timer.timeout.connect(self.update_webhook_status)
+        self.webhook_health_timer.start(5000)
         self.update_webhook_status()
         status_layout.addWidget(self.webhook_status_label)
 
+        # Live match timer, fed by the background sampler while the game is connected
+        self.time_remaining_label = QLabel("Time remaining: --:--")
+        self.time_remaining_label.setAlignment(Qt.AlignCenter)
+        status_layout.addWidget(self.time_remaining_label)
+        self.timer_bridge = MatchTimerBridge(self)
+        self.timer_bridge.updated.connect(self.update_time_remaining)
+        self.timer_sampler = None
+        self.evidence_recorder = None
+        self.ban_evidence_mode = get_persisted_value('ban_evidence', "")
+        if self.ban_evidence_mode not in BAN_EVIDENCE_MODES:
+            self.ban_evidence_mode = ""
+
         status_group.setLayout(status_layout)
         main_layout.addWidget(status_group)
         # Admin Message Section
@@ -1083,6 +1616,25 @@ class AdminDashboard(QWidget):
         btn_add_time.clicked.connect(self.open_add_time_dialog)
         actions_row.addWidget(btn_add_time)
 
+        self.auto_refresh_checkbox = QCheckBox("Auto-refresh player list")
+        self.auto_refresh_checkbox.setToolTip("Periodically runs listplayers, more often while players are joining or leaving.\nPaused while you are typing.")
+        self.auto_refresh_checkbox.setChecked(get_persisted_value('auto_refresh_players', "") == "1")
+        self.auto_refresh_checkbox.toggled.connect(self.set_auto_refresh)
+        actions_row.addWidget(self.auto_refresh_checkbox)
+
+        self.auto_moderation_checkbox = QCheckBox("Auto-moderation")
+        if auto_moderator:
+            self.auto_moderation_checkbox.setToolTip(
+                f"Checks the name of every player who joins against the {len(auto_moderator.rules)} rules of {RULES_FILE},\n"
+                "then kicks, bans or alerts the moderators as the rule says."
+            )
+        else:
+            self.auto_moderation_checkbox.setToolTip(f"No rules found, add them to {RULES_FILE} and restart the program.")
+            self.auto_moderation_checkbox.setEnabled(False)
+        self.auto_moderation_checkbox.setChecked(bool(auto_moderator) and get_persisted_value('auto_moderation', "") == "1")
+        self.auto_moderation_checkbox.toggled.connect(self.set_auto_moderation)
+        actions_row.addWidget(self.auto_moderation_checkbox)
+
         commands_layout.addLayout(actions_row)
 
         # Arbitration subgroup
@@ -1120,11 +1672,38 @@ class AdminDashboard(QWidget):
         btn_discord_id_config.clicked.connect(self.configure_discord_user_id)
         settings_layout.addWidget(btn_discord_id_config)
 
+        btn_webhook_metrics = QPushButton("Export Discord Metrics")
+        btn_webhook_metrics.clicked.connect(self.export_webhook_metrics)
+        settings_layout.addWidget(btn_webhook_metrics)
+
+        evidence_row = QHBoxLayout()
+        evidence_row.addWidget(QLabel("Ban evidence:"))
+        self.ban_evidence_combo = QComboBox()
+        for mode, (label, _, _) in BAN_EVIDENCE_MODES.items():
+            self.ban_evidence_combo.addItem(label, mode)
+        self.ban_evidence_combo.setCurrentIndex(self.ban_evidence_combo.findData(self.ban_evidence_mode))
+        self.ban_evidence_combo.setToolTip("Screenshots of the game attached to the Discord notification of every ban,\n"
+                                           "and kept in the evidence folder. The game window must be visible on screen.")
+        self.ban_evidence_combo.currentIndexChanged.connect(self.set_ban_evidence_mode)
+        evidence_row.addWidget(self.ban_evidence_combo, 1)
+        settings_layout.addLayout(evidence_row)
+
+        self.command_api_checkbox = QCheckBox("Local command API")
+        self.command_api_checkbox.setToolTip("Lets other programs on this computer kick, ban, message and add time through the panel,\n"
+                                             f"using the port and token of {API_CONFIG_FILE}.")
+        self.command_api_checkbox.setChecked(get_persisted_value('command_api', "") == "1")
+        settings_layout.addWidget(self.command_api_checkbox)
+
         # Configure Console Key button
         btn_console_key = QPushButton("Configure Console Key")
         btn_console_key.clicked.connect(self.configure_console_key)
         settings_layout.addWidget(btn_console_key)
 
+        # Screen regions calibration (OCR features)
+        btn_calibrate = QPushButton("Calibrate Screen Regions")
+        btn_calibrate.clicked.connect(self.calibrate_screen_regions)
+        settings_layout.addWidget(btn_calibrate)
+
         # Theme toggle button
         self.theme_button = QPushButton("Dark Mode")
         self.theme_button.clicked.connect(self.toggle_theme)
@@ -1155,6 +1734,38 @@ class AdminDashboard(QWidget):
         self.players_window = None
         self.first_to_window = None
 
+        # Automatic player list refreshes
+        self.refresh_policy = AdaptiveRefreshPolicy()
+        self.typing_monitor = TypingMonitor()
+        self.auto_refresh_churn = 0
+        self.auto_refresh_timer = QTimer(self)
+        self.auto_refresh_timer.setSingleShot(True)
+        self.auto_refresh_timer.timeout.connect(self.auto_refresh_players)
+        self.typing_poll_timer = QTimer(self)
+        self.typing_poll_timer.timeout.connect(self.typing_monitor.poll)
+        server_rosters.subscribe(self.count_roster_churn)
+        if self.auto_refresh_checkbox.isChecked():
+            self.set_auto_refresh(True)
+
+        # Auto-moderation actions, commands of the local command API and automatic refreshes all type into the
+        # console: they share one queue, so they run one at a time, CONSOLE_GAP_MS apart
+        self.console_queue = deque() # (source, item)
+        self.console_last_run = 0.0
+        self.console_timer = QTimer(self)
+        self.console_timer.setSingleShot(True)
+        self.console_timer.timeout.connect(self.process_console_queue)
+
+        server_rosters.subscribe(self.check_roster_names)
+        if self.auto_moderation_checkbox.isChecked():
+            self.set_auto_moderation(True)
+
+        self.command_api = None
+        self.command_api_bridge = CommandApiBridge(self)
+        self.command_api_bridge.received.connect(self.queue_api_request)
+        self.command_api_checkbox.toggled.connect(self.set_command_api)
+        if self.command_api_checkbox.isChecked():
+            self.set_command_api(True)
+
     def center_on_screen(self):
         try:
             screen = self.screen() or QApplication.primaryScreen()
@@ -1183,6 +1794,8 @@ class AdminDashboard(QWidget):
                 self.game = GameChivalry()
                 self.chivalry_connected = True
                 print("[CONNECTION] Successfully connected to Chivalry 2")
+                self.start_timer_sampler()
+                self.start_evidence_recorder()
             except Exception as e:
                 print(f"[CONNECTION] Could not connect to Chivalry 2: {e}")
                 self.chivalry_connected = False
@@ -1194,6 +1807,8 @@ class AdminDashboard(QWidget):
             self.chivalry_connected = False
             self.server_connected = False
             self.game = None
+            self.stop_timer_sampler()
+            self.stop_evidence_recorder()
 
         # Note: We don't automatically check server connection to avoid disrupting gameplay
         # Server connection status will be determined only when user manually refreshes player list
@@ -1292,23 +1907,134 @@ class AdminDashboard(QWidget):
             self.status_label.setText("Chivalry 2 Not Connected")
             self.status_label.setStyleSheet("color: red; font-weight: bold;")
 
+    def start_timer_sampler(self):
+        """Start reading the in-game timer in the background (never takes focus from the game)"""
+        self.stop_timer_sampler()
+        if self.game is None:
+            return
+        self.timer_sampler = MatchTimerSampler(self.game.game, self.timer_bridge.updated.emit)
+        self.timer_sampler.start()
+
+    def stop_timer_sampler(self):
+        if self.timer_sampler is not None:
+            self.timer_sampler.stop()
+            self.timer_sampler = None
+        self.timer_bridge.updated.emit(None)
+
+    def start_evidence_recorder(self):
+        """Start recording the game for ban evidence, if enabled (never takes focus from the game)"""
+        self.stop_evidence_recorder()
+        _, seconds, interval = BAN_EVIDENCE_MODES[self.ban_evidence_mode]
+        if self.game is None or seconds is None:
+            return
+        evidence_buffer.seconds = seconds
+        self.evidence_recorder = EvidenceRecorder(self.game.game, evidence_buffer, interval)
+        self.evidence_recorder.start()
+
+    def stop_evidence_recorder(self):
+        if self.evidence_recorder is not None:
+            self.evidence_recorder.stop()
+            self.evidence_recorder = None
+        evidence_buffer.clear()
+
+    def set_ban_evidence_mode(self, index):
+        self.ban_evidence_mode = self.ban_evidence_combo.itemData(index)
+        set_persisted_value('ban_evidence', self.ban_evidence_mode)
+        if self.chivalry_connected:
+            self.start_evidence_recorder()
+
+    def update_time_remaining(self, seconds):
+        self.time_remaining_label.setText(f"Time remaining: {format_time_remaining(seconds)}")
+
+    def closeEvent(self, event):
+        self.stop_timer_sampler()
+        self.stop_evidence_recorder()
+        self.auto_refresh_timer.stop()
+        self.console_timer.stop()
+        self.stop_command_api()
+        self.typing_poll_timer.stop()
+        self.webhook_health_timer.stop()
+        wehbooks.dispatcher.unsubscribe(self.webhook_subscriber)
+        super().closeEvent(event)
+
     def update_webhook_status(self):
         """Update the webhook status display"""
         status = wehbooks.get_webhook_status()
 
-        if status['primary_active'] and status['secondary_active']:
-            self.webhook_status_label.setText("Discord: Primary + Secondary Active")
-            self.webhook_status_label.setStyleSheet("color: green;")
-        elif status['primary_active']:
-            self.webhook_status_label.setText("Discord: Primary Active")
-            self.webhook_status_label.setStyleSheet("color: green;")
-        elif status['secondary_active']:
-            self.webhook_status_label.setText("Discord: Secondary Active")
+        active = []
+        if status['primary_active']:
+            active.append("Primary")
+        if status['secondary_active']:
+            active.append("Secondary")
+        if status['extra_active']:
+            active.append(f"{status['extra_active']} more")
+        if active:
+            self.webhook_status_label.setText(f"Discord: {' + '.join(active)} Active")
             self.webhook_status_label.setStyleSheet("color: green;")
         else:
             self.webhook_status_label.setText("Discord: Not Configured")
             self.webhook_status_label.setStyleSheet("color: orange;")
 
+        if not status['any_active']:
+            self.webhook_status_label.setToolTip("")
+            return
+
+        # Delivery health, from the metrics of the session
+        snapshot = wehbooks.metrics.snapshot()
+        destinations = snapshot['destinations']
+        sent = sum(d['sent'] for d in destinations.values())
+        queued = sum(d['queue_depth'] for d in destinations.values())
+        ages = [d['oldest_pending_age'] for d in destinations.values() if d['oldest_pending_age'] is not None]
+        summary = f"{sent} sent"
+        if snapshot.get('requests_saved'):
+            # Notifications batched into the same message
+            summary += f" ({snapshot['requests_saved']} requests saved)"
+        if queued:
+            summary += f", {queued} queued (oldest {format_time_remaining(max(ages))})"
+        failing = [name for name, d in destinations.items()
+                   if d['last_failure'] is not None and (d['last_success'] is None or d['last_failure'] > d['last_success'])]
+        degraded = [name for name, d in destinations.items() if d['degraded']]
+        if failing or snapshot['dropped']:
+            summary += ", last send failed" if failing else f", {snapshot['dropped']} dropped"
+            self.webhook_status_label.setStyleSheet("color: red;")
+        elif degraded:
+            summary += ", slow"
+            self.webhook_status_label.setStyleSheet("color: orange;")
+        self.webhook_status_label.setText(f"{self.webhook_status_label.text()}\n{summary}")
+
+        lines = []
+        for name, d in destinations.items():
+            line = f"{name}: {d['sent']} sent, {d['failed']} failed"
+            if d['rate_limited']:
+                line += f" ({d['rate_limited']} rate limited)"
+            if d['given_up']:
+                line += f", {d['given_up']} given up"
+            if d['recent_p95'] is not None:
+                line += f", 95% within {d['recent_p95']:.1f}s"
+            if d['queue_depth']:
+                line += f", {d['queue_depth']} queued for {format_time_remaining(d['oldest_pending_age'])}"
+            if name in failing:
+                line += f"\n    Last error: {d['last_error']}"
+            lines.append(line)
+        self.webhook_status_label.setToolTip("\n".join(lines))
+
+    def on_webhook_delivery(self, result):
+        """Called on the UI thread with the outcome of every webhook send."""
+        self.update_webhook_status()
+
+    def export_webhook_metrics(self):
+        """Save a snapshot of the Discord delivery metrics as JSON"""
+        path, _ = QFileDialog.getSaveFileName(self, "Export Discord Metrics", "webhookmetrics.json",
+                                              "JSON files (*.json)")
+        if not path:
+            return
+        try:
+            wehbooks.metrics.export(path)
+        except OSError as e:
+            QMessageBox.warning(self, "Export Error", f"Unable to export the Discord metrics:\n{str(e)}")
+            return
+        QMessageBox.information(self, "Export Successful", f"Discord metrics saved to:\n{path}")
+
     def send_admin_message(self):
         msg = self.admin_message_input.text().strip()
         # Persist last admin message
@@ -1362,6 +2088,251 @@ class AdminDashboard(QWidget):
 
         # self.server_message_input.clear()
 
+    def set_auto_refresh(self, enabled):
+        """Start or stop automatic player list refreshes."""
+        set_persisted_value('auto_refresh_players', "1" if enabled else "")
+        if enabled:
+            self.refresh_policy = AdaptiveRefreshPolicy()
+            self.typing_poll_timer.start(250)
+            self.schedule_auto_refresh()
+            print(f"[AUTO REFRESH] Enabled, first refresh in {self.refresh_policy.next_delay():.0f}s")
+        else:
+            self.auto_refresh_timer.stop()
+            self.remove_console_jobs("refresh")
+            if not self.auto_moderation_checkbox.isChecked() and not self.command_api_checkbox.isChecked():
+                self.typing_poll_timer.stop()
+            print("[AUTO REFRESH] Disabled")
+
+    def schedule_auto_refresh(self, delay=None):
+        delay = self.refresh_policy.next_delay() if delay is None else delay
+        self.auto_refresh_timer.start(int(delay * 1000))
+
+    def count_roster_churn(self, events):
+        store = server_rosters.store(events[0].server)
+        if store is not None and store.snapshot_count <= 1:
+            # Everyone "joins" in the first snapshot of a server, that is not churn
+            return
+        self.auto_refresh_churn += sum(1 for ev in events if ev.kind in (JOIN, LEAVE))
+
+    def auto_refresh_players(self):
+        if not self.auto_refresh_checkbox.isChecked():
+            return
+        if not self.chivalry_connected or not hasattr(self.game, 'ListPlayers'):
+            self.refresh_policy.on_failure()
+            self.schedule_auto_refresh()
+            return
+        # listplayers waits its turn with the other console commands, the next refresh is scheduled once it ran
+        self.queue_console_job("refresh")
+
+    def run_auto_refresh(self):
+        if not self.auto_refresh_checkbox.isChecked():
+            return
+        if player_list_ingestor.awaiting:
+            # A manual refresh is in progress
+            self.schedule_auto_refresh(5)
+            return
+
+        self.auto_refresh_churn = 0
+        player_list_ingestor.expect()
+        # Our own key presses must not count as the moderator typing
+        self.typing_monitor.ignore_for(2)
+        try:
+            self.game.ListPlayers()
+        except Exception as e:
+            print(f"[AUTO REFRESH] listplayers failed: {e}")
+            player_list_ingestor.cancel()
+            self.refresh_policy.on_failure()
+            self.schedule_auto_refresh()
+            return
+        QTimer.singleShot(2000, self._finish_auto_refresh)
+
+    def _finish_auto_refresh(self):
+        # Pick the list up here too, in case the clipboard notification never arrived
+        player_list_ingestor.poll()
+        if player_list_ingestor.awaiting:
+            player_list_ingestor.cancel()
+            self.refresh_policy.on_failure()
+            print(f"[AUTO REFRESH] No player list received, retrying in {self.refresh_policy.next_delay():.0f}s")
+        else:
+            self.refresh_policy.on_success(self.auto_refresh_churn)
+        self.schedule_auto_refresh()
+
+    def set_auto_moderation(self, enabled):
+        """Start or stop checking the names of joining players against the auto-moderation rules."""
+        set_persisted_value('auto_moderation', "1" if enabled else "")
+        if enabled:
+            self.typing_poll_timer.start(250)
+            print("[AUTOMOD] Enabled")
+        else:
+            self.remove_console_jobs("automod")
+            if not self.auto_refresh_checkbox.isChecked() and not self.command_api_checkbox.isChecked():
+                self.typing_poll_timer.stop()
+            print("[AUTOMOD] Disabled")
+
+    def check_roster_names(self, events):
+        if not self.auto_moderation_checkbox.isChecked():
+            return
+        players = [(ev.playfab_id, ev.name) for ev in events if ev.kind in (JOIN, RENAME)]
+        for action in auto_moderator.evaluate(players, events[0].server):
+            print(f"[AUTOMOD] {action.name} ({action.playfab_id}) matched {action.matched!r} of rule {action.rule.name!r}: {action.action}")
+            self.queue_console_job("automod", action, 500)
+
+    def queue_console_job(self, source, item=None, delay=0):
+        """Queues a job typing into the game console.
+
+        @param source: "automod" for an AutoModAction, "api" for a command API request, "refresh" for listplayers
+        @param delay: Milliseconds to wait at least before running it, if the queue is idle
+        """
+        self.console_queue.append((source, item))
+        if not self.console_timer.isActive():
+            self.start_console_timer(delay)
+
+    def start_console_timer(self, delay):
+        since_last = (time.monotonic() - self.console_last_run) * 1000
+        self.console_timer.start(int(max(delay, CONSOLE_GAP_MS - since_last)))
+
+    def remove_console_jobs(self, source):
+        """Removes the queued jobs of a source and returns their items."""
+        removed = [item for job_source, item in self.console_queue if job_source == source]
+        self.console_queue = deque(job for job in self.console_queue if job[0] != source)
+        if not self.console_queue:
+            self.console_timer.stop()
+        return removed
+
+    def process_console_queue(self):
+        if not self.console_queue:
+            return
+        if self.typing_monitor.is_typing():
+            # Don't type into the console over the moderator's own input
+            self.console_timer.start(1000)
+            return
+        source, item = self.console_queue.popleft()
+        if source == "automod":
+            self.run_automod_action(item)
+        elif source == "api":
+            self.run_api_request(item)
+        else:
+            self.run_auto_refresh()
+        self.console_last_run = time.monotonic()
+        if self.console_queue:
+            self.start_console_timer(0)
+
+    def run_automod_action(self, action):
+        rule = action.rule
+        server = current_server_name(action.server)
+        if action.action == ALERT:
+            wehbooks.MessageForAdmin(action.playfab_id, action.name, rule.reason, rule.name, "automod", server)
+        elif server_rosters.current != action.server:
+            # The console now talks to another server, let the moderators decide instead
+            print(f"[AUTOMOD] Left the server of {action.name} ({action.playfab_id}), alerting instead of {action.action}")
+            wehbooks.MessageForAdmin(action.playfab_id, action.name, rule.reason, rule.name, "automod", server)
+        elif not self.chivalry_connected or not hasattr(self.game, 'kickbyid'):
+            print(f"[AUTOMOD] Chivalry 2 not connected, alerting instead of {action.action}")
+            wehbooks.MessageForAdmin(action.playfab_id, action.name, rule.reason, rule.name, "automod", server)
+        else:
+            reason = f"[Auto-moderation] {rule.reason}"
+            self.typing_monitor.ignore_for(3)
+            try:
+                if action.action == BAN:
+                    evidence = ban_evidence()
+                    self.game.banbyid(action.playfab_id, rule.duration, reason)
+                    wehbooks.MessageForAdmin(action.playfab_id, action.name, reason, rule.duration, "ban", server,
+                                             evidence)
+                else:
+                    self.game.kickbyid(action.playfab_id, reason)
+                    wehbooks.MessageForAdmin(action.playfab_id, action.name, reason, None, "kick", server)
+                if self.game.verify(f"{action.action}byid {action.playfab_id}") is False:
+                    print(f"[AUTOMOD] The {action.action} of {action.name} ({action.playfab_id}) does not show in the console, it may not have run")
+            except Exception as e:
+                print(f"[AUTOMOD] Could not {action.action} {action.name} ({action.playfab_id}): {e}")
+
+    def set_command_api(self, enabled):
+        """Start or stop the local command API."""
+        set_persisted_value('command_api', "1" if enabled else "")
+        if not enabled:
+            self.stop_command_api()
+            if not self.auto_refresh_checkbox.isChecked() and not self.auto_moderation_checkbox.isChecked():
+                self.typing_poll_timer.stop()
+            print("[COMMAND API] Disabled")
+            return
+        try:
+            config = load_api_config()
+            self.command_api = CommandApiServer(self.command_api_bridge.received.emit, config["token"],
+                                                port=config["port"])
+            self.command_api.start()
+        except (OSError, ValueError, KeyError) as e:
+            self.command_api = None
+            print(f"[COMMAND API] Could not start: {e}")
+            QMessageBox.warning(self, "Command API", f"Could not start the local command API:\n{e}\n\n"
+                                f"Check the port in {API_CONFIG_FILE}.")
+            self.command_api_checkbox.setChecked(False)
+            return
+        self.typing_poll_timer.start(250)
+        self.command_api_checkbox.setToolTip(f"Listening on http://127.0.0.1:{self.command_api.port}/v1/\n"
+                                             f"Token and port in {os.path.abspath(API_CONFIG_FILE)}")
+        print(f"[COMMAND API] Listening on 127.0.0.1:{self.command_api.port}")
+
+    def stop_command_api(self):
+        for request in self.remove_console_jobs("api"):
+            request.finish(error="the command API was stopped")
+        if self.command_api is not None:
+            self.command_api.stop()
+            self.command_api = None
+
+    def queue_api_request(self, request):
+        if self.command_api is None:
+            request.finish(error="the command API was stopped")
+            return
+        print(f"[COMMAND API] Received {request.command} {request.args}")
+        self.queue_console_job("api", request)
+
+    def run_api_request(self, request):
+        request.running()
+        try:
+            request.finish(result=self.run_api_command(request.command, request.args))
+        except Exception as e:
+            print(f"[COMMAND API] {request.command} failed: {e}")
+            request.finish(error=e)
+
+    def run_api_command(self, command, args):
+        """Runs a command of the local command API, the way the dashboard buttons do.
+
+        @returns Result sent back to the client
+        """
+        if command == "players":
+            store = server_rosters.store()
+            if store is None:
+                return {"server": None, "players": []}
+            return {
+                "server": current_server_name(),
+                "players": [{"playfab_id": p.playfab_id, "name": p.name, "joined_at": p.joined_at}
+                            for p in (store.players[pid] for pid in store.online)],
+            }
+        if not self.chivalry_connected or self.game is None:
+            raise RuntimeError("Chivalry 2 is not connected")
+        self.typing_monitor.ignore_for(2)
+        if command in ("kick", "ban"):
+            playfab_id = args["playfab_id"]
+            store = server_rosters.store()
+            player = store.players.get(playfab_id) if store is not None else None
+            name = args.get("name") or (player.name if player is not None else playfab_id)
+            if command == "ban":
+                evidence = ban_evidence()
+                self.game.banbyid(playfab_id, args["duration"], args["reason"])
+                wehbooks.MessageForAdmin(playfab_id, name, args["reason"], args["duration"], "ban",
+                                         current_server_name(), evidence)
+            else:
+                self.game.kickbyid(playfab_id, args["reason"])
+                wehbooks.MessageForAdmin(playfab_id, name, args["reason"], None, "kick", current_server_name())
+            return {"playfab_id": playfab_id, "name": name}
+        if command == "adminsay":
+            self.game.AdminSay(args["message"])
+        elif command == "serversay":
+            self.game.ServerSay(args["message"])
+        elif command == "addtime":
+            self.game.AddTime(args["minutes"])
+        return None
+
     def open_players_window(self):
         # Pre-fill dashboard fields from persisted values
         self.admin_message_input.setText(get_persisted_value('last_admin_msg', ""))
@@ -1389,6 +2360,12 @@ class AdminDashboard(QWidget):
         dialog = ActionDialog("Add Time", ["Time to add (minutes)"], parent=self)
         # Pre-fill last add time value
         dialog.inputs["Time to add (minutes)"] .setText(get_persisted_value('last_add_time', ""))
+        # Show the live remaining time while the dialog is open
+        remaining_label = QLabel(f"Time remaining: {format_time_remaining(self.timer_bridge.seconds)}")
+        dialog.layout().insertRow(0, remaining_label)
+        update_remaining = lambda seconds: remaining_label.setText(f"Time remaining: {format_time_remaining(seconds)}")
+        self.timer_bridge.updated.connect(update_remaining)
+        dialog.finished.connect(lambda _: self.timer_bridge.updated.disconnect(update_remaining))
         if dialog.exec_() == QDialog.Accepted:
             added_time = dialog.get_inputs()[0]
             print(f" +{added_time}min")
@@ -1620,6 +2597,7 @@ class AdminDashboard(QWidget):
             with open(localconfig, 'w', encoding='utf-8') as f:
                 for line in lines:
                     f.write(line + "\n")
+            wehbooks.invalidate_config()
 
             if discord_user_id:
                 QMessageBox.information(
@@ -1655,6 +2633,14 @@ class AdminDashboard(QWidget):
             set_persisted_value('console_vk', str(dlg.captured_vk))
             QMessageBox.information(self, "Console Key Saved", f"Console key saved as VK {dlg.captured_vk}.")
 
+    def calibrate_screen_regions(self):
+        """Open the one-shot calibration of the screen regions read by OCR."""
+        if not self.chivalry_connected or self.game is None:
+            QMessageBox.warning(self, "Not Connected", "Chivalry 2 must be running to calibrate screen regions.")
+            return
+        dlg = RegionCalibrationDialog(self.game.game, parent=self)
+        dlg.exec_()
+
     def toggle_theme(self):
         """Toggle between dark and light theme"""
         app = QApplication.instance()
@@ -1722,6 +2708,16 @@ class FirstToScoreboardWindow(QDialog):
         ttl.setAlignment(Qt.AlignCenter)
         main.addWidget(ttl)
 
+        # Live match timer from the dashboard's sampler
+        self.time_remaining_label = QLabel("Time remaining: --:--")
+        self.time_remaining_label.setAlignment(Qt.AlignCenter)
+        main.addWidget(self.time_remaining_label)
+        self.timer_bridge = getattr(parent, 'timer_bridge', None)
+        if self.timer_bridge is not None:
+            self.update_time_remaining(self.timer_bridge.seconds)
+            self.timer_bridge.updated.connect(self.update_time_remaining)
+            self.finished.connect(lambda _: self.timer_bridge.updated.disconnect(self.update_time_remaining))
+
         # Match settings
         settings = QGroupBox("Match Settings")
         settings_l = QFormLayout()
@@ -1855,6 +2851,9 @@ class FirstToScoreboardWindow(QDialog):
         except Exception as e:
             print(f"[UI] Centering failed: {e}")
 
+    def update_time_remaining(self, seconds):
+        self.time_remaining_label.setText(f"Time remaining: {format_time_remaining(seconds)}")
+
     def parse_rounds_to_win(self) -> int:
         txt = (self.rounds_input.text() or "").strip()
         try:
@@ -1933,7 +2932,7 @@ class FirstToScoreboardWindow(QDialog):
             self._send_server_message(win_msg)
 
         # Send Discord notification
-        wehbooks.MessageForAdmin("N/A", "N/A", discord_result, None, "ft")
+        wehbooks.MessageForAdmin("N/A", "N/A", discord_result, None, "ft", current_server_name())
 
         # Disable adding further points until reset
         self.add_p1_btn.setEnabled(False)
@@ -2008,6 +3007,12 @@ def write_localconfig_lines(lines):
 # 17: last admin message
 # 18: last server message
 # 19: last add-time minutes
+# 20..25: admin/server message presets
+# 26: console key VK
+# 27: auto-refresh player list toggle
+# 28: auto-moderation toggle
+# 29: ban evidence mode
+# 30: local command API toggle
 PERSIST_INDEX = {
     'last_ban_reason': 14,
     'last_ban_duration': 15,
@@ -2016,6 +3021,10 @@ PERSIST_INDEX = {
     'last_server_msg': 18,
     'last_add_time': 19,
     'console_vk': 26,
+    'auto_refresh_players': 27,
+    'auto_moderation': 28,
+    'ban_evidence': 29,
+    'command_api': 30,
 }
 
 
@@ -2228,6 +3237,27 @@ def apply_dark_theme(app):
         background-color: #454545;
     }
 
+    /* Table views */
+    QTableView {
+        background-color: #353535;
+        border: 1px solid #606060;
+        border-radius: 4px;
+        color: #ffffff;
+        gridline-color: #606060;
+        selection-background-color: #3d5afe;
+        selection-color: #ffffff;
+        alternate-background-color: #404040;
+    }
+
+    QHeaderView::section {
+        background-color: #404040;
+        color: #ffffff;
+        padding: 4px;
+        border: none;
+        border-right: 1px solid #606060;
+        border-bottom: 1px solid #606060;
+    }
+
     /* Progress bars */
     QProgressBar {
         background-color: #404040;
@@ -2396,6 +3426,27 @@ def apply_light_theme(app):
         background-color: #f0f0f0;
     }
 
+    /* Table views */
+    QTableView {
+        background-color: #ffffff;
+        border: 1px solid #cccccc;
+        border-radius: 4px;
+        color: #333333;
+        gridline-color: #cccccc;
+        selection-background-color: #3d5afe;
+        selection-color: #ffffff;
+        alternate-background-color: #f8f8f8;
+    }
+
+    QHeaderView::section {
+        background-color: #f0f0f0;
+        color: #333333;
+        padding: 4px;
+        border: none;
+        border-right: 1px solid #cccccc;
+        border-bottom: 1px solid #cccccc;
+    }
+
     /* Progress bars */
     QProgressBar {
         background-color: #ffffff;
@@ -2459,6 +3510,8 @@ def apply_light_theme(app):
     app.setStyleSheet(light_stylesheet)
 
 def main():
+    # Window coordinates must match screenshot pixels for the OCR regions
+    enableDpiAwareness()
     app = QApplication(sys.argv)
     # Install global tooltip filter with 0.5s delay
     app._instant_tt = InstantToolTipFilter(delay_ms=500)